@@ -1,14 +1,23 @@
-from groq import Groq
+import functools
+
 from django.conf import settings
+from django.utils.functional import cached_property
 from .rag_service import LaudoRAGService
 import json
 import re
 
+
+@functools.lru_cache(maxsize=None)
+def obter_ai_service():
+    """Instância única por processo, criada na primeira requisição de IA."""
+    return LaudoAIService()
+
+
 class LaudoAIService:
     """Serviço de IA para geração de laudos com RAG + Cálculos Completos"""
     
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+        # Groq, ChromaDB e o modelo de embeddings só carregam no primeiro uso
         self.rag = LaudoRAGService()
         
         # Importa TODAS as calculadoras
@@ -35,6 +44,12 @@ class LaudoAIService:
         self.calc_visibilidade = CalculadoraVisibilidade()
         
         self.model = "llama-3.3-70b-versatile"
+
+    @cached_property
+    def client(self):
+        from groq import Groq
+
+        return Groq(api_key=settings.GROQ_API_KEY)
     
     def detectar_e_executar_calculo(self, mensagem: str) -> tuple:
         """
@@ -0,0 +1,196 @@
+"""
+Backends do modelo de embeddings (all-MiniLM-L6-v2), escolhidos por
+IA_EMBEDDINGS_BACKEND:
+
+- "torch": sentence-transformers/PyTorch (padrão, comportamento original);
+- "onnx": o mesmo modelo exportado para ONNX com quantização int8 dinâmica,
+  rodando no onnxruntime (sem importar torch). O arquivo é gerado pelo
+  comando exportar_modelo_onnx, que confere a compatibilidade dos vetores
+  com os do torch antes de aceitar o modelo.
+
+Os dois expõem encode(textos, batch_size) -> numpy.ndarray (vetores de
+norma 1), como o SentenceTransformer.
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+NOME_MODELO = "all-MiniLM-L6-v2"
+
+ARQUIVO_FP32 = "modelo.onnx"
+ARQUIVO_INT8 = "modelo_int8.onnx"
+ARQUIVO_TOKENIZER = "tokenizer.json"
+ARQUIVO_CONFIG = "config_embeddings.json"
+
+
+def obter_modelo_embeddings(backend=None):
+    """Instancia o backend configurado (ou o informado: 'torch'/'onnx')."""
+    backend = backend or settings.IA_EMBEDDINGS_BACKEND
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(NOME_MODELO)
+    if backend == "onnx":
+        return ModeloOnnx(settings.IA_ONNX_DIR, threads=settings.IA_ONNX_THREADS)
+    raise ImproperlyConfigured(f"IA_EMBEDDINGS_BACKEND inválido: {backend!r}")
+
+
+class ModeloOnnx:
+    """
+    Tokenização (tokenizers, em Rust) + transformer no onnxruntime + mean
+    pooling e normalização L2 em NumPy: o mesmo pipeline do
+    SentenceTransformer do MiniLM.
+    """
+
+    def __init__(self, pasta, threads=0, arquivo=ARQUIVO_INT8):
+        import numpy as np
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        caminho = os.path.join(pasta, arquivo)
+        if not os.path.exists(caminho):
+            raise ImproperlyConfigured(
+                f"Modelo ONNX não encontrado em {caminho}. "
+                "Execute: python manage.py exportar_modelo_onnx"
+            )
+        with open(os.path.join(pasta, ARQUIVO_CONFIG), encoding="utf-8") as arquivo_config:
+            config = json.load(arquivo_config)
+
+        self.np = np
+        self.tokenizer = Tokenizer.from_file(os.path.join(pasta, ARQUIVO_TOKENIZER))
+        self.tokenizer.enable_truncation(max_length=config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=config["pad_id"], pad_token=config["pad_token"])
+
+        opcoes = onnxruntime.SessionOptions()
+        opcoes.intra_op_num_threads = threads  # 0 = onnxruntime decide
+        opcoes.inter_op_num_threads = 1
+        opcoes.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.sessao = onnxruntime.InferenceSession(
+            caminho, opcoes, providers=["CPUExecutionProvider"]
+        )
+        self.entradas = {entrada.name for entrada in self.sessao.get_inputs()}
+
+    def encode(self, textos, batch_size=32, **kwargs):
+        np = self.np
+        textos = list(textos)
+        if not textos:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Lotes com textos de tamanho parecido: menos padding por lote
+        ordem = sorted(range(len(textos)), key=lambda i: len(textos[i]))
+        vetores = [None] * len(textos)
+        for inicio in range(0, len(ordem), batch_size):
+            indices = ordem[inicio : inicio + batch_size]
+            for i, vetor in zip(indices, self._lote([textos[i] for i in indices])):
+                vetores[i] = vetor
+        return np.stack(vetores)
+
+    def _lote(self, textos):
+        np = self.np
+        codificados = self.tokenizer.encode_batch(textos)
+        mascara = np.array([c.attention_mask for c in codificados], dtype=np.int64)
+        alimentacao = {
+            "input_ids": np.array([c.ids for c in codificados], dtype=np.int64),
+            "attention_mask": mascara,
+            "token_type_ids": np.array([c.type_ids for c in codificados], dtype=np.int64),
+        }
+        estados = self.sessao.run(
+            None, {nome: valor for nome, valor in alimentacao.items() if nome in self.entradas}
+        )[0]
+
+        # Mean pooling só sobre os tokens reais, depois norma 1
+        peso = mascara[:, :, None].astype(np.float32)
+        media = (estados * peso).sum(axis=1) / np.clip(peso.sum(axis=1), 1e-9, None)
+        return media / np.clip(np.linalg.norm(media, axis=1, keepdims=True), 1e-12, None)
+
+
+def exportar_onnx(pasta, opset=17):
+    """
+    Exporta o transformer do MiniLM para ONNX (fp32) e gera a versão com
+    quantização int8 dinâmica dos pesos. Precisa de torch (só aqui).
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(pasta, exist_ok=True)
+    modelo = SentenceTransformer(NOME_MODELO, device="cpu")
+    transformer = modelo[0].auto_model.eval()
+    tokenizer = modelo.tokenizer
+
+    exemplo = tokenizer(["laudo pericial de exemplo"], return_tensors="pt")
+    nomes = ["input_ids", "attention_mask", "token_type_ids"]
+    eixos = {nome: {0: "lote", 1: "sequencia"} for nome in nomes}
+    eixos["last_hidden_state"] = {0: "lote", 1: "sequencia"}
+    caminho_fp32 = os.path.join(pasta, ARQUIVO_FP32)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(exemplo[nome] for nome in nomes),
+            caminho_fp32,
+            input_names=nomes,
+            output_names=["last_hidden_state"],
+            dynamic_axes=eixos,
+            opset_version=opset,
+            dynamo=False,
+        )
+
+    quantize_dynamic(
+        caminho_fp32, os.path.join(pasta, ARQUIVO_INT8), weight_type=QuantType.QInt8
+    )
+
+    tokenizer.backend_tokenizer.save(os.path.join(pasta, ARQUIVO_TOKENIZER))
+    with open(os.path.join(pasta, ARQUIVO_CONFIG), "w", encoding="utf-8") as arquivo:
+        json.dump(
+            {
+                "modelo": NOME_MODELO,
+                "max_seq_length": modelo.max_seq_length,
+                "pad_id": tokenizer.pad_token_id,
+                "pad_token": tokenizer.pad_token,
+            },
+            arquivo,
+        )
+    return modelo
+
+
+def similaridade_minima(referencia, candidato):
+    """Menor cosseno entre vetores correspondentes (ambos já com norma 1)."""
+    import numpy as np
+
+    referencia = np.asarray(referencia, dtype=np.float32)
+    candidato = np.asarray(candidato, dtype=np.float32)
+    return float((referencia * candidato).sum(axis=1).min())
+
+
+AMOSTRA_PADRAO = [
+    "Laudo de exame pericial em local de acidente de trânsito com vítima.",
+    "Foram encontradas marcas de frenagem de 23 metros no asfalto seco.",
+    "O material apreendido apresentou resultado positivo para THC.",
+    "Exame de corpo de delito: lesões contusas na região frontal.",
+    "Vestígios de arrombamento na porta dos fundos do imóvel.",
+    "A arma de fogo foi submetida a exame de eficiência e prestabilidade.",
+    "Perícia em aparelho celular para extração de dados.",
+    "O veículo apresentava danos na parte frontal compatíveis com colisão.",
+]
+
+
+def textos_de_amostra(limite=200):
+    """Chunks dos laudos de referência já extraídos (ou frases de exemplo)."""
+    from .models import LaudoReferencia
+
+    textos = []
+    for texto in (
+        LaudoReferencia.objects.exclude(texto_extraido="")
+        .order_by("id")
+        .values_list("texto_extraido", flat=True)
+        .iterator()
+    ):
+        palavras = texto.split()
+        for i in range(0, len(palavras), 500):
+            textos.append(" ".join(palavras[i : i + 500]))
+            if len(textos) >= limite:
+                return textos
+    return textos or AMOSTRA_PADRAO
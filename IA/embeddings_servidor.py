@@ -0,0 +1,262 @@
+"""
+Servidor local de embeddings/busca (comando servidor_embeddings).
+
+Um único processo mantém o modelo MiniLM e o ChromaDB abertos e atende os
+workers do gunicorn por um socket Unix. Pedidos de `encode` que chegam ao
+mesmo tempo são agrupados numa só chamada ao modelo (micro-batching).
+
+Protocolo: cada mensagem é um JSON precedido do tamanho em 4 bytes
+(big-endian). Resposta: {"ok": true, ...} ou {"ok": false, "erro": "..."}.
+"""
+
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_TAMANHO = struct.Struct(">I")
+
+
+# Operações sem efeito no servidor: falha no meio da conversa -> fallback local
+OPERACOES_LEITURA = {"encode", "buscar_similares"}
+
+
+class ServidorIndisponivel(Exception):
+    """Socket inexistente ou recusando conexão: usar o modelo no processo."""
+
+
+class ServidorJaAtivo(Exception):
+    """Outro processo já atende no caminho do socket."""
+
+
+def enviar(conexao, mensagem):
+    dados = json.dumps(mensagem, ensure_ascii=False).encode("utf-8")
+    conexao.sendall(_TAMANHO.pack(len(dados)) + dados)
+
+
+def _ler_exato(conexao, tamanho):
+    partes = []
+    while tamanho:
+        parte = conexao.recv(min(tamanho, 1 << 20))
+        if not parte:
+            return None
+        partes.append(parte)
+        tamanho -= len(parte)
+    return b"".join(partes)
+
+
+def receber(conexao):
+    """Próxima mensagem da conexão ou None se o outro lado fechou."""
+    cabecalho = _ler_exato(conexao, _TAMANHO.size)
+    if cabecalho is None:
+        return None
+    dados = _ler_exato(conexao, _TAMANHO.unpack(cabecalho)[0])
+    if dados is None:
+        return None
+    return json.loads(dados)
+
+
+# ============================================================================
+# CLIENTE (usado pelo LaudoRAGService nos workers)
+# ============================================================================
+class ClienteEmbeddings:
+    def __init__(self, caminho, timeout=60):
+        self.caminho = caminho
+        self.timeout = timeout
+
+    def chamar(self, operacao, **dados):
+        """
+        Executa a operação no servidor. Sem conexão, sempre
+        ServidorIndisponivel. Timeout, pipe quebrado ou resposta truncada
+        também viram ServidorIndisponivel nas leituras (o chamador refaz no
+        processo). Numa escrita o servidor pode ter aplicado a operação; o
+        erro sobe sem fallback para o worker não escrever no ChromaDB junto
+        com o servidor.
+        """
+        conexao = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conexao.settimeout(self.timeout)
+        try:
+            try:
+                conexao.connect(self.caminho)
+            except OSError as e:
+                raise ServidorIndisponivel(str(e)) from e
+            try:
+                enviar(conexao, {"op": operacao, **dados})
+                resposta = receber(conexao)
+            except (OSError, struct.error) as e:
+                if operacao in OPERACOES_LEITURA:
+                    raise ServidorIndisponivel(f"{operacao}: {e!r}") from e
+                raise
+        finally:
+            conexao.close()
+
+        if resposta is None:
+            if operacao in OPERACOES_LEITURA:
+                raise ServidorIndisponivel("conexão encerrada pelo servidor")
+            raise ConnectionError(
+                f"Servidor de embeddings encerrou a conexão durante {operacao}"
+            )
+        if not resposta.pop("ok", False):
+            raise RuntimeError(f"Servidor de embeddings: {resposta.get('erro')}")
+        return resposta
+
+
+# ============================================================================
+# SERVIDOR
+# ============================================================================
+def preparar_socket(caminho):
+    """
+    Cria a pasta do socket (só o dono acessa) e apaga o socket que sobrou de
+    um servidor encerrado. Não apaga arquivos que não sejam socket nem um
+    socket em que alguém ainda atende (ServidorJaAtivo).
+    """
+    os.makedirs(os.path.dirname(caminho) or ".", mode=0o700, exist_ok=True)
+    try:
+        modo = os.lstat(caminho).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(modo):
+        raise FileExistsError(f"{caminho} existe e não é um socket")
+    try:
+        ClienteEmbeddings(caminho, timeout=2).chamar("ping")
+    except ServidorIndisponivel:
+        os.remove(caminho)  # ninguém escutando: sobra de execução anterior
+        return
+    except Exception as e:
+        raise ServidorJaAtivo(f"{caminho} está em uso por outro processo") from e
+    raise ServidorJaAtivo(f"Já existe um servidor de embeddings em {caminho}")
+
+
+class AgrupadorEncode:
+    """
+    Junta os textos de pedidos simultâneos e chama o modelo uma vez por lote
+    (até `lote_maximo` textos ou `espera` segundos após o primeiro pedido).
+    """
+
+    def __init__(self, codificar, lote_maximo=64, espera=0.005):
+        self.codificar = codificar
+        self.lote_maximo = lote_maximo
+        self.espera = espera
+        self.fila = queue.Queue()
+        self.lotes = 0
+        self.textos = 0
+        threading.Thread(target=self._executar, daemon=True).start()
+
+    def encode(self, textos):
+        if not textos:
+            return []
+        futuro = Future()
+        self.fila.put((textos, futuro))
+        return futuro.result()
+
+    def _coletar(self):
+        pedidos = [self.fila.get()]
+        total = len(pedidos[0][0])
+        limite = time.monotonic() + self.espera
+        while total < self.lote_maximo:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                pedido = self.fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            pedidos.append(pedido)
+            total += len(pedido[0])
+        return pedidos
+
+    def _executar(self):
+        while True:
+            pedidos = self._coletar()
+            textos = [texto for lote, _ in pedidos for texto in lote]
+            try:
+                vetores = self.codificar(textos)
+            except Exception as e:
+                for _, futuro in pedidos:
+                    futuro.set_exception(e)
+                continue
+            self.lotes += 1
+            self.textos += len(textos)
+            inicio = 0
+            for lote, futuro in pedidos:
+                futuro.set_result(vetores[inicio : inicio + len(lote)])
+                inicio += len(lote)
+
+
+class _Atendimento(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                pedido = receber(self.request)
+            except (OSError, ValueError):
+                return
+            if pedido is None:
+                return
+            try:
+                resposta = {"ok": True, **self.server.despachar(pedido)}
+            except Exception as e:
+                logger.exception(f"Erro no pedido {pedido.get('op')!r}")
+                resposta = {"ok": False, "erro": str(e)}
+            try:
+                enviar(self.request, resposta)
+            except OSError:
+                return
+
+
+class ServidorEmbeddings(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Fila de conexões pendentes; a padrão (5) recusa rajadas dos workers
+    request_queue_size = 128
+
+    def __init__(self, caminho, rag, lote_maximo=64, espera=0.005):
+        self.rag = rag
+        self.agrupador = AgrupadorEncode(
+            lambda textos: rag.model.encode(textos, batch_size=lote_maximo).tolist(),
+            lote_maximo=lote_maximo,
+            espera=espera,
+        )
+        # Leituras do Chroma em paralelo; escritas uma de cada vez
+        self.escrita = threading.Lock()
+        preparar_socket(caminho)
+        super().__init__(caminho, _Atendimento)
+        os.chmod(caminho, 0o660)
+
+    def despachar(self, pedido):
+        operacao = pedido.get("op")
+        if operacao == "ping":
+            return {"lotes": self.agrupador.lotes, "textos": self.agrupador.textos}
+        if operacao == "encode":
+            return {"embeddings": self.agrupador.encode(pedido["textos"])}
+        if operacao == "buscar_similares":
+            embedding = self.agrupador.encode([pedido["pergunta"]])
+            return {
+                "documentos": self.rag.consultar(
+                    embedding, pedido.get("tipo_exame"), pedido.get("n_results", 3)
+                )
+            }
+        if operacao == "upsert":
+            embeddings = pedido.get("embeddings") or self.agrupador.encode(
+                pedido["documentos"]
+            )
+            with self.escrita:
+                self.rag.collection.upsert(
+                    ids=pedido["ids"],
+                    embeddings=embeddings,
+                    documents=pedido["documentos"],
+                    metadatas=pedido["metadados"],
+                )
+            return {"gravados": len(pedido["ids"])}
+        if operacao == "remover":
+            with self.escrita:
+                self.rag.collection.delete(where=pedido["where"])
+            return {}
+        raise ValueError(f"Operação desconhecida: {operacao}")
@@ -0,0 +1,118 @@
+# IA/management/commands/benchmark_embeddings.py
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from IA.embeddings_backend import similaridade_minima, textos_de_amostra
+
+# Cada backend roda num processo novo: o RSS medido é só dele
+SCRIPT = """
+import json, resource, sys, time
+import django
+django.setup()
+from IA.embeddings_backend import obter_modelo_embeddings
+
+with open(sys.argv[1], encoding="utf-8") as arquivo:
+    entrada = json.load(arquivo)
+textos, perguntas = entrada["textos"], entrada["perguntas"]
+
+inicio = time.perf_counter()
+modelo = obter_modelo_embeddings(entrada["backend"])
+modelo.encode(["aquecimento"])
+carga = time.perf_counter() - inicio
+
+latencias = []
+for pergunta in perguntas:
+    inicio = time.perf_counter()
+    modelo.encode([pergunta])
+    latencias.append((time.perf_counter() - inicio) * 1000)
+latencias.sort()
+
+inicio = time.perf_counter()
+vetores = modelo.encode(textos, batch_size=32)
+duracao = time.perf_counter() - inicio
+
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "carga_s": carga,
+    "latencia_p50_ms": latencias[len(latencias) // 2],
+    "latencia_p95_ms": latencias[int(len(latencias) * 0.95)],
+    "textos_por_s": len(textos) / duracao,
+    "rss_mb": rss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    "vetores": vetores.tolist(),
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara os backends de embeddings (torch x ONNX int8): tempo de carga, "
+        "latência de uma pergunta, vazão em lote, RSS e compatibilidade dos vetores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--textos", type=int, default=200, help="Chunks para medir a vazão (padrão: 200)"
+        )
+        parser.add_argument(
+            "--perguntas", type=int, default=50, help="Perguntas para a latência (padrão: 50)"
+        )
+
+    def handle(self, *args, **options):
+        textos = textos_de_amostra(options["textos"])
+        perguntas = [" ".join(texto.split()[:15]) for texto in textos]
+        perguntas = (perguntas * options["perguntas"])[: options["perguntas"]]
+
+        resultados = {
+            backend: self.medir(backend, textos, perguntas) for backend in ("torch", "onnx")
+        }
+        similaridade = similaridade_minima(
+            resultados["torch"].pop("vetores"), resultados["onnx"].pop("vetores")
+        )
+
+        self.stdout.write("=" * 72)
+        self.stdout.write(
+            f"{'Backend':<10}{'Carga':>9}{'p50':>10}{'p95':>10}{'Textos/s':>12}{'RSS':>10}"
+        )
+        for backend, r in resultados.items():
+            self.stdout.write(
+                f"{backend:<10}{r['carga_s']:>8.1f}s{r['latencia_p50_ms']:>8.1f}ms"
+                f"{r['latencia_p95_ms']:>8.1f}ms{r['textos_por_s']:>12.1f}{r['rss_mb']:>8.0f}MB"
+            )
+        self.stdout.write("=" * 72)
+        self.stdout.write(
+            f"Textos: {len(textos)}  |  threads ONNX: {settings.IA_ONNX_THREADS or 'auto'}  |  "
+            f"menor cosseno ONNX x torch: {similaridade:.4f}"
+        )
+
+        if similaridade < settings.IA_ONNX_SIMILARIDADE_MINIMA:
+            raise CommandError(
+                f"Vetores ONNX fora da tolerância ({similaridade:.4f} < "
+                f"{settings.IA_ONNX_SIMILARIDADE_MINIMA})."
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Vetores ONNX compatíveis com a coleção existente."))
+
+    def medir(self, backend, textos, perguntas):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".json", encoding="utf-8", delete=False
+        ) as arquivo:
+            json.dump({"backend": backend, "textos": textos, "perguntas": perguntas}, arquivo)
+        try:
+            processo = subprocess.run(
+                [sys.executable, "-c", SCRIPT, arquivo.name],
+                cwd=settings.BASE_DIR,
+                env=dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE),
+                capture_output=True,
+                text=True,
+            )
+        finally:
+            os.remove(arquivo.name)
+        if processo.returncode != 0:
+            raise CommandError(f"{backend}: {processo.stderr.strip().splitlines()[-1]}")
+        return json.loads(processo.stdout.strip().splitlines()[-1])
@@ -0,0 +1,93 @@
+# IA/management/commands/benchmark_inicializacao.py
+
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MODULOS_PESADOS = ("torch", "sentence_transformers", "onnxruntime", "chromadb", "groq")
+
+# Executado num processo novo, como um worker do gunicorn subindo
+SCRIPT = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns  # importa spr.urls e IA.views, como no 1º request
+if {ansioso}:
+    from IA.ai_service import obter_ai_service
+    servico = obter_ai_service()
+    servico.client, servico.rag.collection, servico.rag.model
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "segundos": time.perf_counter() - inicio,
+    "rss_mb": rss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    "pesados": [m for m in {pesados!r} if m in sys.modules],
+}}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o boot de um worker (django.setup + URLconf) com o serviço de IA "
+        "carregado sob demanda e com o carregamento antigo, na importação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeticoes", type=int, default=3, help="Processos por modo (padrão: 3)"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=20,
+            help="Workers do gunicorn para estimar a memória total (padrão: 20)",
+        )
+
+    def handle(self, *args, **options):
+        sob_demanda = self.medir(False, options["repeticoes"])
+        if sob_demanda["pesados"]:
+            raise CommandError(
+                "O boot importou módulos pesados: " + ", ".join(sob_demanda["pesados"])
+            )
+        na_importacao = self.medir(True, options["repeticoes"])
+
+        workers = options["workers"]
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"{'Modo':<16}{'Boot':>10}{'RSS':>12}{f'x{workers} workers':>18}")
+        for nome, r in (("na importação", na_importacao), ("sob demanda", sob_demanda)):
+            self.stdout.write(
+                f"{nome:<16}{r['segundos']:>9.2f}s{r['rss_mb']:>10.0f}MB"
+                f"{r['rss_mb'] * workers / 1024:>15.1f}GB"
+            )
+        self.stdout.write("=" * 60)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Boot {na_importacao['segundos'] - sob_demanda['segundos']:.2f}s "
+                f"mais rápido e {na_importacao['rss_mb'] - sob_demanda['rss_mb']:.0f}MB "
+                f"a menos por worker; {', '.join(MODULOS_PESADOS)} só no 1º uso."
+            )
+        )
+
+    def medir(self, ansioso, repeticoes):
+        """Mediana de `repeticoes` processos novos."""
+        script = SCRIPT.format(ansioso=ansioso, pesados=MODULOS_PESADOS)
+        ambiente = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        resultados = []
+        for _ in range(repeticoes):
+            processo = subprocess.run(
+                [sys.executable, "-c", script],
+                cwd=settings.BASE_DIR,
+                env=ambiente,
+                capture_output=True,
+                text=True,
+            )
+            if processo.returncode != 0:
+                raise CommandError(processo.stderr.strip().splitlines()[-1])
+            resultados.append(json.loads(processo.stdout.strip().splitlines()[-1]))
+        resultados.sort(key=lambda r: r["segundos"])
+        return resultados[len(resultados) // 2]
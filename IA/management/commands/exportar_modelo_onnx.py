@@ -0,0 +1,70 @@
+# IA/management/commands/exportar_modelo_onnx.py
+
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from IA.embeddings_backend import (
+    ARQUIVO_FP32,
+    ARQUIVO_INT8,
+    ModeloOnnx,
+    exportar_onnx,
+    similaridade_minima,
+    textos_de_amostra,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta o all-MiniLM-L6-v2 para ONNX com quantização int8 dinâmica e "
+        "confere se os vetores são compatíveis com a coleção gerada pelo torch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pasta",
+            type=str,
+            default=settings.IA_ONNX_DIR,
+            help=f"Destino dos arquivos (padrão: {settings.IA_ONNX_DIR})",
+        )
+        parser.add_argument(
+            "--similaridade-minima",
+            type=float,
+            default=settings.IA_ONNX_SIMILARIDADE_MINIMA,
+            help="Cosseno mínimo aceito entre ONNX int8 e torch "
+            f"(padrão: {settings.IA_ONNX_SIMILARIDADE_MINIMA})",
+        )
+
+    def handle(self, *args, **options):
+        pasta = options["pasta"]
+        self.stdout.write(f"📦 Exportando para {pasta}...")
+        inicio = time.perf_counter()
+        modelo_torch = exportar_onnx(pasta)
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Exportado e quantizado em {time.perf_counter() - inicio:.1f}s")
+        )
+        for arquivo in (ARQUIVO_FP32, ARQUIVO_INT8):
+            tamanho = os.path.getsize(os.path.join(pasta, arquivo)) / (1024 * 1024)
+            self.stdout.write(f"   {arquivo}: {tamanho:.1f} MB")
+
+        textos = textos_de_amostra()
+        referencia = modelo_torch.encode(textos, batch_size=32)
+        similaridade = similaridade_minima(
+            referencia, ModeloOnnx(pasta).encode(textos, batch_size=32)
+        )
+        self.stdout.write(
+            f"🔍 Menor cosseno ONNX int8 x torch em {len(textos)} textos: {similaridade:.4f}"
+        )
+        if similaridade < options["similaridade_minima"]:
+            os.remove(os.path.join(pasta, ARQUIVO_INT8))
+            raise CommandError(
+                f"Vetores fora da tolerância ({similaridade:.4f} < "
+                f"{options['similaridade_minima']}): modelo int8 descartado."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "✅ Compatível com a coleção existente. Ative com IA_EMBEDDINGS_BACKEND=onnx"
+            )
+        )
@@ -1,75 +1,170 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
 from django.core.management.base import BaseCommand
+from django.db import connections
 from IA.models import LaudoReferencia
-from IA.rag_service import LaudoRAGService
+from IA.rag_service import LaudoRAGService, preparar_pdf
+
+CAMPOS_INDEXACAO = ['texto_extraido', 'hash_conteudo', 'total_chunks', 'processado']
+
 
 class Command(BaseCommand):
-    help = 'Indexa laudos no banco vetorial (ChromaDB)'
+    help = 'Indexa laudos no banco vetorial (ChromaDB): em paralelo e só o que mudou'
 
     def add_arguments(self, parser):
-        parser.add_argument('--forcar', action='store_true', help='Reindexar todos')
+        parser.add_argument(
+            '--forcar', action='store_true', help='Reindexar todos, mesmo os PDFs inalterados'
+        )
+        parser.add_argument(
+            '--processos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processos extraindo texto dos PDFs (padrão: núcleos da máquina)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=256,
+            help='Chunks por lote de embeddings/gravação, somando vários laudos (padrão: 256)',
+        )
 
     def handle(self, *args, **options):
         forcar = options['forcar']
-        
-        # Filtra laudos não processados
-        if forcar:
-            laudos = LaudoReferencia.objects.all()
-        else:
-            laudos = LaudoReferencia.objects.filter(processado=False)
-        
-        total = laudos.count()
-        
+
+        # Todos os laudos: o hash do PDF decide o que precisa ser refeito
+        laudos = [
+            laudo
+            for laudo in LaudoReferencia.objects.defer('texto_extraido').order_by('id')
+            if laudo.arquivo_pdf
+        ]
+        total = len(laudos)
+
         if total == 0:
             self.stdout.write(self.style.WARNING('⚠️  Nenhum laudo para processar'))
             return
-        
+
         self.stdout.write('=' * 60)
         self.stdout.write(self.style.SUCCESS('🧠 INDEXAÇÃO DE LAUDOS (Vetorização)'))
         self.stdout.write('=' * 60)
-        self.stdout.write(f'📚 Total a processar: {total} laudos')
-        self.stdout.write('⏳ Isso pode demorar alguns minutos...')
+        self.stdout.write(f'📚 Laudos cadastrados: {total}')
+        self.stdout.write(f'⚙️  Extração em {options["processos"]} processos, lotes de {options["lote"]} chunks')
         self.stdout.write('=' * 60)
-        
-        # Inicializa serviço RAG
-        self.stdout.write('\n📥 Carregando modelo de embeddings...')
+
         rag = LaudoRAGService()
-        self.stdout.write(self.style.SUCCESS('✅ Modelo carregado!\n'))
-        
-        sucesso = 0
-        falhas = 0
-        
-        for i, laudo in enumerate(laudos, 1):
-            self.stdout.write(f'[{i}/{total}] {laudo.titulo}...')
-            
-            try:
-                # Indexa no ChromaDB
-                pdf_path = laudo.arquivo_pdf.path
-                chunks = rag.indexar_laudo(laudo.id, pdf_path, laudo.tipo_exame)
-                
-                self.stdout.write(self.style.SUCCESS(f'🔢 Gerando embeddings para {chunks} chunks...'))
-                self.stdout.write(self.style.SUCCESS(f'✅ Indexado: {laudo.titulo} ({chunks} chunks)'))
-                
-                # Marca como processado
-                laudo.processado = True
-                laudo.save()
-                
-                sucesso += 1
-                self.stdout.write(self.style.SUCCESS('   ✅ Sucesso\n'))
-                
-            except Exception as e:
-                falhas += 1
-                self.stdout.write(self.style.ERROR(f'   ❌ ERRO: {str(e)}\n'))
-        
+        self.indexados = 0
+        self.falhas = 0
+        inalterados = 0
+        referencias = []  # já indexados antes do hash existir: só registra o hash
+        total_referencias = 0
+        pendentes = []
+        chunks_pendentes = 0
+
+        # Os processos filhos não podem herdar conexões abertas com o banco
+        connections.close_all()
+        # Poucos PDFs em voo por vez: textos extraídos não se acumulam na
+        # memória enquanto a gravação (embeddings) anda mais devagar
+        janela = options['processos'] * 4
+        restantes = iter(laudos)
+        futuros = {}
+        i = 0
+        with ProcessPoolExecutor(max_workers=options['processos']) as pool:
+            while True:
+                for laudo in islice(restantes, janela - len(futuros)):
+                    futuro = pool.submit(
+                        preparar_pdf,
+                        laudo.arquivo_pdf.path,
+                        None if forcar else laudo.hash_conteudo or None,
+                    )
+                    futuros[futuro] = laudo
+                if not futuros:
+                    break
+                prontos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    laudo = futuros.pop(futuro)
+                    i += 1
+                    try:
+                        resumo, texto = futuro.result()
+                    except Exception as e:
+                        # Sem texto não apaga chunks nem grava o hash
+                        self.falhas += 1
+                        self.stdout.write(self.style.ERROR(f'[{i}/{total}] ❌ {laudo.titulo}: {e}'))
+                        continue
+
+                    if texto is None:
+                        inalterados += 1
+                        continue
+
+                    novo_hash = not laudo.hash_conteudo
+                    laudo.texto_extraido = texto
+                    laudo.hash_conteudo = resumo
+                    if novo_hash and laudo.processado and not forcar:
+                        referencias.append(laudo)
+                        if len(referencias) >= 100:
+                            self.registrar_hashes(referencias)
+                            total_referencias += len(referencias)
+                            referencias = []
+                        continue
+
+                    chunks = rag.dividir_em_chunks(texto)
+                    pendentes.append((laudo, chunks))
+                    chunks_pendentes += len(chunks)
+                    self.stdout.write(f'[{i}/{total}] 📄 {laudo.titulo} ({len(chunks)} chunks)')
+
+                    if chunks_pendentes >= options['lote']:
+                        self.gravar(rag, pendentes, options['lote'])
+                        pendentes = []
+                        chunks_pendentes = 0
+
+        if pendentes:
+            self.gravar(rag, pendentes, options['lote'])
+        if referencias:
+            self.registrar_hashes(referencias)
+            total_referencias += len(referencias)
+
         # Resumo final
         self.stdout.write('\n' + '=' * 60)
         self.stdout.write(self.style.SUCCESS('📊 RESUMO'))
         self.stdout.write('=' * 60)
-        self.stdout.write(self.style.SUCCESS(f'✅ Sucesso: {sucesso}'))
-        if falhas > 0:
-            self.stdout.write(self.style.ERROR(f'❌ Falhas: {falhas}'))
+        self.stdout.write(self.style.SUCCESS(f'✅ Indexados: {self.indexados}'))
+        self.stdout.write(f'⏭️  Inalterados (mesmo hash): {inalterados}')
+        if total_referencias:
+            self.stdout.write(f'🔖 Hash registrado (já indexados): {total_referencias}')
+        if self.falhas > 0:
+            self.stdout.write(self.style.ERROR(f'❌ Falhas: {self.falhas}'))
         self.stdout.write(f'📊 Total: {total}')
         self.stdout.write('=' * 60)
-        
-        if sucesso > 0:
+
+        if self.indexados > 0:
             self.stdout.write(self.style.SUCCESS('\n🎉 Banco vetorial pronto para uso!'))
-            self.stdout.write(self.style.SUCCESS('🚀 Agora você pode testar o chat com a IA\n'))
\ No newline at end of file
+            self.stdout.write(self.style.SUCCESS('🚀 Agora você pode testar o chat com a IA\n'))
+
+    def registrar_hashes(self, laudos):
+        LaudoReferencia.objects.bulk_update(
+            laudos, ['texto_extraido', 'hash_conteudo'], batch_size=100
+        )
+
+    def gravar(self, rag, pendentes, lote):
+        """Embeddings + upsert de vários laudos de uma vez e marca como processados."""
+        # Indexados antes do índice do chunk nos metadados: apaga tudo antes
+        legados = [laudo.id for laudo, _ in pendentes if laudo.processado and not laudo.total_chunks]
+        try:
+            chunks = rag.indexar_documentos(
+                [(laudo.id, laudo.tipo_exame, chunks) for laudo, chunks in pendentes],
+                lote=lote,
+                legados=legados,
+            )
+        except Exception as e:
+            self.falhas += len(pendentes)
+            self.stdout.write(self.style.ERROR(f'   ❌ ERRO no lote de {len(pendentes)} laudos: {e}'))
+            return
+
+        for laudo, chunks_laudo in pendentes:
+            laudo.total_chunks = len(chunks_laudo)
+            laudo.processado = True
+        LaudoReferencia.objects.bulk_update(
+            [laudo for laudo, _ in pendentes], CAMPOS_INDEXACAO, batch_size=100
+        )
+        self.indexados += len(pendentes)
+        self.stdout.write(self.style.SUCCESS(f'   ✅ Lote gravado: {len(pendentes)} laudos, {chunks} chunks'))
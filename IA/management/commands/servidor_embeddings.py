@@ -0,0 +1,87 @@
+# IA/management/commands/servidor_embeddings.py
+
+import os
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from IA.embeddings_servidor import (
+    ServidorEmbeddings,
+    ServidorJaAtivo,
+    preparar_socket,
+)
+from IA.rag_service import LaudoRAGService
+
+
+class Command(BaseCommand):
+    help = (
+        "Servidor local de embeddings e busca (socket Unix): um único processo "
+        "com o modelo MiniLM e o ChromaDB, compartilhado pelos workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            type=str,
+            default=settings.IA_EMBEDDINGS_SOCKET,
+            help=f"Caminho do socket (padrão: {settings.IA_EMBEDDINGS_SOCKET})",
+        )
+        parser.add_argument(
+            "--lote-maximo",
+            type=int,
+            default=64,
+            help="Textos por chamada ao modelo (padrão: 64)",
+        )
+        parser.add_argument(
+            "--espera-ms",
+            type=float,
+            default=5,
+            help="Espera por outros pedidos antes de rodar o lote (padrão: 5 ms)",
+        )
+
+    def handle(self, *args, **options):
+        caminho = options["socket"]
+        if not caminho:
+            raise CommandError("Informe --socket ou IA_EMBEDDINGS_SOCKET.")
+        # Antes de carregar o modelo: não sobe um segundo servidor
+        try:
+            preparar_socket(caminho)
+        except (ServidorJaAtivo, FileExistsError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write("📥 Carregando modelo de embeddings e ChromaDB...")
+        inicio = time.perf_counter()
+        rag = LaudoRAGService(usar_servidor=False)
+        rag.model, rag.collection
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Carregado em {time.perf_counter() - inicio:.1f}s")
+        )
+
+        servidor = ServidorEmbeddings(
+            caminho,
+            rag,
+            lote_maximo=options["lote_maximo"],
+            espera=options["espera_ms"] / 1000,
+        )
+
+        def encerrar(*_):
+            # shutdown() espera o serve_forever: precisa vir de outra thread
+            threading.Thread(target=servidor.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, encerrar)
+        signal.signal(signal.SIGINT, encerrar)
+
+        self.stdout.write(self.style.SUCCESS(f"🧠 Atendendo em {caminho}"))
+        try:
+            servidor.serve_forever()
+        finally:
+            servidor.server_close()
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            self.stdout.write(
+                f"Encerrado: {servidor.agrupador.textos} textos em "
+                f"{servidor.agrupador.lotes} lotes."
+            )
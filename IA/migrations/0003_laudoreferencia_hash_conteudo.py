@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('IA', '0002_remove_laudogerado_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='laudoreferencia',
+            name='hash_conteudo',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='laudoreferencia',
+            name='total_chunks',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
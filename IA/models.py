@@ -9,6 +9,9 @@ class LaudoReferencia(models.Model):
     arquivo_pdf = models.FileField(upload_to='laudos_referencia/')
     texto_extraido = models.TextField(blank=True)
     processado = models.BooleanField(default=False)
+    # SHA-256 do PDF na última indexação (indexar_laudos pula os inalterados)
+    hash_conteudo = models.CharField(max_length=64, blank=True, default='')
+    total_chunks = models.PositiveIntegerField(default=0)
     pasta_origem = models.CharField(max_length=500, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
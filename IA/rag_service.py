@@ -1,32 +1,88 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
+import hashlib
+import logging
+import time
+
 import PyPDF2
 from django.conf import settings
+from django.utils.functional import cached_property
 import os
 
+from .embeddings_backend import obter_modelo_embeddings
+from .embeddings_servidor import ClienteEmbeddings, ServidorIndisponivel
+
+logger = logging.getLogger(__name__)
+
+# chromadb e o backend de embeddings só são importados no primeiro uso:
+# importar este módulo não custa memória nem tempo de boot do worker
+
+INTERVALO_NOVA_TENTATIVA = 30
+
+
+def extrair_texto_pdf(pdf_path):
+    """
+    Extrai texto de um PDF (função solta: roda num pool de processos).
+    Erros de leitura sobem: um texto vazio apagaria os chunks do laudo.
+    """
+    texto = ""
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            texto += (page.extract_text() or "") + "\n"
+    return texto
+
+
+def hash_arquivo(caminho):
+    """SHA-256 do conteúdo do arquivo"""
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def preparar_pdf(caminho, hash_anterior=None):
+    """
+    (hash, texto) do PDF; texto None quando o hash bate com `hash_anterior`
+    (arquivo não mudou desde a última indexação). Falha na extração sobe.
+    """
+    resumo = hash_arquivo(caminho)
+    if resumo == hash_anterior:
+        return resumo, None
+    return resumo, extrair_texto_pdf(caminho)
+
 
 class LaudoRAGService:
-    """Serviço para indexar e buscar laudos usando RAG"""
-    
-    def __init__(self):
-        # ChromaDB (banco vetorial)
-        self.client = chromadb.PersistentClient(path="./chroma_db")
-        self.collection = self.client.get_or_create_collection(name="laudos")
-        
-        # Modelo de embeddings (converte texto em vetores)
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+    """
+    Serviço para indexar e buscar laudos usando RAG.
+
+    Com o servidor_embeddings no ar (socket em IA_EMBEDDINGS_SOCKET), modelo
+    e ChromaDB ficam só nele; sem o servidor, são carregados aqui mesmo.
+    """
+
+    def __init__(self, usar_servidor=True):
+        caminho = getattr(settings, 'IA_EMBEDDINGS_SOCKET', None)
+        self.cliente = ClienteEmbeddings(caminho) if usar_servidor and caminho else None
+        self._tentar_servidor_em = 0
+
+    @cached_property
+    def client(self):
+        """ChromaDB (banco vetorial)"""
+        import chromadb
+
+        return chromadb.PersistentClient(path="./chroma_db")
+
+    @cached_property
+    def collection(self):
+        return self.client.get_or_create_collection(name="laudos")
+
+    @cached_property
+    def model(self):
+        """Modelo de embeddings (torch ou ONNX int8, IA_EMBEDDINGS_BACKEND)"""
+        return obter_modelo_embeddings()
     
     def extrair_texto_pdf(self, pdf_path):
         """Extrai texto de um PDF"""
-        texto = ""
-        try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                for page in reader.pages:
-                    texto += page.extract_text() + "\n"
-        except Exception as e:
-            print(f"❌ Erro ao ler PDF: {e}")
-        return texto
+        return extrair_texto_pdf(pdf_path)
     
     def dividir_em_chunks(self, texto, tamanho=500):
         """Divide texto em pedaços menores"""
@@ -39,34 +95,78 @@ class LaudoRAGService:
     
     def indexar_laudo(self, laudo_id, pdf_path, tipo_exame):
         """Indexa um laudo no banco vetorial"""
-        # 1. Extrai texto do PDF
-        texto = self.extrair_texto_pdf(pdf_path)
-        
-        # 2. Divide em chunks
-        chunks = self.dividir_em_chunks(texto)
-        
-        # 3. Gera embeddings
-        embeddings = self.model.encode(chunks).tolist()
-        
-        # 4. Salva no ChromaDB
-        ids = [f"{laudo_id}_chunk_{i}" for i in range(len(chunks))]
-        metadatas = [{"laudo_id": laudo_id, "tipo_exame": tipo_exame} for _ in chunks]
-        
-        self.collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=chunks,
-            metadatas=metadatas
-        )
-        
+        chunks = self.dividir_em_chunks(self.extrair_texto_pdf(pdf_path))
+        self.indexar_documentos([(laudo_id, tipo_exame, chunks)])
         return len(chunks)
+
+    def indexar_documentos(self, documentos, lote=64, legados=()):
+        """
+        Indexa vários laudos de uma vez: [(laudo_id, tipo_exame, chunks)].
+        Embeddings em lotes que atravessam documentos, upsert dos chunks e
+        remoção dos chunks que sobraram de uma versão anterior (maior) do
+        laudo. `legados`: laudos indexados antes do índice do chunk ir para
+        os metadados, apagados por inteiro antes do upsert.
+        """
+        for laudo_id in legados:
+            self._remover({"laudo_id": laudo_id})
+
+        ids, textos, metadatas = [], [], []
+        for laudo_id, tipo_exame, chunks in documentos:
+            for i, chunk in enumerate(chunks):
+                ids.append(f"{laudo_id}_chunk_{i}")
+                textos.append(chunk)
+                metadatas.append({"laudo_id": laudo_id, "tipo_exame": tipo_exame, "chunk": i})
+
+        embeddings = []
+        for inicio in range(0, len(textos), lote):
+            embeddings += self.encode(textos[inicio:inicio + lote])
+        if ids:
+            self._upsert(ids, embeddings, textos, metadatas)
+
+        for laudo_id, _tipo_exame, chunks in documentos:
+            self._remover(
+                {"$and": [{"laudo_id": laudo_id}, {"chunk": {"$gte": len(chunks)}}]}
+            )
+        return len(ids)
+
+    def _upsert(self, ids, embeddings, textos, metadatas):
+        # No servidor: um só processo escreve no ChromaDB
+        if self._servidor(
+            "upsert", ids=ids, embeddings=embeddings, documentos=textos, metadados=metadatas
+        ) is not None:
+            return
+        self.collection.upsert(
+            ids=ids, embeddings=embeddings, documents=textos, metadatas=metadatas
+        )
+
+    def _remover(self, where):
+        if self._servidor("remover", where=where) is not None:
+            return
+        self.collection.delete(where=where)
+
+    def encode(self, textos):
+        """Embeddings dos textos (lista de listas de float)"""
+        resposta = self._servidor("encode", textos=list(textos))
+        if resposta is not None:
+            return resposta["embeddings"]
+        return self.model.encode(list(textos), batch_size=64).tolist()
     
     def buscar_similares(self, pergunta, tipo_exame=None, n_results=3):
         """Busca laudos similares à pergunta"""
-        # Gera embedding da pergunta
-        query_embedding = self.model.encode([pergunta]).tolist()
-        
-        # Busca no ChromaDB
+        resposta = self._servidor(
+            "buscar_similares",
+            pergunta=pergunta,
+            tipo_exame=tipo_exame,
+            n_results=n_results,
+        )
+        if resposta is not None:
+            return resposta["documentos"]
+
+        # Gera embedding da pergunta e busca no ChromaDB
+        return self.consultar(self.model.encode([pergunta]).tolist(), tipo_exame, n_results)
+
+    def consultar(self, query_embedding, tipo_exame=None, n_results=3):
+        """Documentos mais próximos do embedding (já calculado)"""
         where_filter = {"tipo_exame": tipo_exame} if tipo_exame else None
         
         results = self.collection.query(
@@ -75,4 +175,21 @@ class LaudoRAGService:
             where=where_filter
         )
         
-        return results['documents'][0] if results['documents'] else []
\ No newline at end of file
+        return results['documents'][0] if results['documents'] else []
+
+    def _servidor(self, operacao, **dados):
+        """
+        Chama o servidor_embeddings. None se ele não estiver no ar: o chamador
+        usa o modelo no próprio processo e o servidor é tentado de novo depois
+        de INTERVALO_NOVA_TENTATIVA segundos.
+        """
+        if self.cliente is None or time.monotonic() < self._tentar_servidor_em:
+            return None
+        try:
+            return self.cliente.chamar(operacao, **dados)
+        except ServidorIndisponivel as e:
+            logger.warning(
+                f"Servidor de embeddings indisponível ({e}); usando o modelo local"
+            )
+            self._tentar_servidor_em = time.monotonic() + INTERVALO_NOVA_TENTATIVA
+            return None
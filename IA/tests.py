@@ -1,3 +1,172 @@
-from django.test import TestCase
+import os
+import socket
+import stat
+import tempfile
+import threading
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from reportlab.pdfgen import canvas
+
+from .embeddings_servidor import (
+    ClienteEmbeddings,
+    ServidorEmbeddings,
+    ServidorIndisponivel,
+    ServidorJaAtivo,
+    preparar_socket,
+)
+from .models import LaudoReferencia
+from .rag_service import LaudoRAGService
+
+
+class ClienteEmbeddingsFalhasTests(SimpleTestCase):
+    """Falhas depois do connect: leituras caem no fallback, escritas não."""
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.caminho = os.path.join(pasta.name, "embeddings.sock")
+        self.servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(self.servidor.close)
+        self.servidor.bind(self.caminho)
+        self.servidor.listen()
+
+    def atender(self, responder):
+        """Aceita uma conexão e entrega o socket para `responder`."""
+
+        def executar():
+            conexao, _ = self.servidor.accept()
+            with conexao:
+                responder(conexao)
+
+        thread = threading.Thread(target=executar, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+
+    def test_sem_servidor(self):
+        cliente = ClienteEmbeddings(self.caminho + ".inexistente")
+        with self.assertRaises(ServidorIndisponivel):
+            cliente.chamar("upsert", ids=[])
+
+    def test_timeout_na_leitura(self):
+        liberar = threading.Event()
+        self.atender(lambda conexao: liberar.wait(5))
+        self.addCleanup(liberar.set)  # antes do join (cleanups em ordem inversa)
+        with self.assertRaises(ServidorIndisponivel):
+            ClienteEmbeddings(self.caminho, timeout=0.2).chamar("encode", textos=["a"])
+
+    def test_resposta_truncada_na_leitura(self):
+        def cortar(conexao):
+            conexao.recv(1 << 16)
+            conexao.sendall(b"\x00\x00")  # metade do cabeçalho de tamanho
+
+        self.atender(cortar)
+        with self.assertRaises(ServidorIndisponivel):
+            ClienteEmbeddings(self.caminho).chamar("buscar_similares", pergunta="a")
+
+    def test_escrita_nao_vira_servidor_indisponivel(self):
+        self.atender(lambda conexao: conexao.recv(1 << 16))
+        with self.assertRaises(ConnectionError):
+            ClienteEmbeddings(self.caminho).chamar("remover", where={})
+
+
+class PrepararSocketTests(SimpleTestCase):
+    """O servidor só apaga o caminho do socket se ninguém atende nele."""
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.caminho = os.path.join(pasta.name, "run", "embeddings.sock")
+
+    def iniciar_servidor(self):
+        servidor = ServidorEmbeddings(self.caminho, rag=None)
+        thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        return servidor
+
+    def test_pasta_privada(self):
+        preparar_socket(self.caminho)
+        modo = os.stat(os.path.dirname(self.caminho)).st_mode
+        self.assertEqual(stat.S_IMODE(modo), 0o700)
+
+    def test_socket_abandonado_e_substituido(self):
+        os.makedirs(os.path.dirname(self.caminho))
+        abandonado = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        abandonado.bind(self.caminho)
+        abandonado.close()  # arquivo fica, sem ninguém escutando
+
+        self.iniciar_servidor()
+        self.assertIn("lotes", ClienteEmbeddings(self.caminho).chamar("ping"))
+
+    def test_recusa_se_outro_servidor_responde(self):
+        self.iniciar_servidor()
+
+        with self.assertRaises(ServidorJaAtivo):
+            ServidorEmbeddings(self.caminho, rag=None)
+        self.assertIn("lotes", ClienteEmbeddings(self.caminho).chamar("ping"))
+
+    def test_nao_apaga_arquivo_comum(self):
+        os.makedirs(os.path.dirname(self.caminho))
+        with open(self.caminho, "w") as arquivo:
+            arquivo.write("dados")
+
+        with self.assertRaises(FileExistsError):
+            preparar_socket(self.caminho)
+        with open(self.caminho) as arquivo:
+            self.assertEqual(arquivo.read(), "dados")
+
+
+@override_settings(IA_EMBEDDINGS_SOCKET="")
+class IndexarLaudosTests(TransactionTestCase):
+    """PDF ilegível conta como falha e não toca nos chunks nem no hash."""
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        media = override_settings(MEDIA_ROOT=pasta.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        pdf = BytesIO()
+        documento = canvas.Canvas(pdf)
+        documento.drawString(72, 720, "Laudo de local de crime com vestígios")
+        documento.save()
+
+        self.valido = self.laudo("valido.pdf", pdf.getvalue())
+        self.corrompido = self.laudo("corrompido.pdf", b"%PDF-1.4 sem estrutura")
+
+    def laudo(self, nome, conteudo):
+        return LaudoReferencia.objects.create(
+            titulo=nome,
+            tipo_exame="Local de Crime",
+            arquivo_pdf=ContentFile(conteudo, name=nome),
+            processado=True,
+            hash_conteudo="0" * 64,
+            total_chunks=3,
+        )
+
+    def test_falha_na_extracao_nao_apaga_nem_marca(self):
+        saida = StringIO()
+        with mock.patch.object(
+            LaudoRAGService, "indexar_documentos", return_value=1
+        ) as indexar:
+            call_command("indexar_laudos", processos=2, stdout=saida)
+
+        (documentos,) = indexar.call_args.args
+        self.assertEqual([d[0] for d in documentos], [self.valido.id])
+        self.assertEqual(indexar.call_args.kwargs["legados"], [])
+        self.assertIn("Falhas: 1", saida.getvalue())
+
+        corrompido = LaudoReferencia.objects.get(pk=self.corrompido.pk)
+        self.assertEqual(
+            (corrompido.hash_conteudo, corrompido.total_chunks, corrompido.texto_extraido),
+            ("0" * 64, 3, ""),
+        )
+        valido = LaudoReferencia.objects.get(pk=self.valido.pk)
+        self.assertNotEqual(valido.hash_conteudo, "0" * 64)
+        self.assertIn("vestígios", valido.texto_extraido)
@@ -16,12 +16,9 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .ai_service import LaudoAIService
+from .ai_service import obter_ai_service
 from .models import LaudoGerado, TemplateLaudo
 
-# Instância global do serviço de IA
-ai_service = LaudoAIService()
-
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
@@ -33,7 +30,7 @@ def iniciar_sessao(request):
     session_key = f"chat_{uuid.uuid4().hex}"
     session_data = {"tipo_laudo": tipo_laudo, "historico": [], "dados_coletados": {}}
     cache.set(session_key, session_data, timeout=3600)
-    mensagem_inicial = ai_service.gerar_resposta(
+    mensagem_inicial = obter_ai_service().gerar_resposta(
         pergunta="Iniciar conversa", tipo_laudo=tipo_laudo, contexto_chat=[]
     )
     session_data["historico"].append({"role": "assistant", "content": mensagem_inicial})
@@ -69,7 +66,7 @@ def enviar_mensagem(request):
         )
     session_data["historico"].append({"role": "user", "content": mensagem_usuario})
     try:
-        resposta_ia = ai_service.gerar_resposta(
+        resposta_ia = obter_ai_service().gerar_resposta(
             pergunta=mensagem_usuario,
             tipo_laudo=session_data["tipo_laudo"],
             contexto_chat=session_data["historico"],
@@ -128,7 +125,7 @@ def gerar_laudo(request):
         ]
     )
     try:
-        laudo_completo = ai_service.gerar_laudo_completo(
+        laudo_completo = obter_ai_service().gerar_laudo_completo(
             tipo_laudo=session_data["tipo_laudo"],
             dados_coletados={"historico": historico_texto},
         )
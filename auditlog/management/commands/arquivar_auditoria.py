@@ -0,0 +1,81 @@
+# auditlog/management/commands/arquivar_auditoria.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from auditlog.particoes import (
+    arquivar_particao,
+    garantir_particoes,
+    particoes_expiradas,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantém as partições mensais da auditoria: cria os próximos meses e "
+        "move os meses fora da janela de retenção para arquivos .csv.gz."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reter-meses",
+            type=int,
+            default=settings.AUDITLOG_RETENCAO_MESES,
+            help="Meses mantidos no banco, além do atual "
+            f"(padrão: {settings.AUDITLOG_RETENCAO_MESES})",
+        )
+        parser.add_argument(
+            "--destino",
+            type=str,
+            default=settings.AUDITLOG_DIR_ARQUIVO,
+            help=f"Pasta dos arquivos (padrão: {settings.AUDITLOG_DIR_ARQUIVO})",
+        )
+        parser.add_argument(
+            "--meses-a-frente",
+            type=int,
+            default=3,
+            help="Partições futuras a manter criadas (padrão: 3)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas lista o que seria arquivado",
+        )
+
+    def handle(self, *args, **options):
+        if options["reter_meses"] < 1:
+            raise CommandError("--reter-meses deve ser pelo menos 1.")
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            expiradas = particoes_expiradas(cursor, options["reter_meses"])
+            if not options["dry_run"]:
+                criadas = garantir_particoes(cursor, options["meses_a_frente"])
+                for nome in criadas:
+                    self.stdout.write(f"  ➕ Partição criada: {nome}")
+
+        if not expiradas:
+            self.stdout.write(self.style.SUCCESS("✅ Nenhuma partição a arquivar."))
+            return
+
+        total = 0
+        for nome, ano, mes in expiradas:
+            if options["dry_run"]:
+                self.stdout.write(f"  📦 {nome} seria arquivada ({mes:02d}/{ano})")
+                continue
+            try:
+                with transaction.atomic():
+                    caminho, linhas = arquivar_particao(
+                        connection, nome, options["destino"]
+                    )
+            except Exception as e:
+                raise CommandError(f"Falha ao arquivar {nome}: {e}")
+            total += linhas
+            self.stdout.write(f"  📦 {nome}: {linhas} registros → {caminho}")
+
+        if not options["dry_run"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✅ {len(expiradas)} partições arquivadas ({total} registros)."
+                )
+            )
@@ -0,0 +1,113 @@
+# auditlog/management/commands/benchmark_auditoria.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from auditlog.models import AuditLog
+from auditlog.signals import auditoria_em_lote, descarregar_logs
+from cargos.models import Cargo
+
+PREFIXO = "BENCH AUDITORIA"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara as idas ao banco da auditoria gravada log a log com a "
+        "auditoria em lote (um bulk_create por request/comando)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--operacoes",
+            type=int,
+            default=50,
+            help="Cargos criados e editados por rodada (padrão: 50)",
+        )
+        parser.add_argument(
+            "--rodadas", type=int, default=5, help="Rodadas por modo (padrão: 5)"
+        )
+
+    def handle(self, *args, **options):
+        # manage.py já abre um lote: grava o que houver antes de medir
+        descarregar_logs()
+        try:
+            individual = self.medir(False, options["operacoes"], options["rodadas"])
+            em_lote = self.medir(True, options["operacoes"], options["rodadas"])
+        finally:
+            self.limpar()
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"{'Modo':<14}{'Queries':>10}{'INSERTs log':>14}{'Mediana':>12}")
+        for nome, (queries, inserts, tempo) in (
+            ("log a log", individual),
+            ("em lote", em_lote),
+        ):
+            self.stdout.write(f"{nome:<14}{queries:>10}{inserts:>14}{tempo:>10.1f}ms")
+        self.stdout.write("=" * 60)
+
+        if em_lote[1] != 1:
+            raise CommandError(
+                f"Esperado 1 INSERT de auditoria por lote, foram {em_lote[1]}."
+            )
+        economia = individual[0] - em_lote[0]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ {economia} idas ao banco a menos por rodada "
+                f"({options['operacoes'] * 2} alterações auditadas)."
+            )
+        )
+
+    def rodada(self, operacoes):
+        """Uma 'request': cria e edita `operacoes` cargos numa transação."""
+        with transaction.atomic():
+            for i in range(operacoes):
+                cargo = Cargo.objects.create(nome=f"{PREFIXO} {i}")
+                cargo.nome = f"{PREFIXO} {i} EDITADO"
+                cargo.save()
+
+    def medir(self, lote, operacoes, rodadas):
+        tabela = AuditLog._meta.db_table
+        tempos = []
+        for _ in range(rodadas):
+            self.limpar()
+            with CaptureQueriesContext(connection) as contexto:
+                inicio = time.perf_counter()
+                if lote:
+                    with auditoria_em_lote():
+                        self.rodada(operacoes)
+                    descarregar_logs()
+                else:
+                    self.rodada_sem_lote(operacoes)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+
+        gravados = AuditLog.objects.filter(objeto_repr__startswith=PREFIXO).count()
+        if gravados != operacoes * 2:
+            raise CommandError(
+                f"Esperados {operacoes * 2} logs, gravados {gravados}."
+            )
+        inserts = sum(
+            1
+            for q in contexto.captured_queries
+            if q["sql"].startswith(f'INSERT INTO "{tabela}"')
+        )
+        tempos.sort()
+        return len(contexto.captured_queries), inserts, tempos[len(tempos) // 2]
+
+    def rodada_sem_lote(self, operacoes):
+        """Sem buffer na thread: cada log vira um INSERT logo após o commit."""
+        from auditlog import signals
+
+        buffer = getattr(signals._buffer_local, "logs", None)
+        signals._buffer_local.logs = None
+        try:
+            self.rodada(operacoes)
+        finally:
+            signals._buffer_local.logs = buffer
+
+    def limpar(self):
+        Cargo.all_objects.filter(nome__startswith=PREFIXO).delete()
+        descarregar_logs()
+        AuditLog.objects.filter(objeto_repr__startswith=PREFIXO).delete()
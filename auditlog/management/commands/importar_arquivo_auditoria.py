@@ -0,0 +1,39 @@
+# auditlog/management/commands/importar_arquivo_auditoria.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from auditlog.particoes import importar_arquivo, mes_do_arquivo, remover_importacao
+
+
+class Command(BaseCommand):
+    help = (
+        "Carrega meses arquivados (.csv.gz) na tabela somente leitura "
+        "auditlog_auditlog_arquivo, consultável em /api/auditlog/arquivo/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivos", nargs="+", help="Arquivos .csv.gz")
+        parser.add_argument(
+            "--remover",
+            action="store_true",
+            help="Descarta os meses importados (os arquivos continuam no disco)",
+        )
+
+    def handle(self, *args, **options):
+        for caminho in options["arquivos"]:
+            try:
+                ano, mes = mes_do_arquivo(caminho)
+                with transaction.atomic():
+                    if options["remover"]:
+                        if remover_importacao(connection, ano, mes):
+                            self.stdout.write(f"  🗑️ {mes:02d}/{ano} removido")
+                        else:
+                            self.stdout.write(f"  ⚠️ {mes:02d}/{ano} não estava importado")
+                        continue
+                    tabela, linhas = importar_arquivo(connection, caminho)
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ {caminho}: {linhas} registros em {tabela}")
+            )
@@ -26,7 +26,12 @@ class AuditLogMiddleware:
         else:
             _thread_locals.user = None
 
-        response = self.get_response(request)
+        from .signals import auditoria_em_lote
 
-        _thread_locals.user = None
+        # Logs da request inteira gravados num único INSERT no final
+        try:
+            with auditoria_em_lote():
+                response = self.get_response(request)
+        finally:
+            _thread_locals.user = None
         return response
@@ -0,0 +1,91 @@
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def particionar(apps, schema_editor):
+    from auditlog.particoes import criar_tabela_arquivo, particionar_tabela
+
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    particionar_tabela(schema_editor, User._meta.db_table)
+    criar_tabela_arquivo(schema_editor)
+
+
+def desparticionar(apps, schema_editor):
+    from auditlog.particoes import desparticionar_tabela, remover_tabela_arquivo
+
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    remover_tabela_arquivo(schema_editor)
+    desparticionar_tabela(schema_editor, User._meta.db_table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auditlog", "0002_auditlog_timestamp_id_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                fields=["timestamp"], name="auditlog_timestamp_brin"
+            ),
+        ),
+        migrations.CreateModel(
+            name="AuditLogArquivado",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "acao",
+                    models.CharField(
+                        choices=[
+                            ("criou", "Criou"),
+                            ("editou", "Editou"),
+                            ("deletou", "Deletou"),
+                        ],
+                        max_length=10,
+                        verbose_name="Ação",
+                    ),
+                ),
+                ("app_label", models.CharField(max_length=50, verbose_name="Módulo (interno)")),
+                ("modelo", models.CharField(max_length=100, verbose_name="Entidade")),
+                ("objeto_id", models.CharField(max_length=100, verbose_name="ID do Objeto")),
+                (
+                    "objeto_repr",
+                    models.CharField(max_length=250, verbose_name="Descrição do Objeto"),
+                ),
+                ("timestamp", models.DateTimeField(verbose_name="Data/Hora")),
+                (
+                    "usuario",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuário",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Log de Auditoria Arquivado",
+                "verbose_name_plural": "Logs de Auditoria Arquivados",
+                "db_table": "auditlog_auditlog_arquivo",
+                "ordering": ["-timestamp"],
+                "managed": False,
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auditlog", "0003_particionamento_mensal"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["usuario", "timestamp"], name="auditlog_usuario_ts_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["app_label", "timestamp"], name="auditlog_app_ts_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("objeto_repr"),
+                    name="gin_trgm_ops",
+                ),
+                name="auditlog_repr_trgm",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("modelo"),
+                    name="gin_trgm_ops",
+                ),
+                name="auditlog_modelo_trgm",
+            ),
+        ),
+    ]
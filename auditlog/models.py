@@ -4,7 +4,9 @@
 # Versão 1.0 - 2025
 """
 
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.conf import settings
 
 
@@ -34,10 +36,65 @@ class AuditLog(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True, verbose_name='Data/Hora')
 
     class Meta:
+        # Tabela particionada por mês (auditlog/particoes.py, migration 0003)
         verbose_name = 'Log de Auditoria'
         verbose_name_plural = 'Logs de Auditoria'
         ordering = ['-timestamp']
+        indexes = [
+            # Chave da paginação por cursor (keyset)
+            models.Index(fields=['timestamp', 'id'], name='auditlog_timestamp_id_idx'),
+            # Linhas chegam em ordem de timestamp: BRIN é minúsculo e cobre faixas
+            BrinIndex(fields=['timestamp'], name='auditlog_timestamp_brin'),
+            # Filtros da tela de auditoria (usuário/módulo + período)
+            models.Index(fields=['usuario', 'timestamp'], name='auditlog_usuario_ts_idx'),
+            models.Index(fields=['app_label', 'timestamp'], name='auditlog_app_ts_idx'),
+            # Busca: icontains gera UPPER(coluna) LIKE '%...%'
+            GinIndex(
+                OpClass(Upper('objeto_repr'), name='gin_trgm_ops'),
+                name='auditlog_repr_trgm',
+            ),
+            GinIndex(
+                OpClass(Upper('modelo'), name='gin_trgm_ops'),
+                name='auditlog_modelo_trgm',
+            ),
+        ]
 
     def __str__(self):
         usuario = self.usuario.get_full_name() or self.usuario.username if self.usuario else 'Sistema'
         return f"{usuario} {self.acao} {self.modelo} #{self.objeto_id}"
+
+
+class AuditLogArquivado(models.Model):
+    """
+    Logs de meses já arquivados em .csv.gz e reimportados para consulta
+    (comando importar_arquivo_auditoria). Somente leitura: a tabela tem
+    trigger que rejeita INSERT/UPDATE/DELETE.
+    """
+
+    Acao = AuditLog.Acao
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        verbose_name='Usuário',
+        related_name='+',
+    )
+    acao = models.CharField(max_length=10, choices=Acao.choices, verbose_name='Ação')
+    app_label = models.CharField(max_length=50, verbose_name='Módulo (interno)')
+    modelo = models.CharField(max_length=100, verbose_name='Entidade')
+    objeto_id = models.CharField(max_length=100, verbose_name='ID do Objeto')
+    objeto_repr = models.CharField(max_length=250, verbose_name='Descrição do Objeto')
+    timestamp = models.DateTimeField(verbose_name='Data/Hora')
+
+    class Meta:
+        managed = False
+        db_table = 'auditlog_auditlog_arquivo'
+        verbose_name = 'Log de Auditoria Arquivado'
+        verbose_name_plural = 'Logs de Auditoria Arquivados'
+        ordering = ['-timestamp']
+
+    def __str__(self):
+        return f"[arquivo] {self.acao} {self.modelo} #{self.objeto_id}"
@@ -0,0 +1,369 @@
+"""
+# SPR-CRIMINALÍSTICA - Sistema de Organização Pericial
+# Desenvolvido por: Perito Criminal Sttefani Ribeiro
+# Versão 1.0 - 2025
+
+Particionamento mensal da tabela de auditoria (PostgreSQL, RANGE por
+timestamp) e arquivamento das partições antigas em CSV compactado.
+
+- auditlog_auditlog: tabela viva, uma partição por mês
+  (auditlog_auditlog_AAAA_MM) e uma partição padrão para o que cair fora.
+- auditlog_auditlog_arquivo: mesma estrutura, somente leitura, onde os
+  arquivos .csv.gz são reimportados para consulta (model AuditLogArquivado).
+"""
+
+import csv
+import gzip
+import os
+import re
+from datetime import datetime
+
+from django.utils import timezone
+
+TABELA = "auditlog_auditlog"
+TABELA_ARQUIVO = "auditlog_auditlog_arquivo"
+SEQUENCIA = "auditlog_auditlog_id_seq"
+
+PADRAO_PARTICAO = re.compile(r"_(\d{4})_(\d{2})$")
+PADRAO_ARQUIVO = re.compile(r"(\d{4})_(\d{2})\.csv\.gz$")
+
+
+def nome_particao(ano, mes, tabela=TABELA):
+    return f"{tabela}_{ano:04d}_{mes:02d}"
+
+
+def proximo_mes(ano, mes):
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+def somar_meses(ano, mes, meses):
+    total = ano * 12 + (mes - 1) + meses
+    return total // 12, total % 12 + 1
+
+
+def limites_mes(ano, mes):
+    """Início e fim (exclusivo) do mês no fuso do sistema, como timestamptz."""
+    inicio = timezone.make_aware(datetime(ano, mes, 1))
+    fim = timezone.make_aware(datetime(*proximo_mes(ano, mes), 1))
+    return inicio, fim
+
+
+def _existe_tabela(cursor, nome):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [nome])
+    return cursor.fetchone()[0]
+
+
+def _esta_particionada(cursor, tabela=TABELA):
+    cursor.execute(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [tabela]
+    )
+    linha = cursor.fetchone()
+    return bool(linha and linha[0])
+
+
+def listar_particoes(cursor, tabela=TABELA):
+    """Partições mensais da tabela: lista de (nome, ano, mes) em ordem."""
+    cursor.execute(
+        """
+        SELECT filha.relname
+        FROM pg_inherits
+        JOIN pg_class filha ON filha.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        """,
+        [tabela],
+    )
+    particoes = []
+    for (nome,) in cursor.fetchall():
+        encontrado = PADRAO_PARTICAO.search(nome)
+        if encontrado:
+            particoes.append((nome, int(encontrado[1]), int(encontrado[2])))
+    return sorted(particoes, key=lambda p: (p[1], p[2]))
+
+
+def criar_particao(cursor, ano, mes):
+    """
+    Cria a partição do mês se ainda não existir. Linhas do mês que caíram
+    na partição padrão são movidas para ela antes do ATTACH.
+    """
+    nome = nome_particao(ano, mes)
+    if _existe_tabela(cursor, nome):
+        return False
+    inicio, fim = limites_mes(ano, mes)
+    padrao = f"{TABELA}_padrao"
+
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM "{padrao}" '
+        f'WHERE "timestamp" >= %s AND "timestamp" < %s)',
+        [inicio, fim],
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(
+            f'CREATE TABLE "{nome}" PARTITION OF "{TABELA}" '
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [inicio, fim],
+        )
+        return True
+
+    cursor.execute(f'CREATE TABLE "{nome}" (LIKE "{TABELA}" INCLUDING DEFAULTS)')
+    cursor.execute(
+        f'WITH movidas AS (DELETE FROM "{padrao}" '
+        f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+        f'INSERT INTO "{nome}" SELECT * FROM movidas',
+        [inicio, fim],
+    )
+    cursor.execute(
+        f'ALTER TABLE "{TABELA}" ATTACH PARTITION "{nome}" '
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [inicio, fim],
+    )
+    return True
+
+
+def garantir_particoes(cursor, meses_a_frente=3, desde=None):
+    """Cria as partições de `desde` (padrão: mês atual) até N meses à frente."""
+    hoje = timezone.localdate()
+    ano, mes = (desde.year, desde.month) if desde else (hoje.year, hoje.month)
+    ate = somar_meses(hoje.year, hoje.month, meses_a_frente)
+    criadas = []
+    while (ano, mes) <= ate:
+        if criar_particao(cursor, ano, mes):
+            criadas.append(nome_particao(ano, mes))
+        ano, mes = proximo_mes(ano, mes)
+    return criadas
+
+
+def particoes_expiradas(cursor, reter_meses):
+    """Partições inteiramente anteriores à janela de retenção."""
+    hoje = timezone.localdate()
+    limite = somar_meses(hoje.year, hoje.month, -reter_meses)
+    return [p for p in listar_particoes(cursor) if (p[1], p[2]) < limite]
+
+
+# ============================================================================
+# CONVERSÃO DA TABELA (usada pela migration)
+# ============================================================================
+def _indices_secundarios(cursor, tabela):
+    cursor.execute(
+        """
+        SELECT indexname, indexdef FROM pg_indexes
+        WHERE tablename = %s
+          AND indexname NOT IN (
+              SELECT conname FROM pg_constraint
+              WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u')
+          )
+        """,
+        [tabela, tabela],
+    )
+    return cursor.fetchall()
+
+
+def _remover_pk(cursor, tabela):
+    """Libera o nome da PK (auditlog_auditlog_pkey) para a tabela nova."""
+    cursor.execute(
+        "SELECT conname FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'p'",
+        [tabela],
+    )
+    for (nome,) in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE "{tabela}" DROP CONSTRAINT "{nome}"')
+
+
+def _recriar_indices(cursor, indices, origem, destino):
+    for _nome, definicao in indices:
+        cursor.execute(
+            re.sub(
+                rf"\bON (ONLY )?(\w+\.)?{origem}\b",
+                f"ON \\2{destino}",
+                definicao,
+            )
+        )
+
+
+def particionar_tabela(schema_editor, tabela_usuario):
+    """Converte auditlog_auditlog em tabela particionada por mês."""
+    with schema_editor.connection.cursor() as cursor:
+        if _esta_particionada(cursor):
+            return
+        legado = f"{TABELA}_legado"
+        indices = _indices_secundarios(cursor, TABELA)
+
+        cursor.execute(f'ALTER TABLE "{TABELA}" RENAME TO "{legado}"')
+        _remover_pk(cursor, legado)
+        cursor.execute(f'ALTER TABLE "{legado}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(f'ALTER TABLE "{legado}" ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'DROP SEQUENCE IF EXISTS "{SEQUENCIA}"')
+
+        # A chave de partição precisa fazer parte da PK
+        cursor.execute(
+            f'CREATE TABLE "{TABELA}" (LIKE "{legado}", PRIMARY KEY (id, "timestamp")) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'CREATE SEQUENCE "{SEQUENCIA}" OWNED BY "{TABELA}".id')
+        cursor.execute(
+            f"ALTER TABLE \"{TABELA}\" ALTER COLUMN id SET DEFAULT nextval('{SEQUENCIA}')"
+        )
+        cursor.execute(
+            f'ALTER TABLE "{TABELA}" ADD CONSTRAINT "{TABELA}_usuario_id_fk" '
+            f'FOREIGN KEY (usuario_id) REFERENCES "{tabela_usuario}" (id) '
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+        cursor.execute(f'CREATE TABLE "{TABELA}_padrao" PARTITION OF "{TABELA}" DEFAULT')
+
+        cursor.execute(f'SELECT min("timestamp") FROM "{legado}"')
+        primeiro = cursor.fetchone()[0]
+        garantir_particoes(
+            cursor, desde=timezone.localtime(primeiro).date() if primeiro else None
+        )
+
+        cursor.execute(f'INSERT INTO "{TABELA}" SELECT * FROM "{legado}"')
+        cursor.execute(
+            f"SELECT setval('{SEQUENCIA}', coalesce(max(id), 0) + 1, false) "
+            f'FROM "{TABELA}"'
+        )
+        cursor.execute(f'DROP TABLE "{legado}"')
+        _recriar_indices(cursor, indices, TABELA, TABELA)
+
+
+def desparticionar_tabela(schema_editor, tabela_usuario):
+    """Volta auditlog_auditlog a uma tabela comum (reverse da migration)."""
+    with schema_editor.connection.cursor() as cursor:
+        if not _esta_particionada(cursor):
+            return
+        particionada = f"{TABELA}_particionada"
+        indices = _indices_secundarios(cursor, TABELA)
+
+        cursor.execute(f'ALTER TABLE "{TABELA}" RENAME TO "{particionada}"')
+        _remover_pk(cursor, particionada)
+        cursor.execute(
+            f'CREATE TABLE "{TABELA}" (LIKE "{particionada}" INCLUDING DEFAULTS, '
+            f"PRIMARY KEY (id))"
+        )
+        cursor.execute(f'ALTER SEQUENCE "{SEQUENCIA}" OWNED BY "{TABELA}".id')
+        cursor.execute(f'INSERT INTO "{TABELA}" SELECT * FROM "{particionada}"')
+        cursor.execute(f'DROP TABLE "{particionada}"')
+        cursor.execute(
+            f'ALTER TABLE "{TABELA}" ADD CONSTRAINT "{TABELA}_usuario_id_fk" '
+            f'FOREIGN KEY (usuario_id) REFERENCES "{tabela_usuario}" (id) '
+            f"DEFERRABLE INITIALLY DEFERRED"
+        )
+        _recriar_indices(cursor, indices, TABELA, TABELA)
+
+
+# ============================================================================
+# ARQUIVAMENTO E IMPORTAÇÃO SOMENTE LEITURA
+# ============================================================================
+def arquivar_particao(conexao, nome, destino):
+    """
+    Copia a partição para <destino>/<nome>.csv.gz e, só depois do arquivo
+    gravado e conferido, desanexa e apaga a partição. Meses passados não
+    recebem mais linhas, então a cópia não precisa travar a tabela.
+    Retorna (caminho, linhas).
+    """
+    os.makedirs(destino, exist_ok=True)
+    caminho = os.path.join(destino, f"{nome}.csv.gz")
+    temporario = f"{caminho}.parcial"
+
+    with conexao.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM "{nome}"')
+        linhas = cursor.fetchone()[0]
+        with gzip.open(temporario, "wt", encoding="utf-8", newline="") as saida:
+            cursor.copy_expert(
+                f'COPY (SELECT * FROM "{nome}" ORDER BY "timestamp", id) '
+                f"TO STDOUT WITH (FORMAT csv, HEADER)",
+                saida,
+            )
+
+    with gzip.open(temporario, "rt", encoding="utf-8", newline="") as entrada:
+        gravadas = sum(1 for _ in csv.reader(entrada)) - 1  # cabeçalho
+    if gravadas != linhas:
+        os.remove(temporario)
+        raise RuntimeError(
+            f"{nome}: {linhas} linhas na partição, {gravadas} no arquivo"
+        )
+    os.replace(temporario, caminho)
+
+    with conexao.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABELA}" DETACH PARTITION "{nome}"')
+        cursor.execute(f'DROP TABLE "{nome}"')
+    return caminho, linhas
+
+
+def mes_do_arquivo(caminho):
+    encontrado = PADRAO_ARQUIVO.search(os.path.basename(caminho))
+    if not encontrado:
+        raise ValueError(f"Nome de arquivo inesperado: {caminho}")
+    return int(encontrado[1]), int(encontrado[2])
+
+
+def importar_arquivo(conexao, caminho):
+    """
+    Carrega um .csv.gz arquivado como partição de auditlog_auditlog_arquivo
+    (somente leitura, consultada pelo model AuditLogArquivado).
+    Retorna (tabela, linhas).
+    """
+    ano, mes = mes_do_arquivo(caminho)
+    nome = nome_particao(ano, mes, TABELA_ARQUIVO)
+    inicio, fim = limites_mes(ano, mes)
+
+    with conexao.cursor() as cursor:
+        if _existe_tabela(cursor, nome):
+            raise ValueError(f"{nome} já foi importada")
+        # Carrega numa tabela solta (sem o trigger de somente leitura) e anexa
+        cursor.execute(f'CREATE TABLE "{nome}" (LIKE "{TABELA_ARQUIVO}")')
+        with gzip.open(caminho, "rt", encoding="utf-8", newline="") as entrada:
+            cursor.copy_expert(
+                f'COPY "{nome}" FROM STDIN WITH (FORMAT csv, HEADER)', entrada
+            )
+        cursor.execute(f'SELECT count(*) FROM "{nome}"')
+        linhas = cursor.fetchone()[0]
+        cursor.execute(
+            f'ALTER TABLE "{TABELA_ARQUIVO}" ATTACH PARTITION "{nome}" '
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [inicio, fim],
+        )
+    return nome, linhas
+
+
+def remover_importacao(conexao, ano, mes):
+    """Descarta um mês importado (o .csv.gz continua no disco)."""
+    nome = nome_particao(ano, mes, TABELA_ARQUIVO)
+    with conexao.cursor() as cursor:
+        if not _existe_tabela(cursor, nome):
+            return False
+        cursor.execute(f'ALTER TABLE "{TABELA_ARQUIVO}" DETACH PARTITION "{nome}"')
+        cursor.execute(f'DROP TABLE "{nome}"')
+    return True
+
+
+def criar_tabela_arquivo(schema_editor):
+    """Tabela particionada que recebe os arquivos reimportados."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS "{TABELA_ARQUIVO}" '
+            f'(LIKE "{TABELA}") PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{TABELA_ARQUIVO}_timestamp_id_idx" '
+            f'ON "{TABELA_ARQUIVO}" ("timestamp", id)'
+        )
+        cursor.execute(
+            """
+            CREATE OR REPLACE FUNCTION auditlog_arquivo_somente_leitura()
+            RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                RAISE EXCEPTION 'Arquivo de auditoria é somente leitura';
+            END;
+            $$
+            """
+        )
+        cursor.execute(
+            f"CREATE TRIGGER auditlog_arquivo_somente_leitura "
+            f'BEFORE INSERT OR UPDATE OR DELETE ON "{TABELA_ARQUIVO}" '
+            f"FOR EACH ROW EXECUTE FUNCTION auditlog_arquivo_somente_leitura()"
+        )
+
+
+def remover_tabela_arquivo(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{TABELA_ARQUIVO}" CASCADE')
+        cursor.execute("DROP FUNCTION IF EXISTS auditlog_arquivo_somente_leitura()")
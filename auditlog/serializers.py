@@ -5,7 +5,7 @@
 """
 
 from rest_framework import serializers
-from .models import AuditLog
+from .models import AuditLog, AuditLogArquivado
 
 
 class AuditLogSerializer(serializers.ModelSerializer):
@@ -29,3 +29,8 @@ class AuditLogSerializer(serializers.ModelSerializer):
         if not obj.usuario:
             return 'Sistema'
         return obj.usuario.get_full_name() or obj.usuario.username
+
+
+class AuditLogArquivadoSerializer(AuditLogSerializer):
+    class Meta(AuditLogSerializer.Meta):
+        model = AuditLogArquivado
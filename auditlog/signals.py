@@ -5,10 +5,37 @@
 
 Signals que escutam post_save e post_delete dos módulos auditados
 sem modificar nenhum app existente.
+
+Os logs não são gravados na hora: cada um entra no buffer da thread quando
+a transação que o gerou é confirmada (transaction.on_commit; rollback
+descarta o log junto com a alteração) e o buffer é gravado com um único
+bulk_create ao fim da request (AuditLogMiddleware) ou dos comandos em lote
+listados no manage.py, ou antes disso se passar de LIMITE_BUFFER logs ou de
+INTERVALO_BUFFER segundos. Fora de auditoria_em_lote() o log é gravado logo
+após o commit.
 """
 
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import DatabaseError, transaction
+
 from .middleware import get_current_user
 
+logger = logging.getLogger(__name__)
+
+# Acima disso o buffer é gravado antes do fim da request/comando
+LIMITE_BUFFER = 500
+
+# Idade máxima (s) do log mais antigo no buffer: um processo longo não
+# segura logs em memória até sair
+INTERVALO_BUFFER = 5
+
+_buffer_local = threading.local()
+
 # Apps que serão auditados
 AUDITED_APPS = {
     'usuarios',
@@ -29,7 +56,15 @@ AUDITED_APPS = {
 }
 
 # Models internos que não devem gerar log
-EXCLUDED_MODELS = {'AuditLog'}
+EXCLUDED_MODELS = {
+    'AuditLog',
+    'OcorrenciaResumoDiario',
+    'VersaoDados',
+    'GeocodeCache',
+    'CentroideLocalidade',
+    'FilaGeocodificacao',
+    'BaldeTokens',
+}
 
 
 def _registrar_log(sender, instance, acao):
@@ -45,7 +80,7 @@ def _registrar_log(sender, instance, acao):
     except Exception:
         repr_str = f"ID: {instance.pk}"
 
-    AuditLog.objects.create(
+    log = AuditLog(
         usuario=get_current_user(),
         acao=acao,
         app_label=sender._meta.app_label,
@@ -53,6 +88,63 @@ def _registrar_log(sender, instance, acao):
         objeto_id=str(instance.pk) if instance.pk else '?',
         objeto_repr=repr_str,
     )
+    # Em autocommit o callback roda na hora; dentro de atomic(), só no commit
+    transaction.on_commit(partial(_confirmar_log, log))
+
+
+def _confirmar_log(log):
+    buffer = getattr(_buffer_local, 'logs', None)
+    if buffer is None:
+        _gravar([log])
+        return
+    if not buffer:
+        _buffer_local.inicio = time.monotonic()
+    buffer.append(log)
+    if (
+        len(buffer) >= LIMITE_BUFFER
+        or time.monotonic() - _buffer_local.inicio >= INTERVALO_BUFFER
+    ):
+        descarregar_logs()
+
+
+def _gravar(logs):
+    from .models import AuditLog
+
+    try:
+        AuditLog.objects.bulk_create(logs)
+    except DatabaseError:
+        # A alteração auditada já foi confirmada: não derruba a request
+        logger.exception(f"Falha ao gravar {len(logs)} log(s) de auditoria")
+
+
+def descarregar_logs():
+    """Grava com um único INSERT os logs confirmados no buffer da thread."""
+    buffer = getattr(_buffer_local, 'logs', None)
+    if not buffer:
+        return 0
+    logs = buffer[:]
+    buffer.clear()
+    _gravar(logs)
+    return len(logs)
+
+
+@contextmanager
+def auditoria_em_lote():
+    """
+    Acumula os logs de auditoria da thread e grava tudo na saída do bloco.
+    Reentrante: só o bloco mais externo grava.
+    """
+    if getattr(_buffer_local, 'logs', None) is not None:
+        yield
+        return
+    _buffer_local.logs = []
+    try:
+        yield
+    finally:
+        try:
+            descarregar_logs()
+        finally:
+            _buffer_local.logs = None
 
 
 def handle_save(sender, instance, created, **kwargs):
@@ -0,0 +1,176 @@
+import datetime
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from cidades.models import Cidade
+from spr.pagination import estimar_linhas
+from usuarios.models import User
+
+from . import signals
+from .models import AuditLog, AuditLogArquivado
+from .particoes import criar_particao, garantir_particoes, listar_particoes
+from .signals import auditoria_em_lote
+
+
+class AuditoriaEmLoteTests(TestCase):
+    """O buffer de auditoria é gravado no fim do bloco, por tamanho ou por idade."""
+
+    def criar_cidade(self, nome):
+        with self.captureOnCommitCallbacks(execute=True):
+            Cidade.objects.create(nome=nome)
+
+    def test_grava_no_fim_do_bloco(self):
+        with auditoria_em_lote():
+            self.criar_cidade("Boa Vista")
+            self.criar_cidade("Caracaraí")
+            self.assertEqual(AuditLog.objects.count(), 0)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_log_antigo_no_buffer_forca_a_gravacao(self):
+        with mock.patch.object(signals.time, "monotonic", side_effect=[0, 0, 10]):
+            with auditoria_em_lote():
+                self.criar_cidade("Boa Vista")
+                self.assertEqual(AuditLog.objects.count(), 0)
+                self.criar_cidade("Caracaraí")
+                self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_fora_do_bloco_grava_apos_o_commit(self):
+        self.criar_cidade("Boa Vista")
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+
+class EstimativaLinhasTests(TestCase):
+    """Total estimado da paginação: a tabela pai particionada não conta em dobro."""
+
+    def analisar(self, tabela):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE "{tabela}"')
+
+    def test_tabela_particionada_soma_so_as_particoes(self):
+        with connection.cursor() as cursor:
+            garantir_particoes(cursor, meses_a_frente=0)
+        AuditLog.objects.bulk_create(
+            AuditLog(
+                acao=AuditLog.Acao.CRIOU,
+                app_label="cidades",
+                modelo="Cidade",
+                objeto_id=str(i),
+                objeto_repr=f"Cidade {i}",
+            )
+            for i in range(40)
+        )
+        self.analisar(AuditLog._meta.db_table)
+
+        self.assertEqual(estimar_linhas(AuditLog.objects.all()), 40)
+
+    def test_tabela_comum(self):
+        for nome in ("Boa Vista", "Caracaraí", "Mucajaí"):
+            Cidade.objects.create(nome=nome)
+        self.analisar(Cidade._meta.db_table)
+
+        self.assertEqual(estimar_linhas(Cidade.objects.all()), 3)
+
+
+class ArquivamentoAuditoriaTests(APITestCase):
+    """
+    Ciclo completo no PostgreSQL: partição de um mês expirado vira .csv.gz,
+    é reimportada na tabela somente leitura e volta a ser consultável.
+    """
+
+    MES = datetime.datetime(2020, 1, 15, 12, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        self.destino = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.destino)
+        self.admin = User.objects.create_superuser(
+            email="admin@teste.local",
+            password="senha-teste",
+            nome_completo="Administrador",
+            cpf="00000000000",
+        )
+        with connection.cursor() as cursor:
+            criar_particao(cursor, 2020, 1)
+        AuditLog.objects.bulk_create(
+            AuditLog(
+                usuario=self.admin,
+                acao=AuditLog.Acao.EDITOU,
+                app_label="ocorrencias",
+                modelo="Ocorrencia",
+                objeto_id=str(i),
+                objeto_repr=f"Ocorrência {i}",
+            )
+            for i in range(5)
+        )
+        # auto_now_add ignora o valor informado: move as linhas para 2020
+        AuditLog.objects.update(timestamp=self.MES)
+        # Em produção as linhas já foram commitadas; aqui a FK adiada de
+        # usuario impediria o DROP da partição na mesma transação
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    def particoes(self):
+        with connection.cursor() as cursor:
+            return [nome for nome, _, _ in listar_particoes(cursor)]
+
+    def test_arquiva_reimporta_e_consulta(self):
+        self.assertIn("auditlog_auditlog_2020_01", self.particoes())
+
+        call_command(
+            "arquivar_auditoria", reter_meses=1, destino=self.destino, stdout=StringIO()
+        )
+
+        caminho = os.path.join(self.destino, "auditlog_auditlog_2020_01.csv.gz")
+        self.assertTrue(os.path.exists(caminho))
+        self.assertNotIn("auditlog_auditlog_2020_01", self.particoes())
+        self.assertFalse(AuditLog.objects.exists())
+
+        call_command("importar_arquivo_auditoria", caminho, stdout=StringIO())
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get("/api/auditlog/arquivo/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(log["objeto_id"] for log in response.data["results"]),
+            ["0", "1", "2", "3", "4"],
+        )
+        self.assertEqual(
+            AuditLogArquivado.objects.filter(timestamp=self.MES).count(), 5
+        )
+
+    def test_arquivo_reimportado_e_somente_leitura(self):
+        call_command(
+            "arquivar_auditoria", reter_meses=1, destino=self.destino, stdout=StringIO()
+        )
+        call_command(
+            "importar_arquivo_auditoria",
+            os.path.join(self.destino, "auditlog_auditlog_2020_01.csv.gz"),
+            stdout=StringIO(),
+        )
+
+        escritas = [
+            lambda: AuditLogArquivado.objects.update(objeto_repr="alterado"),
+            lambda: AuditLogArquivado.objects.all().delete(),
+            lambda: AuditLogArquivado.objects.create(
+                id=999,
+                acao=AuditLog.Acao.CRIOU,
+                app_label="cidades",
+                modelo="Cidade",
+                objeto_id="1",
+                objeto_repr="Nova",
+                timestamp=self.MES,
+            ),
+        ]
+        for escrita in escritas:
+            with self.subTest(escrita=escrita):
+                with self.assertRaisesMessage(DatabaseError, "somente leitura"):
+                    with transaction.atomic():
+                        escrita()
+        self.assertEqual(AuditLogArquivado.objects.count(), 5)
@@ -5,9 +5,11 @@
 """
 
 from rest_framework.routers import DefaultRouter
-from .views import AuditLogViewSet
+from .views import AuditLogArquivadoViewSet, AuditLogViewSet
 
 router = DefaultRouter()
+# Antes da rota vazia: senão 'arquivo/' casaria com o detalhe '<pk>/'
+router.register(r'arquivo', AuditLogArquivadoViewSet, basename='auditlog-arquivo')
 router.register(r'', AuditLogViewSet, basename='auditlog')
 
 urlpatterns = router.urls
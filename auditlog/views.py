@@ -4,49 +4,120 @@
 # Versão 1.0 - 2025
 """
 
+import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.decorators import action
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.permissions import IsAuthenticated
-from .models import AuditLog
-from .serializers import AuditLogSerializer
+from spr.exportacao import Coluna, formatar_data_hora, resposta_csv, rotulos
+from spr.pagination import CursorContagemEstimadaPagination
+from .models import AuditLog, AuditLogArquivado
+from .serializers import AuditLogArquivadoSerializer, AuditLogSerializer
 
 PERFIS_PERMITIDOS = {'SUPER_ADMIN', 'ADMINISTRATIVO'}
 
 
+def _pode_consultar(user):
+    perfil = getattr(user, 'perfil', None)
+    return user.is_superuser or perfil in PERFIS_PERMITIDOS
+
+
+def _inicio_do_dia(valor, dias_depois=0):
+    """'AAAA-MM-DD' -> meia-noite (fuso local) do dia + N dias; None se inválido."""
+    try:
+        dia = parse_date(valor or '')
+    except ValueError:
+        return None
+    if dia is None:
+        return None
+    return timezone.make_aware(
+        datetime.datetime.combine(dia + datetime.timedelta(days=dias_depois), datetime.time.min)
+    )
+
+
+def filtrar_logs(qs, params):
+    """Filtros da listagem, comuns aos logs vivos e aos arquivados."""
+    usuario_id = params.get('usuario_id')
+    acao = params.get('acao')
+    modulo = params.get('modulo')
+    data_inicio = params.get('data_inicio')
+    data_fim = params.get('data_fim')
+    busca = params.get('busca')
+
+    if usuario_id:
+        qs = qs.filter(usuario_id=usuario_id)
+    if acao:
+        qs = qs.filter(acao=acao)
+    if modulo:
+        qs = qs.filter(app_label=modulo)
+    # Range sobre a coluna (e não timestamp__date) para usar os índices
+    inicio = _inicio_do_dia(data_inicio)
+    if inicio:
+        qs = qs.filter(timestamp__gte=inicio)
+    fim = _inicio_do_dia(data_fim, dias_depois=1)
+    if fim:
+        qs = qs.filter(timestamp__lt=fim)
+    if busca:
+        # icontains gera UPPER(coluna) LIKE: casa com os índices trigram
+        qs = qs.filter(
+            Q(objeto_repr__icontains=busca) |
+            Q(modelo__icontains=busca)
+        )
+
+    return qs
+
+
 class AuditLogViewSet(ReadOnlyModelViewSet):
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CursorContagemEstimadaPagination
+    cursor_ordering = ('-timestamp', '-id')
+    cursor_ordering_fields = ('timestamp',)
 
     def get_queryset(self):
-        user = self.request.user
-        perfil = getattr(user, 'perfil', None)
-
-        if not (user.is_superuser or perfil in PERFIS_PERMITIDOS):
+        if not _pode_consultar(self.request.user):
             return AuditLog.objects.none()
+        return filtrar_logs(
+            AuditLog.objects.select_related('usuario').all(),
+            self.request.query_params,
+        )
+
+    @action(detail=False, methods=['get'], url_path='exportar-csv')
+    def exportar_csv(self, request):
+        """Exporta os logs filtrados em CSV (streaming, memória constante)."""
+        acao_labels = rotulos(AuditLog.Acao.choices)
+        colunas = [
+            Coluna('Data/Hora', 'timestamp', formatar=formatar_data_hora),
+            Coluna(
+                'Usuario',
+                'usuario__nome_completo',
+                formatar=lambda nome: nome or 'Sistema',
+            ),
+            Coluna('Acao', 'acao', formatar=lambda a: acao_labels.get(a, a)),
+            Coluna('Modulo', 'app_label'),
+            Coluna('Entidade', 'modelo'),
+            Coluna('ID do Objeto', 'objeto_id'),
+            Coluna('Descricao do Objeto', 'objeto_repr'),
+        ]
+        return resposta_csv(self.get_queryset(), colunas, 'auditoria.csv')
+
 
-        qs = AuditLog.objects.select_related('usuario').all()
-
-        usuario_id = self.request.query_params.get('usuario_id')
-        acao = self.request.query_params.get('acao')
-        modulo = self.request.query_params.get('modulo')
-        data_inicio = self.request.query_params.get('data_inicio')
-        data_fim = self.request.query_params.get('data_fim')
-        busca = self.request.query_params.get('busca')
-
-        if usuario_id:
-            qs = qs.filter(usuario_id=usuario_id)
-        if acao:
-            qs = qs.filter(acao=acao)
-        if modulo:
-            qs = qs.filter(app_label=modulo)
-        if data_inicio:
-            qs = qs.filter(timestamp__date__gte=data_inicio)
-        if data_fim:
-            qs = qs.filter(timestamp__date__lte=data_fim)
-        if busca:
-            from django.db.models import Q
-            qs = qs.filter(
-                Q(objeto_repr__icontains=busca) |
-                Q(modelo__icontains=busca)
-            )
-
-        return qs
+class AuditLogArquivadoViewSet(ReadOnlyModelViewSet):
+    """Meses arquivados e reimportados (importar_arquivo_auditoria)."""
+
+    serializer_class = AuditLogArquivadoSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CursorContagemEstimadaPagination
+    cursor_ordering = ('-timestamp', '-id')
+    cursor_ordering_fields = ('timestamp',)
+
+    def get_queryset(self):
+        if not _pode_consultar(self.request.user):
+            return AuditLogArquivado.objects.none()
+        return filtrar_logs(
+            AuditLogArquivado.objects.select_related('usuario').all(),
+            self.request.query_params,
+        )
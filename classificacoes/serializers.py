@@ -100,11 +100,16 @@ class ClassificacaoOcorrenciaSerializer(serializers.ModelSerializer):
 
     def get_is_parent(self, obj):
         """Retorna True se este item for um pai (tiver subgrupos)"""
-        return ClassificacaoOcorrencia.objects.filter(parent=obj).exists()
+        # Usa o prefetch de "subgrupos" quando a view o fez (sem query extra)
+        return obj.subgrupos.exists()
 
     def get_servicos_periciais(self, obj):
         # Retorna uma lista de dicionários simples para o frontend consumir facilmente
-        return obj.servicos_periciais.values("id", "sigla", "nome")
+        # (.all() aproveita o prefetch_related da view, .values() não)
+        return [
+            {"id": servico.id, "sigla": servico.sigla, "nome": servico.nome}
+            for servico in obj.servicos_periciais.all()
+        ]
 
     def create(self, validated_data):
         # Remove a lista de IDs antes de chamar o 'create' do pai
@@ -9,6 +9,20 @@ import sys
 
 os.environ["PGCLIENTENCODING"] = "UTF8"
 
+# Comandos em lote que gravam muitos models auditados: logs de auditoria num
+# buffer gravado em blocos. Os demais (shell, runserver, servidor_embeddings,
+# geocodificar_enderecos --continuo...) gravam cada log logo após o commit
+COMANDOS_AUDITORIA_EM_LOTE = {
+    "loaddata",
+    "popular_roraima",
+    "importar_laudos_hd",
+    "criar_template_thc",
+    "atualizar_enderecos",
+    "migrar_bairros",
+    "benchmark_numeracao",
+    "benchmark_estatisticas",
+}
+
 
 def main():
     """Run administrative tasks."""
@@ -21,7 +35,16 @@ def main():
             "available on your PYTHONPATH environment variable? Did you "
             "forget to activate a virtual environment?"
         ) from exc
-    execute_from_command_line(sys.argv)
+    comando = sys.argv[1] if len(sys.argv) > 1 else None
+    if comando not in COMANDOS_AUDITORIA_EM_LOTE:
+        execute_from_command_line(sys.argv)
+        return
+
+    from auditlog.signals import auditoria_em_lote
+
+    # Comandos não passam pelo middleware: grava o restante dos logs ao sair
+    with auditoria_em_lote():
+        execute_from_command_line(sys.argv)
 
 
 if __name__ == "__main__":
@@ -4,3 +4,26 @@ from django.apps import AppConfig
 class OcorrenciasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ocorrencias'
+
+    def ready(self):
+        from django.apps import apps
+        from django.db.models.signals import post_save, post_delete
+        from .signals import (
+            MODELOS_VERSIONADOS,
+            atualizar_resumo_excluida,
+            incrementar_versao_dados,
+            reindexar_busca_relacionadas,
+            relacoes_busca,
+        )
+
+        for app_label, nome_modelo in MODELOS_VERSIONADOS:
+            model = apps.get_model(app_label, nome_modelo)
+            post_save.connect(incrementar_versao_dados, sender=model, weak=False)
+            post_delete.connect(incrementar_versao_dados, sender=model, weak=False)
+
+        post_delete.connect(
+            atualizar_resumo_excluida, sender=self.get_model("Ocorrencia"), weak=False
+        )
+
+        for model in relacoes_busca():
+            post_save.connect(reindexar_busca_relacionadas, sender=model, weak=False)
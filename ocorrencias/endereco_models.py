@@ -2,11 +2,11 @@
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from usuarios.models import AuditModel
 import logging
 
 # IMPORTS PARA GEOCODIFICAÇÃO
-from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 
 logger = logging.getLogger(__name__)
@@ -162,7 +162,7 @@ class EnderecoOcorrencia(AuditModel):
             return False
 
         try:
-            geolocator = Nominatim(user_agent="spr_roraima_pericia_v1", timeout=10)
+            from ocorrencias.utils.geocoding import consultar_servico
 
             # Montar endereço completo
             partes_endereco = []
@@ -188,13 +188,12 @@ class EnderecoOcorrencia(AuditModel):
 
             logger.info(f"📍 Geocodificando ID {self.id}: {endereco_completo}")
 
-            location = geolocator.geocode(
-                endereco_completo, exactly_one=True, timeout=10
-            )
+            # Passa pelo GeocodeCache: endereços repetidos não vão ao Nominatim
+            location = consultar_servico(endereco_completo, nivel=1)
 
-            if location:
-                self.latitude = str(location.latitude)
-                self.longitude = str(location.longitude)
+            if location["latitude"] is not None:
+                self.latitude = str(location["latitude"])
+                self.longitude = str(location["longitude"])
                 self.coordenadas_manuais = False
                 self.save(
                     update_fields=[
@@ -271,3 +270,153 @@ class EnderecoOcorrencia(AuditModel):
         verbose_name = "Endereço de Ocorrência"
         verbose_name_plural = "Endereços de Ocorrências"
         ordering = ["-created_at"]
+        indexes = [
+            # Recorte por bbox do mapa (só endereços externos com coordenadas)
+            models.Index(
+                fields=["latitude", "longitude"],
+                name="endereco_ocorrencia_geo_idx",
+                condition=models.Q(
+                    tipo="EXTERNA",
+                    latitude__isnull=False,
+                    longitude__isnull=False,
+                ),
+            ),
+        ]
+
+
+class GeocodeCache(models.Model):
+    """
+    Resultado de uma consulta ao serviço de geocodificação, pela string
+    normalizada. Guarda também as consultas sem resultado, para não repeti-las
+    a cada execução (expiram após GEOCODE_CACHE_NEGATIVO_DIAS).
+    """
+
+    consulta = models.CharField(max_length=255, unique=True)
+    nivel = models.PositiveSmallIntegerField(verbose_name="Nível Alcançado")
+    encontrado = models.BooleanField(default=False)
+    latitude = models.DecimalField(
+        max_digits=10, decimal_places=7, null=True, blank=True
+    )
+    longitude = models.DecimalField(
+        max_digits=10, decimal_places=7, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cache de Geocodificação"
+        verbose_name_plural = "Cache de Geocodificação"
+
+    def __str__(self):
+        situacao = "encontrado" if self.encontrado else "não encontrado"
+        return f"{self.consulta} ({situacao})"
+
+
+class CentroideLocalidade(models.Model):
+    """
+    Gazetteer offline: centróide de uma cidade (bairro vazio) ou de um
+    bairro. Responde os níveis 2 e 3 da geocodificação sem chamada externa.
+    Preenchido pelo comando construir_gazetteer.
+    """
+
+    class Origem(models.TextChoices):
+        ENDERECOS = "ENDERECOS", "Média dos Endereços Geocodificados"
+        NOMINATIM = "NOMINATIM", "Nominatim (consulta única)"
+        MANUAL = "MANUAL", "Informado Manualmente"
+
+    cidade = models.ForeignKey(
+        "cidades.Cidade", on_delete=models.CASCADE, related_name="+"
+    )
+    bairro = models.ForeignKey(
+        "cidades.Bairro",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    latitude = models.DecimalField(max_digits=10, decimal_places=7)
+    longitude = models.DecimalField(max_digits=10, decimal_places=7)
+    origem = models.CharField(max_length=10, choices=Origem.choices)
+    total_pontos = models.PositiveIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Centróide de Localidade"
+        verbose_name_plural = "Centróides de Localidades"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cidade", "bairro"],
+                condition=models.Q(bairro__isnull=False),
+                name="centroide_bairro_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["cidade"],
+                condition=models.Q(bairro__isnull=True),
+                name="centroide_cidade_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        local = f"{self.bairro.nome} - " if self.bairro_id else ""
+        return f"{local}{self.cidade} [{self.latitude}, {self.longitude}]"
+
+
+class FilaGeocodificacao(models.Model):
+    """
+    Fila (e checkpoint) da geocodificação em lote: uma linha por endereço.
+    O comando geocodificar_enderecos reserva lotes com SELECT ... FOR UPDATE
+    SKIP LOCKED, então vários processos podem consumir a fila e uma execução
+    interrompida continua de onde parou.
+    """
+
+    class Status(models.TextChoices):
+        PENDENTE = "PENDENTE", "Pendente"
+        PROCESSANDO = "PROCESSANDO", "Processando"
+        CONCLUIDO = "CONCLUIDO", "Concluído"
+        FALHA = "FALHA", "Falha"
+
+    endereco = models.OneToOneField(
+        EnderecoOcorrencia,
+        on_delete=models.CASCADE,
+        related_name="fila_geocodificacao",
+    )
+    status = models.CharField(
+        max_length=12, choices=Status.choices, default=Status.PENDENTE
+    )
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    nivel = models.PositiveSmallIntegerField(null=True, blank=True)
+    erro = models.CharField(max_length=255, blank=True)
+    # Pedido manual: geocodifica de novo mesmo que o endereço já tenha coordenadas
+    forcar = models.BooleanField(default=False)
+    reservado_em = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Fila de Geocodificação"
+        verbose_name_plural = "Fila de Geocodificação"
+        indexes = [
+            models.Index(fields=["status", "id"], name="fila_geocod_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Endereço {self.endereco_id}: {self.status}"
+
+
+class BaldeTokens(models.Model):
+    """
+    Estado de um token bucket compartilhado entre processos (linha travada
+    com SELECT ... FOR UPDATE a cada retirada). Usado para respeitar o
+    limite de requisições do serviço de geocodificação.
+    """
+
+    chave = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField(default=0)
+    atualizado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Balde de Tokens"
+        verbose_name_plural = "Baldes de Tokens"
+
+    def __str__(self):
+        return f"{self.chave}: {self.tokens:.2f}"
@@ -1,10 +1,12 @@
 # ocorrencias/filters.py
 import django_filters
 from django import forms
-from django.db.models import Q
+from django.contrib.postgres.search import SearchRank
+from django.db.models import F, Q
 from django.utils import timezone
 from datetime import timedelta
 from .models import Ocorrencia
+from .utils.busca import consulta_prefixos, normalizar_busca
 
 class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
     pass
@@ -253,22 +255,25 @@ class OcorrenciaFilter(django_filters.FilterSet):
 
     def filter_busca_geral(self, queryset, name, value):
         """
-        ✅ OTIMIZADO: Busca em múltiplos campos simultaneamente
+        ✅ OTIMIZADO: Busca no documento de busca da ocorrência (número, histórico,
+        documento/SEI, perito, autoridade, unidade, serviço e cidade).
+        Trecho parcial usa o índice de trigrama; palavras em qualquer ordem usam o
+        tsvector, que também dá o ranking. Sem acentos e sem diferenciar maiúsculas.
         """
-        if not value:
+        termo = normalizar_busca(value)
+        if not termo:
             return queryset
 
-        return queryset.filter(
-            Q(numero_ocorrencia__icontains=value) |
-            Q(historico__icontains=value) |
-            Q(numero_documento_origem__icontains=value) |
-            Q(processo_sei_numero__icontains=value) |
-            Q(perito_atribuido__nome_completo__icontains=value) |
-            Q(autoridade__nome__icontains=value) |
-            Q(unidade_demandante__nome__icontains=value) |
-            Q(servico_pericial__nome__icontains=value) |
-            Q(cidade__nome__icontains=value)
-        ).distinct()
+        filtro = Q(busca_documento__contains=termo)
+        consulta = consulta_prefixos(termo)
+        if consulta is None:
+            return queryset.filter(filtro)
+
+        return (
+            queryset.filter(filtro | Q(busca_vetor=consulta))
+            .annotate(busca_rank=SearchRank(F("busca_vetor"), consulta))
+            .order_by("-busca_rank", "-created_at")
+        )
 
     def filter_classificacao(self, queryset, name, value):
         if not value or value.strip().lower() == 'null':
@@ -0,0 +1,296 @@
+# ocorrencias/management/commands/benchmark_estatisticas.py
+
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from autoridades.models import Autoridade
+from cidades.models import Cidade
+from classificacoes.models import ClassificacaoOcorrencia
+from exames.models import Exame
+from servicos_periciais.models import ServicoPericial
+from unidades_demandantes.models import UnidadeDemandante
+from usuarios.models import User
+
+from ocorrencias.models import Ocorrencia, OcorrenciaExame, OcorrenciaResumoDiario
+from ocorrencias.utils.resumo import reconstruir_resumo
+from ocorrencias.views import OcorrenciaViewSet
+
+PREFIXO_BENCH = "BENCH-"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede número de queries e latência de /api/ocorrencias/estatisticas/ "
+        "e das mesmas estatísticas calculadas como antes (um COUNT por "
+        "contador). Opcionalmente gera uma massa sintética (ex.: --gerar 500000)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--gerar",
+            type=int,
+            default=0,
+            help="Quantidade de ocorrências sintéticas a criar antes de medir",
+        )
+        parser.add_argument(
+            "--repeticoes",
+            type=int,
+            default=5,
+            help="Quantas vezes medir cada versão (padrão: 5)",
+        )
+        parser.add_argument(
+            "--usuario",
+            type=str,
+            default=None,
+            help="Email do usuário que fará as requisições (padrão: primeiro superuser)",
+        )
+        parser.add_argument(
+            "--limpar",
+            action="store_true",
+            help=(
+                f"Remove as ocorrências sintéticas ({PREFIXO_BENCH}*), "
+                "reconstrói o resumo diário e sai"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["limpar"]:
+            apagadas, _ = Ocorrencia.all_objects.filter(
+                numero_ocorrencia__startswith=PREFIXO_BENCH
+            ).delete()
+            self.stdout.write(self.style.SUCCESS(f"🧹 {apagadas} registros removidos."))
+            self.reconstruir_resumo()
+            return
+
+        if options["gerar"]:
+            self.gerar_massa(options["gerar"])
+            # bulk_create e o UPDATE de created_at não passam pelo save
+            self.reconstruir_resumo()
+
+        usuario = self.obter_usuario(options["usuario"])
+        view = OcorrenciaViewSet.as_view({"get": "estatisticas"})
+        factory = APIRequestFactory()
+
+        def chamar_endpoint():
+            # Mede o cálculo, não a resposta guardada por resposta_em_cache
+            cache.clear()
+            request = factory.get("/api/ocorrencias/estatisticas/")
+            force_authenticate(request, user=usuario)
+            response = view(request)
+            if response.status_code != 200:
+                raise CommandError(f"Endpoint respondeu {response.status_code}")
+
+        medicoes = [
+            ("Atual (endpoint)", self.medir(chamar_endpoint, options["repeticoes"])),
+            (
+                "Antes (um COUNT por contador)",
+                self.medir(
+                    lambda: self.estatisticas_linha_de_base(usuario),
+                    options["repeticoes"],
+                ),
+            ),
+        ]
+
+        total = Ocorrencia.objects.count()
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"Ocorrências na base:   {total}")
+        self.stdout.write(f"Usuário:               {usuario.email}")
+        for nome, (queries, tempos) in medicoes:
+            self.stdout.write("-" * 60)
+            self.stdout.write(nome)
+            self.stdout.write(f"  Queries por chamada: {queries}")
+            self.stdout.write(f"  Latência mínima:     {tempos[0]:.1f} ms")
+            self.stdout.write(f"  Latência mediana:    {tempos[len(tempos) // 2]:.1f} ms")
+            self.stdout.write(f"  Latência máxima:     {tempos[-1]:.1f} ms")
+        self.stdout.write("=" * 60)
+
+    def medir(self, chamar, repeticoes):
+        """(queries da última chamada, latências em ms ordenadas)."""
+        tempos = []
+        queries = 0
+        for _ in range(repeticoes):
+            with CaptureQueriesContext(connection) as contexto:
+                inicio = time.perf_counter()
+                chamar()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            queries = len(contexto.captured_queries)
+        return queries, sorted(tempos)
+
+    def estatisticas_linha_de_base(self, user):
+        """
+        As queries da versão anterior do endpoint, na mesma ordem: um COUNT
+        por contador, a lista de ids para os exames e a evolução mensal.
+        Só executa (a montagem da resposta não pesa na comparação).
+        """
+        hoje = timezone.now().date()
+        inicio_mes = hoje.replace(day=1)
+
+        if user.perfil == "PERITO":
+            queryset_base = Ocorrencia.objects.filter(perito_atribuido=user)
+            servicos_ids = list(user.servicos_periciais.values_list("id", flat=True))
+            queryset_servico = Ocorrencia.objects.filter(
+                servico_pericial_id__in=servicos_ids
+            )
+        elif user.perfil == "OPERACIONAL":
+            servicos_ids = list(user.servicos_periciais.values_list("id", flat=True))
+            queryset_base = Ocorrencia.objects.filter(servico_pericial_id__in=servicos_ids)
+            queryset_servico = queryset_base
+        else:
+            queryset_base = Ocorrencia.objects.all()
+            servicos_ids = list(ServicoPericial.objects.values_list("id", flat=True))
+            queryset_servico = queryset_base
+
+        queryset_base.count()
+        for status in ("AGUARDANDO_PERITO", "EM_ANALISE", "LAUDO_ENTREGUE", "FINALIZADA"):
+            queryset_base.filter(status=status).count()
+        queryset_base.filter(perito_atribuido__isnull=True).count()
+        queryset_base.filter(
+            status__in=["AGUARDANDO_PERITO", "EM_ANALISE"],
+            created_at__date__lt=hoje - timedelta(days=20),
+        ).count()
+        queryset_base.filter(status="FINALIZADA", data_finalizacao__gte=inicio_mes).count()
+        dias_30 = hoje - timedelta(days=30)
+        queryset_base.filter(created_at__date__gte=dias_30).count()
+        queryset_base.filter(status="FINALIZADA", data_finalizacao__gte=dias_30).count()
+
+        list(
+            ServicoPericial.objects.filter(id__in=servicos_ids)
+            .annotate(
+                total=Count(
+                    "ocorrencias",
+                    filter=Q(ocorrencias__in=queryset_servico),
+                    distinct=True,
+                ),
+                total_exames=Coalesce(
+                    Sum(
+                        "exames__ocorrenciaexame__quantidade",
+                        filter=Q(exames__ocorrenciaexame__ocorrencia__in=queryset_servico),
+                    ),
+                    0,
+                ),
+            )
+            .values("sigla", "nome", "total", "total_exames")
+        )
+
+        # Exames: ids materializados no Python e três consultas por exame/pai
+        ids_ocorrencias = list(queryset_base.values_list("id", flat=True))
+        qtd_map = {
+            item["exame_id"]: item["qtd"]
+            for item in OcorrenciaExame.objects.filter(ocorrencia_id__in=ids_ocorrencias)
+            .values("exame_id")
+            .annotate(qtd=Sum("quantidade"))
+        }
+        if qtd_map:
+            exames = list(
+                Exame.objects.select_related("parent", "servico_pericial").filter(
+                    id__in=list(qtd_map)
+                )
+            )
+            list(
+                Exame.objects.select_related("servico_pericial")
+                .filter(id__in={ex.parent_id for ex in exames if ex.parent_id})
+                .exclude(id__in=list(qtd_map))
+            )
+
+        if user.perfil == "PERITO":
+            queryset_servico.count()
+            list(queryset_base.order_by("-created_at")[:5].values("id"))
+
+        list(
+            queryset_base.annotate(
+                mes=TruncDate("created_at", kind="month", output_field=DateField())
+            )
+            .values("mes")
+            .annotate(
+                total=Count("id"),
+                finalizadas=Count("id", filter=Q(status="FINALIZADA")),
+            )
+            .order_by("mes")
+        )
+
+    def reconstruir_resumo(self):
+        linhas = reconstruir_resumo(Ocorrencia.all_objects.all(), OcorrenciaResumoDiario)
+        self.stdout.write(self.style.SUCCESS(f"✅ Resumo diário reconstruído ({linhas} linhas)."))
+
+    def obter_usuario(self, email):
+        usuarios = User.objects.filter(deleted_at__isnull=True)
+        usuario = (
+            usuarios.filter(email=email).first()
+            if email
+            else usuarios.filter(is_superuser=True).first()
+        )
+        if not usuario:
+            raise CommandError("Usuário para o benchmark não encontrado.")
+        return usuario
+
+    def gerar_massa(self, quantidade, lote=5000):
+        """Cria ocorrências via bulk_create (sem o save de numeração)."""
+        servicos = list(ServicoPericial.objects.values_list("id", flat=True))
+        unidade = UnidadeDemandante.objects.values_list("id", flat=True).first()
+        autoridade = Autoridade.objects.values_list("id", flat=True).first()
+        cidades = list(Cidade.objects.values_list("id", flat=True))
+        classificacoes = list(
+            ClassificacaoOcorrencia.objects.filter(parent__isnull=False).values_list(
+                "id", flat=True
+            )
+        )
+        peritos = list(
+            User.objects.filter(perfil="PERITO").values_list("id", flat=True)
+        ) or [None]
+        if not (servicos and unidade and autoridade and cidades and classificacoes):
+            raise CommandError(
+                "Cadastre ao menos um serviço, unidade, autoridade, cidade e "
+                "subclassificação antes de gerar a massa."
+            )
+
+        status_ciclo = [s for s, _ in Ocorrencia.Status.choices]
+        inicial = Ocorrencia.all_objects.filter(
+            numero_ocorrencia__startswith=PREFIXO_BENCH
+        ).count()
+        agora = timezone.now()
+
+        self.stdout.write(f"⏳ Gerando {quantidade} ocorrências sintéticas...")
+        for inicio in range(0, quantidade, lote):
+            objetos = []
+            for i in range(inicio, min(inicio + lote, quantidade)):
+                n = inicial + i
+                status = status_ciclo[n % len(status_ciclo)]
+                perito = None if status == "AGUARDANDO_PERITO" else peritos[n % len(peritos)]
+                objetos.append(
+                    Ocorrencia(
+                        numero_ocorrencia=f"{PREFIXO_BENCH}{n:08d}",
+                        servico_pericial_id=servicos[n % len(servicos)],
+                        unidade_demandante_id=unidade,
+                        autoridade_id=autoridade,
+                        cidade_id=cidades[n % len(cidades)],
+                        classificacao_id=classificacoes[n % len(classificacoes)],
+                        perito_atribuido_id=perito,
+                        status=status,
+                        data_finalizacao=(
+                            agora - timedelta(days=n % 700)
+                            if status == "FINALIZADA"
+                            else None
+                        ),
+                    )
+                )
+            with transaction.atomic():
+                Ocorrencia.all_objects.bulk_create(objetos, batch_size=lote)
+
+        # created_at é auto_now_add: espalha as datas em ~2 anos depois do insert
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Ocorrencia._meta.db_table} "
+                "SET created_at = created_at - (id %% 730) * INTERVAL '1 day' "
+                "WHERE numero_ocorrencia LIKE %s",
+                [f"{PREFIXO_BENCH}%"],
+            )
+        self.stdout.write(self.style.SUCCESS("✅ Massa sintética criada."))
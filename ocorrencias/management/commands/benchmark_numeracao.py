@@ -0,0 +1,164 @@
+# ocorrencias/management/commands/benchmark_numeracao.py
+
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from autoridades.models import Autoridade
+from cidades.models import Cidade
+from classificacoes.models import ClassificacaoOcorrencia
+from servicos_periciais.models import ServicoPericial
+from unidades_demandantes.models import UnidadeDemandante
+
+from ocorrencias.models import (
+    Ocorrencia,
+    OcorrenciaResumoDiario,
+    SequencialOcorrencia,
+)
+from ocorrencias.utils.numeracao import (
+    formatar_numero,
+    gerar_numero_ocorrencia,
+    nome_sequencia,
+)
+from ocorrencias.utils.resumo import reconstruir_resumo
+
+# Os números do benchmark são do "ano 99" (99MM.....): não consomem a
+# sequência nem o contador do ano corrente
+AGORA_BENCH = datetime.datetime(2099, 1, 1, 12, 0)
+ANO_BENCH = AGORA_BENCH.year % 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria ocorrências a partir de várias threads ao mesmo tempo e compara "
+        "a numeração por sequência com o contador travado (legado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=16, help="Threads simultâneas (padrão: 16)"
+        )
+        parser.add_argument(
+            "--por-thread",
+            type=int,
+            default=25,
+            help="Ocorrências criadas por thread (padrão: 25)",
+        )
+        parser.add_argument(
+            "--modo",
+            choices=["sequencia", "legado", "ambos"],
+            default="ambos",
+            help="Alocador a medir (padrão: ambos)",
+        )
+
+    def handle(self, *args, **options):
+        self.dados = self.dados_base()
+        modos = ["legado", "sequencia"] if options["modo"] == "ambos" else [options["modo"]]
+        try:
+            for modo in modos:
+                self.medir(modo, options["threads"], options["por_thread"])
+        finally:
+            self.limpar()
+
+    def dados_base(self):
+        servico = ServicoPericial.objects.first()
+        dados = {
+            "servico_pericial": servico,
+            "unidade_demandante": UnidadeDemandante.objects.first(),
+            "autoridade": Autoridade.objects.first(),
+            "cidade": Cidade.objects.first(),
+            "classificacao": ClassificacaoOcorrencia.objects.filter(
+                parent__isnull=False
+            ).first(),
+        }
+        if not all(dados.values()):
+            raise CommandError(
+                "Cadastre ao menos um serviço, unidade, autoridade, cidade e "
+                "subclassificação antes do benchmark."
+            )
+        return dados
+
+    def numero_legado(self):
+        """Lógica antiga: trava a linha do ano até o fim da transação."""
+        sequencial, _ = SequencialOcorrencia.objects.select_for_update().get_or_create(
+            ano=ANO_BENCH, defaults={"ultimo_sequencial": 0}
+        )
+        sequencial.ultimo_sequencial += 1
+        sequencial.save()
+        return formatar_numero(
+            sequencial.ultimo_sequencial,
+            self.dados["servico_pericial"].sigla,
+            AGORA_BENCH,
+        )
+
+    def criar(self, modo):
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            if modo == "legado":
+                numero = self.numero_legado()
+            else:
+                numero = gerar_numero_ocorrencia(
+                    self.dados["servico_pericial"].sigla, agora=AGORA_BENCH
+                )
+            Ocorrencia(numero_ocorrencia=numero, **self.dados).save()
+        return (time.perf_counter() - inicio) * 1000
+
+    def medir(self, modo, threads, por_thread):
+        tempos = []
+        trava = threading.Lock()
+        if modo == "legado":
+            # Cria a linha antes, para as threads só disputarem a trava
+            SequencialOcorrencia.objects.get_or_create(ano=ANO_BENCH)
+
+        def trabalhador():
+            try:
+                parciais = [self.criar(modo) for _ in range(por_thread)]
+                with trava:
+                    tempos.extend(parciais)
+            finally:
+                connection.close()
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for futuro in [pool.submit(trabalhador) for _ in range(threads)]:
+                futuro.result()
+        duracao = time.perf_counter() - inicio
+
+        criadas = Ocorrencia.all_objects.filter(
+            numero_ocorrencia__startswith=f"{ANO_BENCH:02d}"
+        )
+        total = criadas.count()
+        distintos = criadas.values("numero_ocorrencia").distinct().count()
+        tempos.sort()
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(f"Modo:                  {modo}")
+        self.stdout.write(f"Threads x por thread:  {threads} x {por_thread}")
+        self.stdout.write(f"Ocorrências criadas:   {total} ({distintos} números distintos)")
+        self.stdout.write(f"Tempo total:           {duracao:.2f} s")
+        self.stdout.write(f"Vazão:                 {total / duracao:.1f} ocorrências/s")
+        self.stdout.write(f"Latência mediana:      {tempos[len(tempos) // 2]:.1f} ms")
+        self.stdout.write(f"Latência p95:          {tempos[int(len(tempos) * 0.95)]:.1f} ms")
+        self.stdout.write("=" * 60)
+        if distintos != total:
+            raise CommandError("Números repetidos na numeração!")
+
+        self.limpar()
+
+    def limpar(self):
+        Ocorrencia.all_objects.filter(
+            numero_ocorrencia__startswith=f"{ANO_BENCH:02d}"
+        ).delete()
+        SequencialOcorrencia.objects.filter(ano=ANO_BENCH).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SEQUENCE IF EXISTS {nome_sequencia(ANO_BENCH)}")
+        # O resumo de hoje recebeu as ocorrências do benchmark pelo save()
+        hoje = timezone.localdate()
+        reconstruir_resumo(
+            Ocorrencia.all_objects.all(), OcorrenciaResumoDiario, hoje, hoje
+        )
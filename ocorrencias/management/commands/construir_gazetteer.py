@@ -0,0 +1,130 @@
+# ocorrencias/management/commands/construir_gazetteer.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count
+from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+
+from cidades.models import Bairro, Cidade
+from ocorrencias.endereco_models import CentroideLocalidade, EnderecoOcorrencia
+from ocorrencias.utils.geocoding import consultar_servico
+
+
+class Command(BaseCommand):
+    help = (
+        "Monta o gazetteer offline (centróides de cidades e bairros) usado "
+        "pelos níveis 2 e 3 da geocodificação. Centróides manuais não são "
+        "sobrescritos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-pontos",
+            type=int,
+            default=3,
+            help="Mínimo de endereços geocodificados para usar a média (padrão: 3)",
+        )
+        parser.add_argument(
+            "--nominatim",
+            action="store_true",
+            help="Consulta o Nominatim (uma vez) para cidades/bairros sem centróide",
+        )
+
+    def handle(self, *args, **options):
+        min_pontos = options["min_pontos"]
+        manuais = set(
+            CentroideLocalidade.objects.filter(
+                origem=CentroideLocalidade.Origem.MANUAL
+            ).values_list("cidade_id", "bairro_id")
+        )
+
+        com_coordenadas = EnderecoOcorrencia.objects.filter(
+            tipo="EXTERNA", latitude__isnull=False, longitude__isnull=False
+        ).order_by()
+        medias = {"latitude": Avg("latitude"), "longitude": Avg("longitude")}
+
+        self.stdout.write("⏳ Calculando centróides a partir dos endereços...")
+        gravados = 0
+        for linha in (
+            com_coordenadas.filter(bairro_novo__isnull=False)
+            .values("bairro_novo_id", "bairro_novo__cidade_id")
+            .annotate(total=Count("id"), **medias)
+            .filter(total__gte=min_pontos)
+        ):
+            chave = (linha["bairro_novo__cidade_id"], linha["bairro_novo_id"])
+            gravados += self.gravar(chave, linha, manuais)
+
+        for linha in (
+            com_coordenadas.filter(ocorrencia__cidade__isnull=False)
+            .values("ocorrencia__cidade_id")
+            .annotate(total=Count("id"), **medias)
+            .filter(total__gte=min_pontos)
+        ):
+            chave = (linha["ocorrencia__cidade_id"], None)
+            gravados += self.gravar(chave, linha, manuais)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {gravados} centróides calculados."))
+
+        if options["nominatim"]:
+            self.completar_com_nominatim()
+
+    def gravar(self, chave, linha, manuais, origem=CentroideLocalidade.Origem.ENDERECOS):
+        if chave in manuais:
+            return 0
+        cidade_id, bairro_id = chave
+        CentroideLocalidade.objects.update_or_create(
+            cidade_id=cidade_id,
+            bairro_id=bairro_id,
+            defaults={
+                "latitude": round(linha["latitude"], 7),
+                "longitude": round(linha["longitude"], 7),
+                "total_pontos": linha.get("total", 0),
+                "origem": origem,
+            },
+        )
+        return 1
+
+    def completar_com_nominatim(self):
+        """
+        Uma consulta por cidade/bairro ainda sem centróide (com cache; o
+        limite de taxa fica a cargo do token bucket de consultar_servico).
+        """
+        existentes = set(
+            CentroideLocalidade.objects.values_list("cidade_id", "bairro_id")
+        )
+        pendentes = [
+            ((cidade.id, None), f"{cidade.nome}, Roraima, Brasil", 3)
+            for cidade in Cidade.objects.all()
+            if (cidade.id, None) not in existentes
+        ] + [
+            (
+                (bairro.cidade_id, bairro.id),
+                f"{bairro.nome}, {bairro.cidade.nome}, Roraima, Brasil",
+                2,
+            )
+            for bairro in Bairro.objects.select_related("cidade")
+            if (bairro.cidade_id, bairro.id) not in existentes
+            and "RURAL" not in bairro.nome
+        ]
+
+        self.stdout.write(f"🌐 {len(pendentes)} localidades sem centróide...")
+        encontrados = 0
+        for chave, query, nivel in pendentes:
+            try:
+                consulta = consultar_servico(query, nivel=nivel)
+            except (GeocoderTimedOut, GeocoderServiceError) as e:
+                self.stdout.write(self.style.WARNING(f"   ⚠️ {query}: {e}"))
+                time.sleep(2)
+                continue
+
+            if consulta["latitude"] is not None:
+                encontrados += self.gravar(
+                    chave, consulta, set(), origem=CentroideLocalidade.Origem.NOMINATIM
+                )
+            else:
+                self.stdout.write(f"   ❌ {query}")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ {encontrados} centróides obtidos do Nominatim.")
+        )
@@ -6,6 +6,7 @@
 
 from django.core.management.base import BaseCommand
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +32,34 @@ class Command(BaseCommand):
             default=None,
             help="Processar apenas um endereço específico pelo ID",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Threads consumindo a fila (padrão: 4)",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=25,
+            help="Endereços reservados e gravados por lote (padrão: 25)",
+        )
+        parser.add_argument(
+            "--refazer-falhas",
+            action="store_true",
+            help="Devolve para a fila os endereços que falharam antes",
+        )
+        parser.add_argument(
+            "--continuo",
+            action="store_true",
+            help="Não termina: fica processando a fila (endereços enviados pela API)",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=int,
+            default=10,
+            help="Segundos entre verificações da fila no modo contínuo (padrão: 10)",
+        )
 
     def handle(self, *args, **options):
         limite = options.get("limite")
@@ -49,33 +78,50 @@ class Command(BaseCommand):
                 self.style.WARNING("🔍 MODO SIMULAÇÃO (não vai salvar no banco)")
             )
 
-        # Importar a função auxiliar
-        try:
-            from ocorrencias.utils.geocoding import (
-                geocodificar_com_fallback,
-                reprocessar_enderecos_sem_coordenadas,
-            )
-        except ImportError:
-            self.stdout.write(
-                self.style.ERROR(
-                    "\n❌ ERRO: Não foi possível importar o módulo de geocodificação."
-                    "\n   Certifique-se de que o arquivo existe em:"
-                    "\n   ocorrencias/utils/geocoding.py"
-                    "\n   E que existe um __init__.py na pasta utils/"
-                )
-            )
-            return
+        from ocorrencias.utils.geocoding import geocodificar_com_fallback
+        from ocorrencias.utils.geocodificacao_lote import (
+            enderecos_a_enfileirar,
+            enfileirar_pendentes,
+            processar_fila,
+        )
 
         # Processar um único endereço
         if endereco_id:
             self.processar_unico(endereco_id, dry_run, geocodificar_com_fallback)
             return
 
-        # Processar múltiplos endereços
-        self.stdout.write(f"⏳ Buscando endereços sem coordenadas...")
-
-        estatisticas = reprocessar_enderecos_sem_coordenadas(
-            limite=limite, dry_run=dry_run
+        if options["continuo"]:
+            self.stdout.write("🔁 Modo contínuo: aguardando endereços na fila...")
+            while True:
+                estatisticas = processar_fila(
+                    workers=options["workers"], lote=options["lote"]
+                )
+                if estatisticas["total"]:
+                    self.stdout.write(
+                        f"📍 {estatisticas['total']} processados: "
+                        f"{estatisticas['sucesso']} ok, {estatisticas['falha']} falhas"
+                    )
+                else:
+                    time.sleep(options["intervalo"])
+
+        # Processar múltiplos endereços (a fila guarda o progresso: se a
+        # execução for interrompida, basta rodar de novo)
+        if dry_run:
+            # Simulação não mexe na fila: só informa quantos entrariam
+            novos = enderecos_a_enfileirar().count()
+            self.stdout.write(
+                f"🔍 {novos} endereços sem coordenadas seriam enfileirados."
+            )
+        else:
+            self.stdout.write("⏳ Enfileirando endereços sem coordenadas...")
+            novos = enfileirar_pendentes(refazer_falhas=options["refazer_falhas"])
+            self.stdout.write(f"   {novos} novos endereços na fila.")
+
+        estatisticas = processar_fila(
+            workers=options["workers"],
+            lote=options["lote"],
+            limite=limite,
+            dry_run=dry_run,
         )
 
         # Exibir resumo
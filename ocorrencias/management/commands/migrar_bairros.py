@@ -1,13 +1,29 @@
 # ocorrencias/management/commands/migrar_bairros.py
 
+import csv
+
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from ocorrencias.endereco_models import EnderecoOcorrencia
+from django.db.models import Count, F
+from django.utils import timezone
+
 from cidades.models import Bairro, Cidade
+from ocorrencias.endereco_models import EnderecoOcorrencia
+from ocorrencias.models import VersaoDados
+from ocorrencias.utils.bairros import IndiceBairros, chave_bairro
+
+EXATO = "EXATO"
+SIMILAR = "SIMILAR"
+REVISAR = "REVISAR"
+NOVO = "NOVO"
+IGNORADO = "IGNORADO"
 
 
 class Command(BaseCommand):
-    help = "Migra bairros do campo texto (bairro_legado) para a tabela normalizada (Bairro)"
+    help = (
+        "Migra bairros do campo texto (bairro_legado) para a tabela normalizada "
+        "(Bairro), casando grafias com erro/sem acento por similaridade"
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -15,13 +31,41 @@ class Command(BaseCommand):
             action="store_true",
             help="Apenas mostra o que seria feito, sem executar",
         )
-
-    def normalize_bairro_name(self, nome):
-        """Normaliza o nome do bairro para comparação"""
-        if not nome:
-            return ""
-        # Remove espaços extras, converte para maiúsculo
-        return " ".join(nome.upper().split())
+        parser.add_argument(
+            "--limiar",
+            type=float,
+            default=0.88,
+            help="Similaridade mínima para vincular automaticamente (padrão: 0.88)",
+        )
+        parser.add_argument(
+            "--limiar-revisao",
+            type=float,
+            default=0.75,
+            help="Abaixo do limiar e acima deste valor, o caso vai para revisão "
+            "(padrão: 0.75)",
+        )
+        parser.add_argument(
+            "--aceitar-revisao",
+            action="store_true",
+            help="Vincula também os casos marcados para revisão",
+        )
+        parser.add_argument(
+            "--nao-criar",
+            action="store_true",
+            help="Não cria bairros novos para grafias sem correspondência",
+        )
+        parser.add_argument(
+            "--relatorio",
+            type=str,
+            default=None,
+            help="Arquivo CSV do relatório (padrão: relatorio_bairros_AAAAMMDD_HHMM.csv)",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Endereços gravados por lote (padrão: 1000)",
+        )
 
     def handle(self, *args, **options):
         dry_run = options["dry_run"]
@@ -38,114 +82,148 @@ class Command(BaseCommand):
             EnderecoOcorrencia.objects.filter(bairro_novo__isnull=True)
             .exclude(bairro_legado__isnull=True)
             .exclude(bairro_legado="")
-            .select_related("ocorrencia__cidade")
         )
+        sem_cidade = enderecos.filter(ocorrencia__cidade__isnull=True).count()
+        if sem_cidade:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"  ⚠️ {sem_cidade} endereços sem cidade vinculada - IGNORADOS"
+                )
+            )
+        enderecos = enderecos.filter(ocorrencia__cidade__isnull=False)
 
-        total = enderecos.count()
-        self.stdout.write(f"Encontrados {total} endereços para processar\n")
+        # Uma linha por grafia distinta (não por endereço); as mais
+        # frequentes primeiro, para virarem o nome dos bairros novos
+        grafias = list(
+            enderecos.order_by()
+            .values("ocorrencia__cidade_id", "bairro_legado")
+            .annotate(quantidade=Count("id"))
+            .order_by("ocorrencia__cidade_id", "-quantidade", "bairro_legado")
+        )
+        total = sum(g["quantidade"] for g in grafias)
+        self.stdout.write(
+            f"Encontrados {total} endereços para processar "
+            f"({len(grafias)} grafias distintas)\n"
+        )
 
         if total == 0:
             self.stdout.write(self.style.SUCCESS("Nenhum endereço para migrar!"))
             return
 
-        # Agrupa por cidade e bairro para análise
-        analise = {}
-        for endereco in enderecos:
-            cidade = endereco.ocorrencia.cidade if endereco.ocorrencia else None
-            if not cidade:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f"  ⚠️ Endereço ID {endereco.id} sem cidade vinculada - IGNORADO"
-                    )
-                )
-                continue
+        cidades = dict(
+            Cidade.objects.filter(
+                id__in={g["ocorrencia__cidade_id"] for g in grafias}
+            ).values_list("id", "nome")
+        )
+        indice = IndiceBairros()
+        for bairro_id, cidade_id, nome in Bairro.objects.filter(
+            cidade_id__in=cidades
+        ).values_list("id", "cidade_id", "nome"):
+            indice.adicionar(cidade_id, bairro_id, nome)
 
-            bairro_normalizado = self.normalize_bairro_name(endereco.bairro_legado)
+        # ==========================================
+        # CASAMENTO DAS GRAFIAS
+        # ==========================================
+        decisoes = []
+        criados = 0
+        for grafia in grafias:
+            cidade_id = grafia["ocorrencia__cidade_id"]
+            legado = grafia["bairro_legado"]
+            encontrado = indice.melhor(cidade_id, legado)
+            referencia, nota = encontrado or (None, 0.0)
 
-            if cidade.id not in analise:
-                analise[cidade.id] = {"cidade": cidade, "bairros": {}}
+            # "-", "Bairro", "B." etc.: nada sobra para casar nem para virar
+            # nome de bairro novo — só entra no relatório
+            if not chave_bairro(legado):
+                decisao = IGNORADO
+            elif nota == 1.0:
+                decisao = EXATO
+            elif nota >= options["limiar"]:
+                decisao = SIMILAR
+            elif nota >= options["limiar_revisao"]:
+                decisao = REVISAR
+            else:
+                decisao = NOVO
 
-            if bairro_normalizado not in analise[cidade.id]["bairros"]:
-                analise[cidade.id]["bairros"][bairro_normalizado] = {
-                    "variacoes": set(),
-                    "enderecos": [],
-                }
+            if decisao == NOVO:
+                nome_novo = " ".join(legado.upper().split())
+                referencia = nome_novo
+                if not dry_run and not options["nao_criar"]:
+                    referencia, created = Bairro.objects.get_or_create(
+                        nome=nome_novo, cidade_id=cidade_id
+                    )
+                    referencia = referencia.id
+                    criados += int(created)
+                # Grafias seguintes (com erro) casam com o bairro recém-criado
+                indice.adicionar(cidade_id, referencia, nome_novo)
 
-            analise[cidade.id]["bairros"][bairro_normalizado]["variacoes"].add(
-                endereco.bairro_legado
+            aplicar = decisao in (EXATO, SIMILAR, NOVO) or (
+                decisao == REVISAR and options["aceitar_revisao"]
             )
-            analise[cidade.id]["bairros"][bairro_normalizado]["enderecos"].append(
-                endereco
-            )
-
-        # Mostra análise
-        self.stdout.write("\n" + "=" * 60)
-        self.stdout.write("ANÁLISE DE BAIRROS POR CIDADE")
-        self.stdout.write("=" * 60 + "\n")
+            if decisao == NOVO and options["nao_criar"]:
+                aplicar = False
 
-        for cidade_id, dados in analise.items():
-            cidade = dados["cidade"]
-            self.stdout.write(f"\n📍 {cidade.nome}:")
-
-            for bairro_norm, info in dados["bairros"].items():
-                variacoes = info["variacoes"]
-                qtd = len(info["enderecos"])
+            decisoes.append(
+                {
+                    "cidade_id": cidade_id,
+                    "cidade": cidades.get(cidade_id, ""),
+                    "bairro_legado": legado,
+                    "quantidade": grafia["quantidade"],
+                    "decisao": decisao,
+                    "bairro": indice.nome(cidade_id, referencia),
+                    "bairro_id": referencia if isinstance(referencia, int) else None,
+                    "similaridade": round(nota, 3),
+                    "aplicar": aplicar,
+                }
+            )
 
-                if len(variacoes) > 1:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'   ⚠️ "{bairro_norm}" ({qtd} registros) - VARIAÇÕES: {variacoes}'
-                        )
-                    )
-                else:
-                    self.stdout.write(f'   ✓ "{bairro_norm}" ({qtd} registros)')
+        arquivo = options["relatorio"] or (
+            f"relatorio_bairros_{timezone.localtime():%Y%m%d_%H%M}.csv"
+        )
+        self.gravar_relatorio(arquivo, decisoes)
+        self.mostrar_resumo(decisoes, arquivo)
 
         if dry_run:
             self.stdout.write("\n" + self.style.WARNING("=== FIM DO DRY-RUN ==="))
             self.stdout.write("Execute sem --dry-run para aplicar as alterações.")
             return
 
-        # Executa a migração
+        # ==========================================
+        # GRAVAÇÃO EM LOTES (bulk_update)
+        # ==========================================
         self.stdout.write("\n" + "=" * 60)
         self.stdout.write("EXECUTANDO MIGRAÇÃO")
         self.stdout.write("=" * 60 + "\n")
 
-        criados = 0
+        destino = {
+            (d["cidade_id"], d["bairro_legado"]): d["bairro_id"]
+            for d in decisoes
+            if d["aplicar"] and d["bairro_id"]
+        }
         atualizados = 0
-        erros = 0
-
-        with transaction.atomic():
-            for cidade_id, dados in analise.items():
-                cidade = dados["cidade"]
-
-                for bairro_norm, info in dados["bairros"].items():
-                    # Cria ou busca o bairro normalizado
-                    bairro_obj, created = Bairro.objects.get_or_create(
-                        nome=bairro_norm, cidade=cidade
-                    )
+        lote = []
+        agora = timezone.now()
+        for endereco in (
+            enderecos.annotate(cidade_ref=F("ocorrencia__cidade_id"))
+            .only("id", "bairro_legado")
+            .order_by("id")
+            .iterator(chunk_size=options["lote"])
+        ):
+            bairro_id = destino.get((endereco.cidade_ref, endereco.bairro_legado))
+            if not bairro_id:
+                continue
+            endereco.bairro_novo_id = bairro_id
+            endereco.updated_at = agora
+            lote.append(endereco)
+            if len(lote) >= options["lote"]:
+                atualizados += self.gravar_lote(lote)
+                lote = []
+        if lote:
+            atualizados += self.gravar_lote(lote)
 
-                    if created:
-                        criados += 1
-                        self.stdout.write(
-                            self.style.SUCCESS(
-                                f'   ✓ Criado bairro: "{bairro_norm}" em {cidade.nome}'
-                            )
-                        )
-
-                    # Atualiza os endereços
-                    for endereco in info["enderecos"]:
-                        try:
-                            # AJUSTE: Grava no campo 'bairro_novo'
-                            endereco.bairro_novo = bairro_obj
-                            endereco.save(update_fields=["bairro_novo", "updated_at"])
-                            atualizados += 1
-                        except Exception as e:
-                            erros += 1
-                            self.stdout.write(
-                                self.style.ERROR(
-                                    f"   ❌ Erro ao atualizar endereço ID {endereco.id}: {e}"
-                                )
-                            )
+        # bulk_update não dispara signals: invalida o cache das análises
+        if atualizados:
+            VersaoDados.incrementar()
 
         # Resumo final
         self.stdout.write("\n" + "=" * 60)
@@ -153,12 +231,64 @@ class Command(BaseCommand):
         self.stdout.write("=" * 60)
         self.stdout.write(f"  Bairros criados: {criados}")
         self.stdout.write(f"  Endereços atualizados: {atualizados}")
-        self.stdout.write(f"  Erros: {erros}")
+        self.stdout.write("=" * 60 + "\n")
+        self.stdout.write(self.style.SUCCESS("✅ Migração concluída com sucesso!"))
+
+    def gravar_lote(self, enderecos):
+        with transaction.atomic():
+            EnderecoOcorrencia.objects.bulk_update(
+                enderecos, ["bairro_novo", "updated_at"]
+            )
+        return len(enderecos)
+
+    def gravar_relatorio(self, arquivo, decisoes):
+        """CSV para revisão: uma linha por grafia, com a decisão tomada."""
+        with open(arquivo, "w", newline="", encoding="utf-8-sig") as saida:
+            writer = csv.writer(saida, delimiter=";")
+            writer.writerow(
+                [
+                    "Cidade",
+                    "Bairro (texto original)",
+                    "Endereços",
+                    "Decisão",
+                    "Bairro vinculado/sugerido",
+                    "Similaridade",
+                    "Aplicado",
+                ]
+            )
+            for d in decisoes:
+                writer.writerow(
+                    [
+                        d["cidade"],
+                        d["bairro_legado"],
+                        d["quantidade"],
+                        d["decisao"],
+                        d["bairro"],
+                        f"{d['similaridade']:.3f}".replace(".", ","),
+                        "SIM" if d["aplicar"] else "NÃO",
+                    ]
+                )
+
+    def mostrar_resumo(self, decisoes, arquivo):
+        self.stdout.write("\n" + "=" * 60)
+        self.stdout.write("ANÁLISE DE BAIRROS")
         self.stdout.write("=" * 60 + "\n")
 
-        if erros == 0:
-            self.stdout.write(self.style.SUCCESS("✅ Migração concluída com sucesso!"))
-        else:
+        for decisao in (EXATO, SIMILAR, REVISAR, NOVO, IGNORADO):
+            grupo = [d for d in decisoes if d["decisao"] == decisao]
+            enderecos = sum(d["quantidade"] for d in grupo)
             self.stdout.write(
-                self.style.WARNING(f"⚠️ Migração concluída com {erros} erros.")
+                f"  {decisao:8} {len(grupo):6} grafias  {enderecos:8} endereços"
             )
+
+        for d in decisoes:
+            if d["decisao"] == REVISAR:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'   ⚠️ {d["cidade"]}: "{d["bairro_legado"]}" → '
+                        f'"{d["bairro"]}" ({d["similaridade"]:.2f}, '
+                        f'{d["quantidade"]} registros)'
+                    )
+                )
+
+        self.stdout.write(f"\n📄 Relatório completo: {arquivo}")
@@ -0,0 +1,58 @@
+# ocorrencias/management/commands/reconstruir_resumo_ocorrencias.py
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ocorrencias.models import Ocorrencia, OcorrenciaResumoDiario
+from ocorrencias.utils.resumo import reconstruir_resumo
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói o resumo diário das ocorrências (tabela usada pelas "
+        "estatísticas e relatórios). Use após importações em massa ou "
+        "alterações feitas direto no banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--data-inicio",
+            type=str,
+            default=None,
+            help="Primeiro dia a reconstruir (AAAA-MM-DD). Padrão: desde o início",
+        )
+        parser.add_argument(
+            "--data-fim",
+            type=str,
+            default=None,
+            help="Último dia a reconstruir (AAAA-MM-DD). Padrão: até hoje",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Quantidade de linhas gravadas por lote (padrão: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        dia_inicio = self.parse_data(options["data_inicio"])
+        dia_fim = self.parse_data(options["data_fim"])
+
+        self.stdout.write("⏳ Reconstruindo resumo diário das ocorrências...")
+        total = reconstruir_resumo(
+            Ocorrencia.all_objects.all(),
+            OcorrenciaResumoDiario,
+            dia_inicio=dia_inicio,
+            dia_fim=dia_fim,
+            batch_size=options["lote"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} linhas de resumo gravadas."))
+
+    def parse_data(self, valor):
+        if not valor:
+            return None
+        try:
+            return datetime.strptime(valor, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"Data inválida: {valor} (use AAAA-MM-DD)")
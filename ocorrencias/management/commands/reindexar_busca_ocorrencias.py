@@ -0,0 +1,45 @@
+# ocorrencias/management/commands/reindexar_busca_ocorrencias.py
+
+from django.core.management.base import BaseCommand
+
+from ocorrencias.models import Ocorrencia
+from ocorrencias.utils.busca import atualizar_documentos_busca
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o documento de busca (tsvector + trigrama) das ocorrências. "
+        "Use após importações em massa (bulk_create/update não passam pelo save; "
+        "renomear peritos, autoridades etc. já reindexa sozinho)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Quantidade de ocorrências gravadas por lote (padrão: 1000)",
+        )
+        parser.add_argument(
+            "--id",
+            type=int,
+            default=None,
+            help="Reindexar apenas uma ocorrência específica pelo ID",
+        )
+        parser.add_argument(
+            "--apenas-vazias",
+            action="store_true",
+            help="Processa só ocorrências que ainda não têm documento de busca",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Ocorrencia.all_objects.all()
+
+        if options["id"]:
+            queryset = queryset.filter(pk=options["id"])
+        if options["apenas_vazias"]:
+            queryset = queryset.filter(busca_documento="")
+
+        self.stdout.write("⏳ Reindexando documento de busca das ocorrências...")
+        total = atualizar_documentos_busca(queryset, batch_size=options["lote"])
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} ocorrências reindexadas."))
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ocorrencias", "0015_ocorrencia_laudo_entregue"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ocorrencia",
+            index=models.Index(
+                fields=["created_at", "id"], name="ocorrencia_created_id_idx"
+            ),
+        ),
+    ]
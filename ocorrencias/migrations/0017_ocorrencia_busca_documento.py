@@ -0,0 +1,54 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def preencher_documentos_busca(apps, schema_editor):
+    from ocorrencias.utils.busca import atualizar_documentos_busca
+
+    Ocorrencia = apps.get_model("ocorrencias", "Ocorrencia")
+    atualizar_documentos_busca(Ocorrencia._base_manager.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ocorrencias", "0016_ocorrencia_created_id_idx"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="ocorrencia",
+            name="busca_documento",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Documento de Busca",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ocorrencia",
+            name="busca_vetor",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(preencher_documentos_busca, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="ocorrencia",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["busca_vetor"], name="ocorrencia_busca_vetor_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ocorrencia",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["busca_documento"],
+                name="ocorrencia_busca_trgm_gin",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,141 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_resumo_diario(apps, schema_editor):
+    from ocorrencias.utils.resumo import reconstruir_resumo
+
+    Ocorrencia = apps.get_model("ocorrencias", "Ocorrencia")
+    OcorrenciaResumoDiario = apps.get_model("ocorrencias", "OcorrenciaResumoDiario")
+    reconstruir_resumo(Ocorrencia._base_manager.all(), OcorrenciaResumoDiario)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("cidades", "0003_bairro"),
+        ("classificacoes", "0002_classificacaoocorrencia_servicos_periciais"),
+        ("servicos_periciais", "0002_auto_20250920_1114"),
+        ("ocorrencias", "0017_ocorrencia_busca_documento"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ocorrencia",
+            index=models.Index(
+                fields=["data_finalizacao"], name="ocorrencia_data_finaliz_idx"
+            ),
+        ),
+        migrations.CreateModel(
+            name="OcorrenciaResumoDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dia", models.DateField(verbose_name="Dia de Criação")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("AGUARDANDO_PERITO", "Aguardando Atribuição de Perito"),
+                            ("EM_ANALISE", "Em Análise"),
+                            ("LAUDO_ENTREGUE", "Laudo Entregue"),
+                            ("FINALIZADA", "Finalizada"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("total_exames", models.PositiveIntegerField(default=0)),
+                ("total_com_laudo", models.PositiveIntegerField(default=0)),
+                ("qtd_criacao_laudo", models.PositiveIntegerField(default=0)),
+                ("segundos_criacao_laudo", models.BigIntegerField(default=0)),
+                ("qtd_laudo_finalizacao", models.PositiveIntegerField(default=0)),
+                ("segundos_laudo_finalizacao", models.BigIntegerField(default=0)),
+                ("qtd_criacao_finalizacao", models.PositiveIntegerField(default=0)),
+                ("segundos_criacao_finalizacao", models.BigIntegerField(default=0)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+                (
+                    "cidade",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="cidades.cidade",
+                    ),
+                ),
+                (
+                    "classificacao",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="classificacoes.classificacaoocorrencia",
+                    ),
+                ),
+                (
+                    "perito",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "servico_pericial",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="servicos_periciais.servicopericial",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Resumo Diário de Ocorrências",
+                "verbose_name_plural": "Resumos Diários de Ocorrências",
+                "indexes": [
+                    models.Index(
+                        fields=["servico_pericial", "dia"],
+                        name="resumo_diario_servico_idx",
+                    ),
+                    models.Index(
+                        fields=["perito", "dia"], name="resumo_diario_perito_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("perito__isnull", False)),
+                        fields=(
+                            "dia",
+                            "servico_pericial",
+                            "classificacao",
+                            "cidade",
+                            "perito",
+                            "status",
+                        ),
+                        name="resumo_diario_chave_uniq",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("perito__isnull", True)),
+                        fields=(
+                            "dia",
+                            "servico_pericial",
+                            "classificacao",
+                            "cidade",
+                            "status",
+                        ),
+                        name="resumo_diario_chave_sem_perito_uniq",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(preencher_resumo_diario, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ocorrencias", "0018_ocorrenciaresumodiario"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VersaoDados",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chave", models.CharField(max_length=50, unique=True)),
+                ("versao", models.BigIntegerField(default=0)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Versão dos Dados",
+                "verbose_name_plural": "Versões dos Dados",
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ocorrencias", "0019_versaodados"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="enderecoocorrencia",
+            index=models.Index(
+                condition=models.Q(
+                    ("latitude__isnull", False),
+                    ("longitude__isnull", False),
+                    ("tipo", "EXTERNA"),
+                ),
+                fields=["latitude", "longitude"],
+                name="endereco_ocorrencia_geo_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,114 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cidades", "0003_bairro"),
+        ("ocorrencias", "0020_enderecoocorrencia_geo_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeocodeCache",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("consulta", models.CharField(max_length=255, unique=True)),
+                (
+                    "nivel",
+                    models.PositiveSmallIntegerField(verbose_name="Nível Alcançado"),
+                ),
+                ("encontrado", models.BooleanField(default=False)),
+                (
+                    "latitude",
+                    models.DecimalField(
+                        blank=True, decimal_places=7, max_digits=10, null=True
+                    ),
+                ),
+                (
+                    "longitude",
+                    models.DecimalField(
+                        blank=True, decimal_places=7, max_digits=10, null=True
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Cache de Geocodificação",
+                "verbose_name_plural": "Cache de Geocodificação",
+            },
+        ),
+        migrations.CreateModel(
+            name="CentroideLocalidade",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("latitude", models.DecimalField(decimal_places=7, max_digits=10)),
+                ("longitude", models.DecimalField(decimal_places=7, max_digits=10)),
+                (
+                    "origem",
+                    models.CharField(
+                        choices=[
+                            ("ENDERECOS", "Média dos Endereços Geocodificados"),
+                            ("NOMINATIM", "Nominatim (consulta única)"),
+                            ("MANUAL", "Informado Manualmente"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("total_pontos", models.PositiveIntegerField(default=0)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+                (
+                    "bairro",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="cidades.bairro",
+                    ),
+                ),
+                (
+                    "cidade",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="cidades.cidade",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Centróide de Localidade",
+                "verbose_name_plural": "Centróides de Localidades",
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("bairro__isnull", False)),
+                        fields=("cidade", "bairro"),
+                        name="centroide_bairro_uniq",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("bairro__isnull", True)),
+                        fields=("cidade",),
+                        name="centroide_cidade_uniq",
+                    ),
+                ],
+            },
+        ),
+    ]
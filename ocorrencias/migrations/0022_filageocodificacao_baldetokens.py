@@ -0,0 +1,87 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ocorrencias", "0021_geocodecache_centroidelocalidade"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BaldeTokens",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chave", models.CharField(max_length=50, unique=True)),
+                ("tokens", models.FloatField(default=0)),
+                (
+                    "atualizado_em",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+            options={
+                "verbose_name": "Balde de Tokens",
+                "verbose_name_plural": "Baldes de Tokens",
+            },
+        ),
+        migrations.CreateModel(
+            name="FilaGeocodificacao",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDENTE", "Pendente"),
+                            ("PROCESSANDO", "Processando"),
+                            ("CONCLUIDO", "Concluído"),
+                            ("FALHA", "Falha"),
+                        ],
+                        default="PENDENTE",
+                        max_length=12,
+                    ),
+                ),
+                ("tentativas", models.PositiveSmallIntegerField(default=0)),
+                ("nivel", models.PositiveSmallIntegerField(blank=True, null=True)),
+                ("erro", models.CharField(blank=True, max_length=255)),
+                ("reservado_em", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+                (
+                    "endereco",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fila_geocodificacao",
+                        to="ocorrencias.enderecoocorrencia",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Fila de Geocodificação",
+                "verbose_name_plural": "Fila de Geocodificação",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "id"], name="fila_geocod_status_idx"
+                    )
+                ],
+            },
+        ),
+    ]
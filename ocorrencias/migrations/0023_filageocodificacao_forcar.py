@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ocorrencias", "0022_filageocodificacao_baldetokens"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="filageocodificacao",
+            name="forcar",
+            field=models.BooleanField(default=False),
+        ),
+    ]
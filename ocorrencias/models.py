@@ -1,8 +1,9 @@
 # ocorrencias/models.py
 
-import datetime
-from django.db import models, transaction, IntegrityError
+from django.db import models, transaction
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 import time
 
@@ -16,6 +17,14 @@ from cidades.models import Cidade
 from autoridades.models import Autoridade
 from classificacoes.models import ClassificacaoOcorrencia
 from exames.models import Exame
+from .utils.busca import (
+    CAMPOS_FONTE_BUSCA,
+    montar_documento_busca,
+    valores_busca_da_instancia,
+    vetor_busca,
+)
+from .utils.numeracao import gerar_numero_ocorrencia
+from .utils.resumo import agendar_atualizacao_resumo, chave_resumo
 
 
 # ============================================================================
@@ -23,7 +32,15 @@ from exames.models import Exame
 # ============================================================================
 class SequencialOcorrencia(models.Model):
     """
-    Controla o sequencial de numeração das ocorrências por ano.
+    Contador legado da numeração por ano. A numeração hoje usa uma sequência
+    do PostgreSQL por ano (utils/numeracao.py); este valor só é lido para
+    iniciar a sequência de um ano acima do último número já emitido.
+
+    Decisão: sequência em vez deste contador. O contador travava a linha do
+    ano até o commit de cada cadastro (cadastros simultâneos em fila); o
+    nextval não trava nada, mas não volta num rollback. Números nunca se
+    repetem e seguem crescentes, porém um cadastro desfeito deixa uma lacuna
+    na numeração do ano — aceita em troca da entrada sem fila.
     """
 
     ano = models.PositiveSmallIntegerField(unique=True, verbose_name="Ano (2 dígitos)")
@@ -179,6 +196,12 @@ class Ocorrencia(AuditModel):
         null=True, blank=True, editable=False, verbose_name="Última Edição do Histórico"
     )
 
+    # DOCUMENTO DE BUSCA (mantido no save, usado pelo filtro busca_geral)
+    busca_documento = models.TextField(
+        blank=True, default="", editable=False, verbose_name="Documento de Busca"
+    )
+    busca_vetor = SearchVectorField(null=True, editable=False)
+
     # CAMPOS DE ASSINATURA DIGITAL
     finalizada_por = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -345,56 +368,28 @@ class Ocorrencia(AuditModel):
     # MÉTODO SAVE COM NOVA LÓGICA DE NUMERAÇÃO
     # =========================================================================
     def save(self, *args, **kwargs):
-        if not self.pk:
-            with transaction.atomic():
-                now = datetime.datetime.now()
-                servico_sigla = self.servico_pericial.sigla
-                ano_2digitos = now.year % 100
-                mes = now.month
-
-                (
-                    sequencial_obj,
-                    created,
-                ) = SequencialOcorrencia.objects.select_for_update().get_or_create(
-                    ano=ano_2digitos, defaults={"ultimo_sequencial": 0}
-                )
-
-                sequencial_obj.ultimo_sequencial += 1
-                sequencial_obj.save()
-
-                numero_base = (
-                    f"{ano_2digitos:02d}{mes:02d}{sequencial_obj.ultimo_sequencial:05d}"
-                )
-
-                self.numero_ocorrencia = f"{numero_base}/{servico_sigla}"
-
-                tentativas = 0
-                max_tentativas = 10
-
-                while tentativas < max_tentativas:
-                    try:
-                        self._executar_save(args, kwargs)
-                        return
-                    except IntegrityError as e:
-                        if "numero_ocorrencia" in str(e) or "unique" in str(e).lower():
-                            tentativas += 1
-                            sequencial_obj.refresh_from_db()
-                            sequencial_obj.ultimo_sequencial += 1
-                            sequencial_obj.save()
-                            numero_base = f"{ano_2digitos:02d}{mes:02d}{sequencial_obj.ultimo_sequencial:05d}"
-                            self.numero_ocorrencia = f"{numero_base}/{servico_sigla}"
-                        else:
-                            raise
-                raise IntegrityError(
-                    f"Não foi possível gerar número único após {max_tentativas} tentativas"
-                )
-        else:
-            self._executar_save(args, kwargs)
+        # Número AAMMSSSSS/SIGLA vindo da sequência do ano, sem travar linha;
+        # importações em massa podem trazê-lo pré-alocado
+        # (gerar_numeros_ocorrencia)
+        if not self.pk and not self.numero_ocorrencia:
+            self.numero_ocorrencia = gerar_numero_ocorrencia(
+                self.servico_pericial.sigla
+            )
+        self._executar_save(args, kwargs)
 
     def _executar_save(self, args, kwargs):
-        if self.pk:
+        chave_anterior = None
+        alterados = None
+        if self.pk and self.tem_estado_carregado:
+            # Valores lidos do banco ficam na instância (AuditModel): sem query
+            alterados = self.campos_alterados()
+            chave_anterior = chave_resumo(self.versao_carregada())
+            if "historico" in alterados:
+                self.historico_ultima_edicao = timezone.now()
+        elif self.pk:
             try:
                 versao_antiga = Ocorrencia.objects.get(pk=self.pk)
+                chave_anterior = chave_resumo(versao_antiga)
                 if versao_antiga.historico != self.historico:
                     self.historico_ultima_edicao = timezone.now()
             except Ocorrencia.DoesNotExist:
@@ -413,8 +408,43 @@ class Ocorrencia(AuditModel):
         if self.processo_sei_numero:
             self.processo_sei_numero = self.processo_sei_numero.upper()
 
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            fontes_alteradas = CAMPOS_FONTE_BUSCA.intersection(update_fields)
+        elif alterados is not None:
+            fontes_alteradas = {
+                self._meta.get_field(campo).attname for campo in CAMPOS_FONTE_BUSCA
+            }.intersection(self.campos_alterados())
+        else:
+            fontes_alteradas = True
+        if fontes_alteradas:
+            self.busca_documento = montar_documento_busca(
+                valores_busca_da_instancia(self)
+            )
+            self.busca_vetor = vetor_busca(self.busca_documento)
+            if update_fields is not None:
+                kwargs["update_fields"] = list(update_fields) + [
+                    "busca_documento",
+                    "busca_vetor",
+                ]
+
         super(Ocorrencia, self).save(*args, **kwargs)
 
+        if fontes_alteradas:
+            # busca_vetor ficou com a expressão SearchVector: some da instância
+            # (campo adiado, relido do banco só se alguém acessar)
+            self.__dict__.pop("busca_vetor", None)
+            if self.tem_estado_carregado:
+                self._estado_carregado.pop("busca_vetor", None)
+
+        # Resumo diário: recalcula a linha antiga e a nova depois do commit
+        agendar_atualizacao_resumo(chave_anterior, chave_resumo(self))
+
+    def atualizar_resumo(self):
+        """Agenda o recálculo do resumo diário (ex.: após alterar os exames)."""
+        agendar_atualizacao_resumo(chave_resumo(self))
+        transaction.on_commit(VersaoDados.incrementar)
+
     def __str__(self):
         return self.numero_ocorrencia
 
@@ -422,6 +452,21 @@ class Ocorrencia(AuditModel):
         verbose_name = "Ocorrência"
         verbose_name_plural = "Ocorrências"
         ordering = ["-created_at"]
+        indexes = [
+            # Chave da paginação por cursor (keyset)
+            models.Index(fields=["created_at", "id"], name="ocorrencia_created_id_idx"),
+            # Contagem de finalizadas por período (estatísticas)
+            models.Index(
+                fields=["data_finalizacao"], name="ocorrencia_data_finaliz_idx"
+            ),
+            # Busca geral: full-text + trigrama (LIKE '%termo%')
+            GinIndex(fields=["busca_vetor"], name="ocorrencia_busca_vetor_gin"),
+            GinIndex(
+                fields=["busca_documento"],
+                opclasses=["gin_trgm_ops"],
+                name="ocorrencia_busca_trgm_gin",
+            ),
+        ]
 
 
 # ============================================================================
@@ -471,4 +516,132 @@ class HistoricoVinculacao(models.Model):
         ordering = ["-timestamp"]
 
 
-from .endereco_models import EnderecoOcorrencia, TipoOcorrencia
+# ============================================================================
+# MODEL: Resumo Diário (tabela fato para estatísticas e relatórios)
+# ============================================================================
+class OcorrenciaResumoDiario(models.Model):
+    """
+    Contagens agregadas por dia de criação × serviço × classificação ×
+    cidade × perito × status. Mantido pelo save e pela exclusão física da
+    Ocorrencia; escritas em massa (bulk_create, update, SQL) exigem
+    `manage.py reconstruir_resumo_ocorrencias` em seguida.
+    """
+
+    dia = models.DateField(verbose_name="Dia de Criação")
+    servico_pericial = models.ForeignKey(
+        ServicoPericial, on_delete=models.CASCADE, related_name="+"
+    )
+    classificacao = models.ForeignKey(
+        ClassificacaoOcorrencia, on_delete=models.CASCADE, related_name="+"
+    )
+    cidade = models.ForeignKey(Cidade, on_delete=models.CASCADE, related_name="+")
+    perito = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    status = models.CharField(max_length=20, choices=Ocorrencia.Status.choices)
+
+    total = models.PositiveIntegerField(default=0)
+    total_exames = models.PositiveIntegerField(default=0)
+    total_com_laudo = models.PositiveIntegerField(default=0)
+
+    # Durações somadas em segundos (média = segundos / qtd)
+    qtd_criacao_laudo = models.PositiveIntegerField(default=0)
+    segundos_criacao_laudo = models.BigIntegerField(default=0)
+    qtd_laudo_finalizacao = models.PositiveIntegerField(default=0)
+    segundos_laudo_finalizacao = models.BigIntegerField(default=0)
+    qtd_criacao_finalizacao = models.PositiveIntegerField(default=0)
+    segundos_criacao_finalizacao = models.BigIntegerField(default=0)
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Resumo Diário de Ocorrências"
+        verbose_name_plural = "Resumos Diários de Ocorrências"
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "dia",
+                    "servico_pericial",
+                    "classificacao",
+                    "cidade",
+                    "perito",
+                    "status",
+                ],
+                condition=models.Q(perito__isnull=False),
+                name="resumo_diario_chave_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=[
+                    "dia",
+                    "servico_pericial",
+                    "classificacao",
+                    "cidade",
+                    "status",
+                ],
+                condition=models.Q(perito__isnull=True),
+                name="resumo_diario_chave_sem_perito_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["servico_pericial", "dia"], name="resumo_diario_servico_idx"
+            ),
+            models.Index(fields=["perito", "dia"], name="resumo_diario_perito_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.dia:%d/%m/%Y} - {self.status}: {self.total}"
+
+
+
+# ============================================================================
+# MODEL: Versão dos dados de análise (invalida o cache de respostas)
+# ============================================================================
+class VersaoDados(models.Model):
+    """
+    Contador incrementado a cada escrita em Ocorrencia, EnderecoOcorrencia
+    e OrdemServico. Fica no banco (e não no cache) para que todos os
+    processos vejam a mesma versão, qualquer que seja o backend de cache.
+    """
+
+    CHAVE_ANALISE = "analise"
+
+    chave = models.CharField(max_length=50, unique=True)
+    versao = models.BigIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Versão dos Dados"
+        verbose_name_plural = "Versões dos Dados"
+
+    def __str__(self):
+        return f"{self.chave}: {self.versao}"
+
+    @classmethod
+    def atual(cls, chave=CHAVE_ANALISE):
+        versao = (
+            cls.objects.filter(chave=chave).values_list("versao", flat=True).first()
+        )
+        return versao or 0
+
+    @classmethod
+    def incrementar(cls, chave=CHAVE_ANALISE):
+        atualizadas = cls.objects.filter(chave=chave).update(
+            versao=models.F("versao") + 1, atualizado_em=timezone.now()
+        )
+        if not atualizadas:
+            cls.objects.get_or_create(chave=chave, defaults={"versao": 1})
+
+
+from .endereco_models import (
+    BaldeTokens,
+    CentroideLocalidade,
+    EnderecoOcorrencia,
+    FilaGeocodificacao,
+    GeocodeCache,
+    TipoOcorrencia,
+)
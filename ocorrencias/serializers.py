@@ -132,6 +132,7 @@ class OcorrenciaListSerializer(serializers.ModelSerializer):
 
     # ========== NOVO CAMPO ==========
     tem_movimentacao_pendente = serializers.SerializerMethodField()
+    total_movimentacoes_pendentes = serializers.SerializerMethodField()
     # ================================
 
     class Meta:
@@ -151,6 +152,7 @@ class OcorrenciaListSerializer(serializers.ModelSerializer):
             "esta_finalizada",
             "classificacao",
             "tem_movimentacao_pendente",
+            "total_movimentacoes_pendentes",
         ]
 
     def get_status_prazo(self, obj):
@@ -195,10 +197,24 @@ class OcorrenciaListSerializer(serializers.ModelSerializer):
     def get_tem_movimentacao_pendente(self, obj):
         """
         Retorna True se existe movimentação não visualizada pelo admin.
+        Usa a anotação feita pelo OcorrenciaViewSet quando disponível.
         """
+        anotado = getattr(obj, "tem_movimentacao_pendente", None)
+        if anotado is not None:
+            return anotado
+        return self._movimentacoes_pendentes(obj).exists()
+
+    def get_total_movimentacoes_pendentes(self, obj):
+        anotado = getattr(obj, "total_movimentacoes_pendentes", None)
+        if anotado is not None:
+            return anotado
+        return self._movimentacoes_pendentes(obj).count()
+
+    @staticmethod
+    def _movimentacoes_pendentes(obj):
         return obj.movimentacoes.filter(
             visualizado_admin=False, deleted_at__isnull=True
-        ).exists()
+        )
 
     # =================================
 
@@ -520,6 +536,9 @@ class OcorrenciaUpdateSerializer(serializers.ModelSerializer):
             if novos:
                 OcorrenciaExame.objects.bulk_create(novos)
 
+        if exames_com_qtd is not None or exames_ids is not None:
+            instance.atualizar_resumo()
+
         return instance
 
 
@@ -823,4 +842,7 @@ class OcorrenciaCreateSerializer(serializers.ModelSerializer):
             if novos:
                 OcorrenciaExame.objects.bulk_create(novos)
 
+        if exames_com_qtd or exames_ids:
+            ocorrencia.atualizar_resumo()
+
         return ocorrencia
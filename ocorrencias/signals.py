@@ -0,0 +1,76 @@
+"""
+# SPR-CRIMINALÍSTICA - Sistema de Organização Pericial
+# Desenvolvido por: Perito Criminal Sttefani Ribeiro
+# Versão 1.0 - 2025
+
+Signals que incrementam a versão dos dados de análise (cache de respostas
+dos dashboards) quando ocorrências, endereços ou OS são gravados/excluídos,
+que mantêm o resumo diário em dia quando uma ocorrência é excluída
+fisicamente, e que reindexam o documento de busca quando um nome que faz parte dele
+(perito, autoridade, unidade, serviço, cidade) é renomeado.
+"""
+
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+
+# (app_label, model) cujas escritas invalidam o cache de análise
+MODELOS_VERSIONADOS = (
+    ("ocorrencias", "Ocorrencia"),
+    ("ocorrencias", "EnderecoOcorrencia"),
+    ("ordens_servico", "OrdemServico"),
+)
+
+
+def incrementar_versao_dados(sender, **kwargs):
+    from .models import VersaoDados
+
+    # Depois do commit: quem ler a nova versão já enxerga os dados novos
+    transaction.on_commit(VersaoDados.incrementar)
+
+
+def atualizar_resumo_excluida(sender, instance, **kwargs):
+    """Exclusão física (o soft delete já passa pelo save): tira do resumo."""
+    from .utils.resumo import agendar_atualizacao_resumo, chave_resumo
+
+    agendar_atualizacao_resumo(chave_resumo(instance))
+
+
+def relacoes_busca():
+    """{model relacionado: [(campo FK em Ocorrencia, campo do nome)]}."""
+    from .models import Ocorrencia
+    from .utils.busca import CAMPOS_DOCUMENTO_BUSCA
+
+    relacoes = {}
+    for campo in CAMPOS_DOCUMENTO_BUSCA:
+        if "__" in campo:
+            relacao, atributo = campo.split("__")
+            model = Ocorrencia._meta.get_field(relacao).related_model
+            relacoes.setdefault(model, []).append((relacao, atributo))
+    return relacoes
+
+
+def reindexar_busca_relacionadas(sender, instance, created, update_fields=None, **kwargs):
+    """Renomeou um perito/autoridade/etc.: reindexa as ocorrências dele."""
+    if created or kwargs.get("raw"):
+        return
+    if update_fields is not None:
+        alterados = set(update_fields)
+    else:
+        # AuditModel: None quando a instância não veio do banco (assume mudou)
+        alterados = instance.campos_alterados()
+
+    filtro = Q()
+    for relacao, atributo in relacoes_busca()[sender]:
+        if alterados is None or atributo in alterados:
+            filtro |= Q(**{relacao: instance.pk})
+    if filtro:
+        transaction.on_commit(partial(_reindexar_ocorrencias, filtro))
+
+
+def _reindexar_ocorrencias(filtro):
+    from .models import Ocorrencia
+    from .utils.busca import atualizar_documentos_busca
+
+    atualizar_documentos_busca(Ocorrencia.all_objects.filter(filtro))
@@ -0,0 +1,548 @@
+import datetime
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from autoridades.models import Autoridade
+from cargos.models import Cargo
+from cidades.models import Bairro, Cidade
+from classificacoes.models import ClassificacaoOcorrencia
+from movimentacoes.models import Movimentacao
+from servicos_periciais.models import ServicoPericial
+from unidades_demandantes.models import UnidadeDemandante
+from usuarios.models import User
+
+from .endereco_models import (
+    BaldeTokens,
+    CentroideLocalidade,
+    EnderecoOcorrencia,
+    FilaGeocodificacao,
+    GeocodeCache,
+)
+from .models import Ocorrencia, OcorrenciaResumoDiario
+from .utils.busca import valores_busca_da_instancia
+from .utils.geocodificacao_lote import (
+    RESERVA_EXPIRA,
+    enfileirar,
+    processar_lote,
+    reservar_lote,
+)
+from .utils.geocoding import (
+    adquirir_token,
+    consultar_servico,
+    geocodificar_com_fallback,
+    reprocessar_enderecos_sem_coordenadas,
+)
+from .utils.numeracao import gerar_numeros_ocorrencia
+
+
+def criar_cadastros_basicos():
+    """Serviço, unidade, autoridade, cidade e classificação mínimos."""
+    servico = ServicoPericial.objects.create(sigla="SPT", nome="Serviço de Teste")
+    cargo = Cargo.objects.create(nome="Delegado")
+    classificacao_pai = ClassificacaoOcorrencia.objects.create(
+        codigo="1.0", nome="Crimes contra a pessoa"
+    )
+    return {
+        "servico_pericial": servico,
+        "unidade_demandante": UnidadeDemandante.objects.create(
+            sigla="1DP", nome="1º Distrito Policial"
+        ),
+        "autoridade": Autoridade.objects.create(nome="Autoridade Teste", cargo=cargo),
+        "cidade": Cidade.objects.create(nome="Cidade Teste"),
+        "classificacao": ClassificacaoOcorrencia.objects.create(
+            codigo="1.0.1", nome="Homicídio", parent=classificacao_pai
+        ),
+    }
+
+
+class ListagemMovimentacoesPendentesTests(APITestCase):
+    """A listagem anota as movimentações pendentes na própria query."""
+
+    TOTAL = 100
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@teste.local",
+            password="senha-teste",
+            nome_completo="Administrador",
+            cpf="00000000000",
+        )
+        cls.perito = User.objects.create_user(
+            email="perito@teste.local",
+            password="senha-teste",
+            nome_completo="Perito Teste",
+            cpf="11111111111",
+            perfil="PERITO",
+        )
+        cadastros = criar_cadastros_basicos()
+        for i in range(cls.TOTAL):
+            ocorrencia = Ocorrencia.objects.create(
+                perito_atribuido=cls.perito if i % 2 else None,
+                created_by=cls.admin,
+                **cadastros,
+            )
+            # Ocorrências pares ficam com i % 3 movimentações não visualizadas
+            for j in range(i % 3 if i % 2 == 0 else 0):
+                Movimentacao.objects.create(
+                    ocorrencia=ocorrencia,
+                    assunto=f"Movimentação {j}",
+                    descricao="Teste",
+                )
+            if i % 5 == 0:
+                Movimentacao.objects.create(
+                    ocorrencia=ocorrencia,
+                    assunto="Já visualizada",
+                    descricao="Teste",
+                    visualizado_admin=True,
+                )
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def listar(self, **params):
+        response = self.client.get("/api/ocorrencias/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_pagina_de_100_linhas_com_queries_constantes(self):
+        # A página (já com as anotações) + prefetch dos exames e dos serviços
+        # e subgrupos da classificação, independente do número de linhas
+        with self.assertNumQueries(4):
+            linhas = self.listar(cursor="", page_size=self.TOTAL)
+        self.assertEqual(len(linhas), self.TOTAL)
+
+    def test_queries_nao_crescem_com_o_tamanho_da_pagina(self):
+        with CaptureQueriesContext(connection) as pequena:
+            self.listar(cursor="", page_size=5)
+        with CaptureQueriesContext(connection) as grande:
+            self.listar(cursor="", page_size=self.TOTAL)
+        self.assertEqual(len(pequena), len(grande))
+
+    def test_flag_e_contagem_de_pendentes(self):
+        esperado = {
+            ocorrencia.id: ocorrencia.movimentacoes.filter(
+                visualizado_admin=False, deleted_at__isnull=True
+            ).count()
+            for ocorrencia in Ocorrencia.objects.all()
+        }
+        for linha in self.listar(cursor="", page_size=self.TOTAL):
+            total = esperado[linha["id"]]
+            self.assertEqual(linha["total_movimentacoes_pendentes"], total)
+            self.assertIs(linha["tem_movimentacao_pendente"], total > 0)
+
+
+class DocumentoBuscaTests(TestCase):
+    """Documento de busca montado sem lazy-loads e reindexado ao renomear."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cadastros = criar_cadastros_basicos()
+        cls.perito = User.objects.create_user(
+            email="perito@teste.local",
+            password="senha-teste",
+            nome_completo="Fulano de Tal",
+            cpf="11111111111",
+            perfil="PERITO",
+        )
+
+    def criar_por_ids(self):
+        return Ocorrencia.objects.create(
+            perito_atribuido_id=self.perito.id,
+            **{f"{campo}_id": objeto.id for campo, objeto in self.cadastros.items()},
+        )
+
+    def test_relacoes_nao_carregadas_sao_lidas_numa_query(self):
+        ocorrencia = Ocorrencia(
+            perito_atribuido_id=self.perito.id,
+            **{f"{campo}_id": objeto.id for campo, objeto in self.cadastros.items()},
+        )
+        with self.assertNumQueries(1):
+            valores = valores_busca_da_instancia(ocorrencia)
+        self.assertIn("Fulano de Tal", valores)
+        self.assertIn("AUTORIDADE TESTE", valores)
+        self.assertIn("CIDADE TESTE", valores)
+
+    def test_relacoes_carregadas_nao_geram_query(self):
+        ocorrencia = Ocorrencia(perito_atribuido=self.perito, **self.cadastros)
+        with self.assertNumQueries(0):
+            valores_busca_da_instancia(ocorrencia)
+
+    def test_save_nao_deixa_expressao_na_instancia(self):
+        ocorrencia = self.criar_por_ids()
+        self.assertNotIn("busca_vetor", ocorrencia.__dict__)
+        self.assertIn("fulano", ocorrencia.busca_vetor)
+
+    def test_renomear_relacionado_reindexa_as_ocorrencias(self):
+        ocorrencia = self.criar_por_ids()
+        autoridade = Autoridade.objects.get(pk=self.cadastros["autoridade"].pk)
+        perito = User.objects.get(pk=self.perito.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            autoridade.nome = "Beltrano Delegado"
+            autoridade.save()
+            perito.nome_completo = "Sicrano Perito"
+            perito.save()
+
+        ocorrencia.refresh_from_db()
+        self.assertIn("beltrano delegado", ocorrencia.busca_documento)
+        self.assertIn("sicrano perito", ocorrencia.busca_documento)
+        self.assertNotIn("fulano", ocorrencia.busca_documento)
+
+    def test_salvar_sem_renomear_nao_reindexa(self):
+        self.criar_por_ids()
+        perito = User.objects.get(pk=self.perito.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            perito.telefone_celular = "65999999999"
+            perito.save()
+        self.assertNotIn(
+            "_reindexar_ocorrencias",
+            [getattr(c, "func", c).__name__ for c in callbacks],
+        )
+
+
+class ResumoDiarioTests(TestCase):
+    """O resumo acompanha saves e exclusões físicas das ocorrências."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cadastros = criar_cadastros_basicos()
+
+    def criar(self, quantidade):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(quantidade):
+                Ocorrencia.objects.create(**self.cadastros)
+
+    def total_resumo(self):
+        return sum(OcorrenciaResumoDiario.objects.values_list("total", flat=True))
+
+    def test_exclusao_fisica_atualiza_o_resumo(self):
+        self.criar(3)
+        self.assertEqual(self.total_resumo(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ocorrencia.all_objects.filter(
+                pk=Ocorrencia.objects.values("pk")[:1]
+            ).delete()
+        self.assertEqual(self.total_resumo(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Ocorrencia.all_objects.all().delete()
+        self.assertFalse(OcorrenciaResumoDiario.objects.exists())
+
+    def test_chaves_repetidas_recalculam_uma_vez(self):
+        self.criar(5)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Ocorrencia.all_objects.all().delete()
+        # Um callback por linha excluída, mas só o primeiro recalcula
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                if getattr(callback, "func", callback).__name__ == "_recalcular_pendentes":
+                    callback()
+        travas = [q for q in queries if "pg_advisory_xact_lock" in q["sql"]]
+        self.assertEqual(len(travas), 1)
+        self.assertFalse(OcorrenciaResumoDiario.objects.exists())
+
+
+class MigrarBairrosTests(TestCase):
+    """Grafias sem nome útil ("-", "Bairro") não viram bairro nem quebram."""
+
+    GRAFIAS = ["Centro", "centro.", "-", "Bairro", "B.", "."]
+
+    @classmethod
+    def setUpTestData(cls):
+        cadastros = criar_cadastros_basicos()
+        for grafia in cls.GRAFIAS:
+            EnderecoOcorrencia.objects.create(
+                ocorrencia=Ocorrencia.objects.create(**cadastros),
+                bairro_legado=grafia,
+            )
+
+    def migrar(self, *args):
+        with tempfile.TemporaryDirectory() as pasta:
+            call_command(
+                "migrar_bairros",
+                *args,
+                relatorio=os.path.join(pasta, "relatorio.csv"),
+                stdout=StringIO(),
+            )
+
+    def test_dry_run_com_grafias_vazias(self):
+        self.migrar("--dry-run")
+        self.assertFalse(Bairro.objects.exists())
+
+    def test_grafias_vazias_ficam_sem_bairro(self):
+        self.migrar()
+
+        self.assertEqual(list(Bairro.objects.values_list("nome", flat=True)), ["CENTRO"])
+        vinculados = dict(
+            EnderecoOcorrencia.objects.values_list("bairro_legado", "bairro_novo__nome")
+        )
+        self.assertEqual(vinculados["Centro"], "CENTRO")
+        self.assertEqual(vinculados["centro."], "CENTRO")
+        for grafia in ("-", "Bairro", "B.", "."):
+            self.assertIsNone(vinculados[grafia])
+
+
+class NumeracaoOcorrenciaTests(TestCase):
+    """Sequência do ano: números crescentes e únicos; rollback deixa lacuna."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cadastros = criar_cadastros_basicos()
+
+    def sequencial(self, ocorrencia):
+        return int(ocorrencia.numero_ocorrencia.split("/")[0][4:])
+
+    def test_numeros_crescentes_no_formato_do_ano(self):
+        primeira = Ocorrencia.objects.create(**self.cadastros)
+        segunda = Ocorrencia.objects.create(**self.cadastros)
+
+        self.assertRegex(primeira.numero_ocorrencia, r"^\d{4}\d{5}/SPT$")
+        self.assertEqual(self.sequencial(segunda), self.sequencial(primeira) + 1)
+
+    def test_insert_desfeito_deixa_lacuna_sem_repetir(self):
+        primeira = Ocorrencia.objects.create(**self.cadastros)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Ocorrencia.objects.create(**dict(self.cadastros, classificacao=None))
+        segunda = Ocorrencia.objects.create(**self.cadastros)
+
+        # Trade-off documentado em SequencialOcorrencia
+        self.assertEqual(self.sequencial(segunda), self.sequencial(primeira) + 2)
+
+    def test_bloco_pre_alocado_e_unico(self):
+        numeros = gerar_numeros_ocorrencia(["SPT", "SPT", "OUT"])
+        avulso = Ocorrencia.objects.create(**self.cadastros)
+
+        self.assertEqual(len(set(numeros)), 3)
+        self.assertTrue(numeros[2].endswith("/OUT"))
+        self.assertNotIn(avulso.numero_ocorrencia, numeros)
+
+
+class BackendContador:
+    """Backend de teste: conta as chamadas e devolve `resposta` (sem rede)."""
+
+    requisicoes_por_segundo = None
+
+    def __init__(self, resposta=None):
+        self.resposta = resposta
+        self.consultas = []
+
+    def geocode(self, query):
+        self.consultas.append(query)
+        return self.resposta
+
+
+class GeocodeCacheTests(TestCase):
+    """Nível 1: consultas repetidas saem do GeocodeCache, sem ir ao serviço."""
+
+    def test_consulta_repetida_vem_do_cache(self):
+        backend = BackendContador((2.8235, -60.6758))
+
+        primeira = consultar_servico("Rua Ajuricaba, 10, Boa Vista", backend=backend)
+        segunda = consultar_servico("  RUA AJURICABA 10 - boa vista", backend=backend)
+
+        self.assertFalse(primeira["do_cache"])
+        self.assertTrue(segunda["do_cache"])
+        self.assertEqual((segunda["latitude"], segunda["longitude"]), (2.8235, -60.6758))
+        self.assertEqual(len(backend.consultas), 1)
+
+    @override_settings(GEOCODE_CACHE_NEGATIVO_DIAS=30)
+    def test_consulta_sem_resultado_expira(self):
+        backend = BackendContador(None)
+        consulta = "Rua Inexistente, Boa Vista"
+
+        consultar_servico(consulta, backend=backend)
+        self.assertTrue(consultar_servico(consulta, backend=backend)["do_cache"])
+        self.assertEqual(len(backend.consultas), 1)
+
+        # update() não passa pelo auto_now
+        GeocodeCache.objects.update(
+            atualizado_em=timezone.now() - datetime.timedelta(days=31)
+        )
+        resultado = consultar_servico(consulta, backend=backend)
+
+        self.assertFalse(resultado["do_cache"])
+        self.assertIsNone(resultado["latitude"])
+        self.assertEqual(len(backend.consultas), 2)
+
+
+class GazetteerTests(TestCase):
+    """Níveis 2 e 3: centróides do gazetteer, sem chamada externa."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cadastros = criar_cadastros_basicos()
+        cidade = cls.cadastros["cidade"]
+        cls.bairro = Bairro.objects.create(nome="Centro", cidade=cidade)
+        CentroideLocalidade.objects.create(
+            cidade=cidade,
+            latitude=Decimal("2.8"),
+            longitude=Decimal("-60.7"),
+            origem=CentroideLocalidade.Origem.MANUAL,
+        )
+        CentroideLocalidade.objects.create(
+            cidade=cidade,
+            bairro=cls.bairro,
+            latitude=Decimal("2.82"),
+            longitude=Decimal("-60.67"),
+            origem=CentroideLocalidade.Origem.MANUAL,
+        )
+
+    def setUp(self):
+        self.backend = BackendContador(None)
+        patcher = mock.patch(
+            "ocorrencias.utils.geocoding.obter_backend", return_value=self.backend
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def endereco(self, **campos):
+        return EnderecoOcorrencia.objects.create(
+            ocorrencia=Ocorrencia.objects.create(**self.cadastros), **campos
+        )
+
+    def test_nivel_2_centroide_do_bairro(self):
+        endereco = self.endereco(logradouro="Rua Sem Cadastro", bairro_novo=self.bairro)
+
+        resultado = geocodificar_com_fallback(endereco)
+
+        self.assertEqual(resultado["nivel"], 2)
+        self.assertEqual(len(self.backend.consultas), 1)
+        endereco.refresh_from_db()
+        self.assertEqual(endereco.latitude, Decimal("2.82"))
+
+    def test_bairro_legado_pelo_nome(self):
+        endereco = self.endereco(bairro_legado="  centro ")
+
+        resultado = geocodificar_com_fallback(endereco)
+
+        self.assertEqual(resultado["nivel"], 2)
+        self.assertEqual(self.backend.consultas, [])
+
+    def test_nivel_3_centroide_da_cidade(self):
+        for bairro in ("Zona Rural", "Bairro Sem Centróide"):
+            with self.subTest(bairro=bairro):
+                endereco = self.endereco(bairro_legado=bairro)
+
+                resultado = geocodificar_com_fallback(endereco)
+
+                self.assertEqual(resultado["nivel"], 3)
+                self.assertEqual(
+                    (resultado["latitude"], resultado["longitude"]), (2.8, -60.7)
+                )
+
+
+class FilaGeocodificacaoTests(TestCase):
+    """Fila da geocodificação em lote: retomada, pedido manual e simulação."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cadastros = criar_cadastros_basicos()
+
+    def setUp(self):
+        self.backend = BackendContador((2.81, -60.68))
+        patcher = mock.patch(
+            "ocorrencias.utils.geocoding.obter_backend", return_value=self.backend
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def endereco(self, **campos):
+        return EnderecoOcorrencia.objects.create(
+            ocorrencia=Ocorrencia.objects.create(**self.cadastros),
+            logradouro="Rua Ajuricaba",
+            **campos,
+        )
+
+    def test_reserva_expirada_e_retomada(self):
+        expirado = FilaGeocodificacao.objects.create(
+            endereco=self.endereco(),
+            status=FilaGeocodificacao.Status.PROCESSANDO,
+            tentativas=1,
+            reservado_em=timezone.now() - RESERVA_EXPIRA - datetime.timedelta(minutes=1),
+        )
+        FilaGeocodificacao.objects.create(
+            endereco=self.endereco(),
+            status=FilaGeocodificacao.Status.PROCESSANDO,
+            tentativas=1,
+            reservado_em=timezone.now(),
+        )
+
+        itens = reservar_lote(10)
+
+        self.assertEqual([item.id for item in itens], [expirado.id])
+        self.assertEqual(itens[0].tentativas, 2)
+        processar_lote(itens)
+        expirado.refresh_from_db()
+        self.assertEqual(expirado.status, FilaGeocodificacao.Status.CONCLUIDO)
+        self.assertIsNone(expirado.reservado_em)
+
+    def test_pedido_manual_regeocodifica_endereco_com_coordenadas(self):
+        endereco = self.endereco(latitude=Decimal("1.5"), longitude=Decimal("-61"))
+
+        enfileirar([endereco.id])
+        processar_lote(reservar_lote(10))
+        endereco.refresh_from_db()
+        self.assertEqual(endereco.latitude, Decimal("1.5"))
+        self.assertEqual(self.backend.consultas, [])
+
+        enfileirar([endereco.id], forcar=True)
+        estatisticas = processar_lote(reservar_lote(10))
+
+        self.assertEqual(estatisticas["por_nivel"][1], 1)
+        endereco.refresh_from_db()
+        self.assertEqual(endereco.latitude, Decimal("2.81"))
+        item = FilaGeocodificacao.objects.get(endereco=endereco)
+        self.assertEqual((item.status, item.nivel, item.forcar), ("CONCLUIDO", 1, False))
+
+    def test_dry_run_nao_enfileira(self):
+        self.endereco()
+
+        estatisticas = reprocessar_enderecos_sem_coordenadas(dry_run=True, workers=1)
+
+        self.assertEqual(estatisticas["a_enfileirar"], 1)
+        self.assertEqual(estatisticas["total"], 0)
+        self.assertFalse(FilaGeocodificacao.objects.exists())
+
+
+class BaldeTokensTests(TransactionTestCase):
+    """O token bucket do geocoder vale para todas as threads juntas."""
+
+    TAXA = 20
+
+    def retirar(self, chave, quantidade):
+        try:
+            for _ in range(quantidade):
+                adquirir_token(chave, self.TAXA)
+        finally:
+            connection.close()
+
+    def test_threads_dividem_o_mesmo_balde(self):
+        inicio = time.monotonic()
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            for futuro in [pool.submit(self.retirar, "teste", 3) for _ in range(3)]:
+                futuro.result()
+        decorrido = time.monotonic() - inicio
+
+        # 9 tokens com 1 no balde: pelo menos 8 reposições de 1/TAXA s
+        self.assertGreaterEqual(decorrido, 8 / self.TAXA)
+        self.assertLess(BaldeTokens.objects.get(chave="teste").tokens, 1)
+
+    def test_chaves_diferentes_nao_esperam(self):
+        with mock.patch("ocorrencias.utils.geocoding.time.sleep") as sleep:
+            self.retirar("servico-a", 1)
+            self.retirar("servico-b", 1)
+        sleep.assert_not_called()
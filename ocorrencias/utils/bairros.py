@@ -0,0 +1,92 @@
+# ============================================
+# ocorrencias/utils/bairros.py
+#
+# CASAMENTO APROXIMADO DE BAIRROS (TEXTO LEGADO -> Bairro)
+# Candidatos bloqueados por cidade e por trigramas em comum; a nota final
+# é a similaridade do difflib entre as chaves normalizadas.
+# Usado pelo comando migrar_bairros
+# ============================================
+
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+# Palavras que não ajudam a distinguir bairros
+PALAVRAS_IGNORADAS = {"BAIRRO", "B", "DO", "DA", "DE", "DOS", "DAS"}
+
+# Quantos candidatos (mais trigramas em comum) chegam a ser pontuados
+MAX_CANDIDATOS = 10
+
+
+def chave_bairro(nome):
+    """MAIÚSCULAS, sem acentos, pontuação e palavras de ligação."""
+    if not nome:
+        return ""
+    sem_acento = (
+        unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode("ascii")
+    )
+    palavras = re.sub(r"[^A-Z0-9]+", " ", sem_acento.upper()).split()
+    return " ".join(p for p in palavras if p not in PALAVRAS_IGNORADAS)
+
+
+def trigramas(chave):
+    texto = f"  {chave} "
+    return {texto[i : i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceBairros:
+    """
+    Bairros conhecidos por cidade, com índice invertido de trigramas. Só os
+    bairros da mesma cidade que dividem trigramas com o nome procurado são
+    comparados, então o custo não cresce com o total de bairros.
+    """
+
+    def __init__(self):
+        self.por_chave = {}
+        self.nomes = {}
+        self.chaves = {}
+        self.invertido = defaultdict(lambda: defaultdict(set))
+
+    def adicionar(self, cidade_id, referencia, nome):
+        """
+        Registra um bairro (referencia = id do Bairro ou o próprio nome).
+        Nomes sem chave ("-", "Bairro") e chaves repetidas não entram.
+        """
+        chave = chave_bairro(nome)
+        if not chave or (cidade_id, chave) in self.por_chave:
+            return
+        self.por_chave[(cidade_id, chave)] = referencia
+        self.nomes[(cidade_id, referencia)] = nome
+        self.chaves[(cidade_id, referencia)] = chave
+        for trigrama in trigramas(chave):
+            self.invertido[cidade_id][trigrama].add(referencia)
+
+    def nome(self, cidade_id, referencia):
+        """Nome do bairro indexado, ou "" (referência nula ou chave vazia)."""
+        return self.nomes.get((cidade_id, referencia), "")
+
+    def melhor(self, cidade_id, nome):
+        """(referencia, similaridade 0..1) do bairro mais parecido, ou None."""
+        chave = chave_bairro(nome)
+        if not chave:
+            return None
+        exato = self.por_chave.get((cidade_id, chave))
+        if exato is not None:
+            return exato, 1.0
+
+        comuns = Counter()
+        for trigrama in trigramas(chave):
+            comuns.update(self.invertido[cidade_id].get(trigrama, ()))
+
+        melhor = None
+        for referencia, _ in comuns.most_common(MAX_CANDIDATOS):
+            comparador = SequenceMatcher(
+                None, chave, self.chaves[(cidade_id, referencia)]
+            )
+            if melhor and comparador.quick_ratio() <= melhor[1]:
+                continue
+            nota = comparador.ratio()
+            if not melhor or nota > melhor[1]:
+                melhor = (referencia, nota)
+        return melhor
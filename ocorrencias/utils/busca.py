@@ -0,0 +1,149 @@
+# ============================================
+# ocorrencias/utils/busca.py
+#
+# DOCUMENTO DE BUSCA DA OCORRÊNCIA (FULL-TEXT + TRIGRAMA)
+# Usado pelo save do model, pelo filtro busca_geral e pelo backfill
+# ============================================
+
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import CharField, TextField, Value
+from django.db.models.functions import Cast
+
+# Campos (no formato de values()) que compõem o documento de busca
+CAMPOS_DOCUMENTO_BUSCA = (
+    "numero_ocorrencia",
+    "historico",
+    "numero_documento_origem",
+    "processo_sei_numero",
+    "perito_atribuido__nome_completo",
+    "autoridade__nome",
+    "unidade_demandante__nome",
+    "servico_pericial__nome",
+    "cidade__nome",
+)
+
+# Campos do model cuja alteração exige recalcular o documento
+CAMPOS_FONTE_BUSCA = {campo.split("__")[0] for campo in CAMPOS_DOCUMENTO_BUSCA}
+
+CONFIG_BUSCA = "simple"
+
+
+def normalizar_busca(texto):
+    """Remove acentos, coloca em minúsculas e colapsa espaços."""
+    if not texto:
+        return ""
+    sem_acento = (
+        unicodedata.normalize("NFKD", str(texto))
+        .encode("ASCII", "ignore")
+        .decode("ASCII")
+    )
+    return " ".join(sem_acento.lower().split())
+
+
+def montar_documento_busca(valores):
+    """Junta os valores (na ordem de CAMPOS_DOCUMENTO_BUSCA) num texto normalizado."""
+    return normalizar_busca(" ".join(str(v) for v in valores if v))
+
+
+def valores_busca_da_instancia(ocorrencia):
+    """
+    Extrai os valores do documento a partir de uma instância de Ocorrencia.
+
+    Relações já carregadas (select_related da view ou objetos atribuídos pelo
+    serializer) são usadas direto; as que faltarem são lidas numa única
+    query, em vez de um lazy-load por relação.
+    """
+    faltantes = {}
+    for campo in CAMPOS_DOCUMENTO_BUSCA:
+        if "__" not in campo:
+            continue
+        relacao, atributo = campo.split("__")
+        field = ocorrencia._meta.get_field(relacao)
+        pk = getattr(ocorrencia, field.attname)
+        if pk is not None and not field.is_cached(ocorrencia):
+            faltantes[campo] = (field.related_model, pk, atributo)
+    lidos = _ler_valores_relacionados(faltantes)
+
+    valores = []
+    for campo in CAMPOS_DOCUMENTO_BUSCA:
+        if campo in faltantes:
+            valores.append(lidos.get(campo))
+            continue
+        valor = ocorrencia
+        for parte in campo.split("__"):
+            valor = getattr(valor, parte, None) if valor is not None else None
+        valores.append(valor)
+    return valores
+
+
+def _ler_valores_relacionados(faltantes):
+    """{campo: valor} com um SELECT ... UNION ALL por relação não carregada."""
+    consultas = [
+        model._base_manager.filter(pk=pk)
+        .annotate(campo_busca=Value(campo, output_field=CharField()))
+        .values_list("campo_busca", Cast(atributo, TextField()))
+        for campo, (model, pk, atributo) in faltantes.items()
+    ]
+    if not consultas:
+        return {}
+    if len(consultas) > 1:
+        consultas[0] = consultas[0].union(*consultas[1:], all=True)
+    return dict(consultas[0])
+
+
+def vetor_busca(documento):
+    """Expressão tsvector para gravar junto com o documento."""
+    return SearchVector(Value(documento), config=CONFIG_BUSCA)
+
+
+def consulta_prefixos(termo_normalizado):
+    """
+    Monta um tsquery 'palavra:* & palavra:*' a partir do termo já normalizado.
+    Só usa tokens \\w, então o texto do usuário nunca vira sintaxe de tsquery.
+    """
+    tokens = re.findall(r"\w+", termo_normalizado)
+    if not tokens:
+        return None
+    return SearchQuery(
+        " & ".join(f"{token}:*" for token in tokens),
+        search_type="raw",
+        config=CONFIG_BUSCA,
+    )
+
+
+def atualizar_documentos_busca(queryset, batch_size=1000):
+    """
+    Recalcula busca_documento/busca_vetor para o queryset em lotes.
+    Lê apenas values() via iterator, então a memória não cresce com a tabela.
+    Retorna o total de ocorrências atualizadas.
+    """
+    model = queryset.model
+    total = 0
+    lote = []
+
+    def gravar(lote):
+        model._base_manager.bulk_update(lote, ["busca_documento"])
+        model._base_manager.filter(pk__in=[obj.pk for obj in lote]).update(
+            busca_vetor=SearchVector("busca_documento", config=CONFIG_BUSCA)
+        )
+
+    linhas = (
+        queryset.order_by("pk")
+        .values_list("pk", *CAMPOS_DOCUMENTO_BUSCA)
+        .iterator(chunk_size=batch_size)
+    )
+    for pk, *valores in linhas:
+        lote.append(model(pk=pk, busca_documento=montar_documento_busca(valores)))
+        if len(lote) >= batch_size:
+            gravar(lote)
+            total += len(lote)
+            lote = []
+
+    if lote:
+        gravar(lote)
+        total += len(lote)
+
+    return total
@@ -0,0 +1,261 @@
+# ============================================
+# ocorrencias/utils/geocodificacao_lote.py
+#
+# GEOCODIFICAÇÃO EM LOTE
+# Fila persistente (FilaGeocodificacao) consumida por um pool de threads.
+# Cada lote é reservado com FOR UPDATE SKIP LOCKED, geocodificado e gravado
+# com bulk_update; o limite de requisições ao serviço externo é o token
+# bucket compartilhado de consultar_servico.
+# ============================================
+
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ocorrencias.utils.geocoding import geocodificar_com_fallback
+
+logger = logging.getLogger(__name__)
+
+# Reservas mais antigas que isso são de uma execução interrompida
+RESERVA_EXPIRA = datetime.timedelta(minutes=10)
+
+
+def _estatisticas_vazias():
+    return {"total": 0, "sucesso": 0, "falha": 0, "por_nivel": {1: 0, 2: 0, 3: 0}}
+
+
+def enfileirar(endereco_ids, forcar=False):
+    """
+    Coloca os endereços na fila (ou os devolve para PENDENTE). Com forcar,
+    o worker geocodifica de novo mesmo os que já têm coordenadas.
+    """
+    from ocorrencias.endereco_models import FilaGeocodificacao
+
+    endereco_ids = list(endereco_ids)
+    agora = timezone.now()
+    FilaGeocodificacao.objects.bulk_create(
+        [FilaGeocodificacao(endereco_id=pk, forcar=forcar) for pk in endereco_ids],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    fila = FilaGeocodificacao.objects.filter(endereco_id__in=endereco_ids)
+    fila.exclude(status=FilaGeocodificacao.Status.PENDENTE).update(
+        status=FilaGeocodificacao.Status.PENDENTE,
+        forcar=forcar,
+        erro="",
+        reservado_em=None,
+        atualizado_em=agora,
+    )
+    if forcar:
+        # Já pendente sem forcar (ex.: enfileirar_pendentes): passa a forçar
+        fila.filter(forcar=False).update(forcar=True, atualizado_em=agora)
+
+
+def enderecos_a_enfileirar():
+    """Endereços externos sem coordenadas que ainda não estão na fila."""
+    from ocorrencias.endereco_models import EnderecoOcorrencia
+
+    return EnderecoOcorrencia.objects.filter(
+        tipo="EXTERNA",
+        latitude__isnull=True,
+        coordenadas_manuais=False,
+        fila_geocodificacao__isnull=True,
+    )
+
+
+def enfileirar_pendentes(refazer_falhas=False):
+    """
+    Enfileira os endereços externos sem coordenadas que ainda não estão na
+    fila. Com refazer_falhas, as falhas anteriores voltam para PENDENTE.
+    Retorna quantos endereços novos entraram.
+    """
+    from ocorrencias.endereco_models import FilaGeocodificacao
+
+    ids = enderecos_a_enfileirar().values_list("id", flat=True)
+
+    novos = 0
+    lote = []
+    for pk in ids.order_by("id").iterator(chunk_size=2000):
+        lote.append(FilaGeocodificacao(endereco_id=pk))
+        if len(lote) >= 1000:
+            novos += len(
+                FilaGeocodificacao.objects.bulk_create(lote, ignore_conflicts=True)
+            )
+            lote = []
+    if lote:
+        novos += len(FilaGeocodificacao.objects.bulk_create(lote, ignore_conflicts=True))
+
+    if refazer_falhas:
+        FilaGeocodificacao.objects.filter(
+            status=FilaGeocodificacao.Status.FALHA
+        ).update(status=FilaGeocodificacao.Status.PENDENTE, erro="")
+
+    return novos
+
+
+def reservar_lote(tamanho):
+    """
+    Reserva até `tamanho` itens pendentes (ou de reservas expiradas) para
+    esta thread. SKIP LOCKED deixa outras threads/processos pegarem os
+    próximos itens sem esperar.
+    """
+    from ocorrencias.endereco_models import FilaGeocodificacao
+
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            FilaGeocodificacao.objects.filter(
+                Q(status=FilaGeocodificacao.Status.PENDENTE)
+                | Q(
+                    status=FilaGeocodificacao.Status.PROCESSANDO,
+                    reservado_em__lt=agora - RESERVA_EXPIRA,
+                )
+            )
+            .order_by("id")
+            .select_for_update(skip_locked=True)
+            .values_list("id", flat=True)[:tamanho]
+        )
+        FilaGeocodificacao.objects.filter(id__in=ids).update(
+            status=FilaGeocodificacao.Status.PROCESSANDO,
+            reservado_em=agora,
+            tentativas=F("tentativas") + 1,
+        )
+
+    return list(
+        FilaGeocodificacao.objects.filter(id__in=ids).select_related(
+            "endereco",
+            "endereco__ocorrencia",
+            "endereco__ocorrencia__cidade",
+            "endereco__bairro_novo",
+        )
+    )
+
+
+def processar_lote(itens, dry_run=False):
+    """
+    Geocodifica os itens reservados e grava coordenadas e status de uma vez
+    (bulk_update). Itens com `forcar` ignoram as coordenadas atuais do
+    endereço. Em dry_run nada é gravado (processar_fila devolve os itens
+    para a fila no fim).
+    """
+    from ocorrencias.endereco_models import EnderecoOcorrencia, FilaGeocodificacao
+    from ocorrencias.models import VersaoDados
+
+    estatisticas = _estatisticas_vazias()
+    alterados = []
+    agora = timezone.now()
+
+    for item in itens:
+        endereco = item.endereco
+        item.erro = ""
+        try:
+            resultado = geocodificar_com_fallback(
+                endereco, dry_run=True, forcar=item.forcar
+            )
+        except Exception as e:
+            logger.error(f"Endereço ID {endereco.id}: erro na geocodificação: {e}")
+            resultado = {"sucesso": False, "nivel": None}
+            item.erro = str(e)[:255]
+
+        estatisticas["total"] += 1
+        if resultado["sucesso"]:
+            estatisticas["sucesso"] += 1
+            item.status = FilaGeocodificacao.Status.CONCLUIDO
+            item.nivel = resultado["nivel"]
+            if resultado["nivel"]:
+                estatisticas["por_nivel"][resultado["nivel"]] += 1
+                endereco.latitude = str(resultado["latitude"])
+                endereco.longitude = str(resultado["longitude"])
+                endereco.updated_at = agora
+                alterados.append(endereco)
+        else:
+            estatisticas["falha"] += 1
+            item.status = FilaGeocodificacao.Status.FALHA
+            item.erro = item.erro or "Não geocodificado em nenhum nível"
+        item.forcar = False
+        item.reservado_em = None
+        item.atualizado_em = agora
+
+    if dry_run:
+        return estatisticas
+
+    with transaction.atomic():
+        EnderecoOcorrencia.objects.bulk_update(
+            alterados, ["latitude", "longitude", "updated_at"]
+        )
+        FilaGeocodificacao.objects.bulk_update(
+            itens,
+            ["status", "nivel", "erro", "forcar", "reservado_em", "atualizado_em"],
+        )
+    # bulk_update não dispara os signals: invalida o cache das análises aqui
+    if alterados:
+        VersaoDados.incrementar()
+    return estatisticas
+
+
+def processar_fila(workers=4, lote=25, limite=None, dry_run=False):
+    """
+    Consome a fila com `workers` threads até esvaziá-la (ou até `limite`
+    itens). Uma execução interrompida pode ser simplesmente repetida: o que
+    já foi gravado não volta para a fila e as reservas órfãs expiram.
+    """
+    estatisticas = _estatisticas_vazias()
+    trava = threading.Lock()
+    restante = [limite]
+    reservados = []
+
+    def proximo_tamanho():
+        with trava:
+            if restante[0] is None:
+                return lote
+            tamanho = min(lote, restante[0])
+            restante[0] -= tamanho
+            return tamanho
+
+    def trabalhador():
+        try:
+            while True:
+                tamanho = proximo_tamanho()
+                if not tamanho:
+                    return
+                itens = reservar_lote(tamanho)
+                if not itens:
+                    return
+                if dry_run:
+                    # Em simulação os itens ficam reservados até o fim,
+                    # senão as threads os pegariam de novo
+                    with trava:
+                        reservados.extend(item.id for item in itens)
+                parcial = processar_lote(itens, dry_run=dry_run)
+                with trava:
+                    for chave in ("total", "sucesso", "falha"):
+                        estatisticas[chave] += parcial[chave]
+                    for nivel, quantidade in parcial["por_nivel"].items():
+                        estatisticas["por_nivel"][nivel] += quantidade
+                logger.info(
+                    f"📍 Lote de {parcial['total']} endereços: "
+                    f"{parcial['sucesso']} ok, {parcial['falha']} falhas"
+                )
+        finally:
+            connection.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for futuro in [pool.submit(trabalhador) for _ in range(workers)]:
+                futuro.result()
+    finally:
+        if reservados:
+            from ocorrencias.endereco_models import FilaGeocodificacao
+
+            FilaGeocodificacao.objects.filter(id__in=reservados).update(
+                status=FilaGeocodificacao.Status.PENDENTE,
+                reservado_em=None,
+                tentativas=F("tentativas") - 1,
+            )
+
+    return estatisticas
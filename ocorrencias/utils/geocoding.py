@@ -5,28 +5,206 @@
 # NÃO MODIFICA O MODEL - SEGURO PARA PRODUÇÃO
 # ============================================
 
+import datetime
+import functools
+import hashlib
 import logging
+import re
 import time
+import unicodedata
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = "spr_roraima_pericia_v2"
+
+
+# =========================================
+# BACKENDS (configurável em GEOCODER_BACKEND)
+# =========================================
+
+
+class NominatimBackend:
+    """Serviço público do OpenStreetMap: no máximo 1 requisição por segundo."""
+
+    requisicoes_por_segundo = 1.0
+
+    def __init__(self):
+        self.geolocator = Nominatim(user_agent=USER_AGENT, timeout=10)
 
-def geocodificar_com_fallback(endereco, dry_run=False):
+    def geocode(self, query):
+        """(latitude, longitude) ou None; exceções do geopy sobem."""
+        location = self.geolocator.geocode(query, exactly_one=True, timeout=10)
+        return (location.latitude, location.longitude) if location else None
+
+
+class BackendSimulado:
+    """
+    Substituto local para testes e benchmarks: sem rede e sem limite de
+    taxa, devolve coordenadas determinísticas (dentro de Roraima) após
+    `latencia` segundos. Consultas com "inexistente" não são encontradas.
+    """
+
+    requisicoes_por_segundo = None
+    latencia = 0.05
+
+    def geocode(self, query):
+        time.sleep(self.latencia)
+        if "inexistente" in query.lower():
+            return None
+        digest = hashlib.sha1(query.encode()).digest()
+        return (-1.0 + digest[0] / 255 * 6, -64.0 + digest[1] / 255 * 5)
+
+
+@functools.lru_cache(maxsize=None)
+def obter_backend():
+    return import_string(
+        getattr(
+            settings,
+            "GEOCODER_BACKEND",
+            "ocorrencias.utils.geocoding.NominatimBackend",
+        )
+    )()
+
+
+def adquirir_token(chave, taxa, capacidade=1):
+    """
+    Retira um token do balde `chave` (reposto a `taxa` tokens/s, até
+    `capacidade`), esperando se necessário. O estado fica no banco, então
+    o limite vale para todas as threads e processos juntos.
+    """
+    from ocorrencias.endereco_models import BaldeTokens
+
+    while True:
+        with transaction.atomic():
+            balde, _ = BaldeTokens.objects.select_for_update().get_or_create(
+                chave=chave, defaults={"tokens": capacidade}
+            )
+            agora = timezone.now()
+            decorrido = max((agora - balde.atualizado_em).total_seconds(), 0)
+            tokens = min(capacidade, balde.tokens + decorrido * taxa)
+            if tokens >= 1:
+                balde.tokens = tokens - 1
+                balde.atualizado_em = agora
+                balde.save(update_fields=["tokens", "atualizado_em"])
+                return
+            espera = (1 - tokens) / taxa
+        time.sleep(espera)
+
+
+# =========================================
+# CACHE DE CONSULTAS (NÍVEL 1)
+# =========================================
+
+
+def normalizar_consulta(texto):
+    """Chave do cache: minúsculas, sem acentos, pontuação e espaços extras."""
+    sem_acento = (
+        unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    )
+    return " ".join(re.sub(r"[^\w]+", " ", sem_acento.lower()).split())[:255]
+
+
+def consultar_servico(query, nivel=1, backend=None):
+    """
+    Geocodifica `query` passando pelo GeocodeCache; só vai ao backend
+    (Nominatim por padrão) se não houver entrada válida, respeitando o
+    token bucket compartilhado. Consultas sem resultado também são guardadas
+    (e refeitas após GEOCODE_CACHE_NEGATIVO_DIAS). Timeouts e erros de
+    serviço não são guardados e sobem para quem chamou.
+
+    Returns:
+        dict: {'latitude', 'longitude' (None se não encontrado),
+               'do_cache': bool}
+    """
+    from ocorrencias.endereco_models import GeocodeCache
+
+    chave = normalizar_consulta(query)
+    entrada = GeocodeCache.objects.filter(consulta=chave).first()
+    validade_negativa = timezone.now() - datetime.timedelta(
+        days=getattr(settings, "GEOCODE_CACHE_NEGATIVO_DIAS", 30)
+    )
+    if entrada and (entrada.encontrado or entrada.atualizado_em >= validade_negativa):
+        return {
+            "latitude": float(entrada.latitude) if entrada.encontrado else None,
+            "longitude": float(entrada.longitude) if entrada.encontrado else None,
+            "do_cache": True,
+        }
+
+    backend = backend or obter_backend()
+    if backend.requisicoes_por_segundo:
+        adquirir_token(
+            f"geocoder:{type(backend).__name__}", backend.requisicoes_por_segundo
+        )
+    location = backend.geocode(query)
+
+    latitude = round(float(location[0]), 7) if location else None
+    longitude = round(float(location[1]), 7) if location else None
+    GeocodeCache.objects.update_or_create(
+        consulta=chave,
+        defaults={
+            "nivel": nivel,
+            "encontrado": location is not None,
+            "latitude": latitude,
+            "longitude": longitude,
+        },
+    )
+    return {"latitude": latitude, "longitude": longitude, "do_cache": False}
+
+
+# =========================================
+# GAZETTEER OFFLINE (NÍVEIS 2 E 3)
+# =========================================
+
+
+def centroide_bairro(cidade_id, bairro_id=None, bairro_nome=""):
+    """Centróide do bairro (pelo FK ou pelo nome, dentro da cidade) ou None."""
+    from ocorrencias.endereco_models import CentroideLocalidade
+
+    centroides = CentroideLocalidade.objects.filter(
+        cidade_id=cidade_id, bairro__isnull=False
+    )
+    if bairro_id:
+        return centroides.filter(bairro_id=bairro_id).first()
+    # Mesma normalização do Bairro.save()
+    nome = " ".join(bairro_nome.upper().split())
+    return centroides.filter(bairro__nome=nome).first() if nome else None
+
+
+def centroide_cidade(cidade_id):
+    """Centróide (sede) da cidade ou None."""
+    from ocorrencias.endereco_models import CentroideLocalidade
+
+    return CentroideLocalidade.objects.filter(
+        cidade_id=cidade_id, bairro__isnull=True
+    ).first()
+
+
+def geocodificar_com_fallback(endereco, dry_run=False, forcar=False):
     """
     Geocodifica um EnderecoOcorrencia usando múltiplas estratégias de fallback.
 
     SEGURO: Não modifica o model, apenas usa os métodos existentes.
 
     Estratégia:
-    1. Tenta endereço completo (logradouro + bairro + cidade)
-    2. Tenta bairro + cidade (se bairro não for "zona rural")
-    3. Tenta apenas cidade (coordenadas da sede do município)
+    1. Endereço completo (logradouro + bairro + cidade): GeocodeCache e,
+       se não houver entrada, Nominatim
+    2. Centróide do bairro no gazetteer (se bairro não for "zona rural")
+    3. Centróide da cidade no gazetteer (sede do município)
+
+    Os níveis 2 e 3 não fazem chamada externa (ver construir_gazetteer).
 
     Args:
         endereco: Instância de EnderecoOcorrencia
         dry_run: Se True, não salva no banco (apenas simula)
+        forcar: Se True, geocodifica de novo mesmo que já haja coordenadas
+            (coordenadas manuais continuam preservadas)
 
     Returns:
         dict: {
@@ -35,7 +213,8 @@ def geocodificar_com_fallback(endereco, dry_run=False):
             'nivel_nome': str,
             'latitude': float ou None,
             'longitude': float ou None,
-            'query_usada': str
+            'query_usada': str,
+            'consultou_servico': bool (houve chamada ao Nominatim)
         }
     """
 
@@ -46,6 +225,7 @@ def geocodificar_com_fallback(endereco, dry_run=False):
         "latitude": None,
         "longitude": None,
         "query_usada": None,
+        "consultou_servico": False,
     }
 
     # Validações básicas
@@ -57,7 +237,7 @@ def geocodificar_com_fallback(endereco, dry_run=False):
         logger.info(f"Endereço ID {endereco.id}: Coordenadas manuais, ignorando.")
         return resultado
 
-    if endereco.latitude and endereco.longitude:
+    if endereco.latitude and endereco.longitude and not forcar:
         logger.info(f"Endereço ID {endereco.id}: Já possui coordenadas.")
         resultado["sucesso"] = True
         resultado["latitude"] = float(endereco.latitude)
@@ -65,12 +245,14 @@ def geocodificar_com_fallback(endereco, dry_run=False):
         return resultado
 
     # Obter dados para montar as queries
+    cidade_id = None
     cidade_nome = ""
     if (
         hasattr(endereco, "ocorrencia")
         and endereco.ocorrencia
         and endereco.ocorrencia.cidade
     ):
+        cidade_id = endereco.ocorrencia.cidade_id
         cidade_nome = endereco.ocorrencia.cidade.nome
 
     # Obter nome do bairro (prioriza novo, depois legado)
@@ -83,12 +265,32 @@ def geocodificar_com_fallback(endereco, dry_run=False):
     logradouro = endereco.logradouro.strip() if endereco.logradouro else ""
     numero = endereco.numero.strip() if endereco.numero else ""
 
+    def encontrado(nivel, nivel_nome, query, lat, lon):
+        logger.info(f"  ✅ ENCONTRADO: [{lat}, {lon}]")
+
+        resultado["sucesso"] = True
+        resultado["nivel"] = nivel
+        resultado["nivel_nome"] = nivel_nome
+        resultado["latitude"] = lat
+        resultado["longitude"] = lon
+        resultado["query_usada"] = query
+
+        # Salvar no banco (se não for dry_run)
+        if not dry_run:
+            endereco.latitude = str(lat)
+            endereco.longitude = str(lon)
+            # Usar o modo_entrada existente ou manter o atual
+            # NÃO alteramos modo_entrada pois pode não ter o choice novo
+            endereco.save(update_fields=["latitude", "longitude", "updated_at"])
+            logger.info("  💾 SALVO no banco de dados!")
+        else:
+            logger.info("  🔍 DRY-RUN: Não salvo no banco.")
+
+        return resultado
+
     # =========================================
-    # MONTAR QUERIES (do mais específico ao genérico)
+    # NÍVEL 1: Endereço completo (cache ou serviço externo)
     # =========================================
-    queries = []
-
-    # NÍVEL 1: Endereço completo
     if logradouro:
         partes = [logradouro]
         if numero:
@@ -98,191 +300,107 @@ def geocodificar_com_fallback(endereco, dry_run=False):
         if cidade_nome:
             partes.append(cidade_nome)
         partes.extend(["Roraima", "Brasil"])
-        queries.append(
-            {"nivel": 1, "nivel_nome": "ENDERECO_COMPLETO", "query": ", ".join(partes)}
-        )
-
-    # NÍVEL 2: Bairro + Cidade (se não for zona rural genérico)
-    if bairro_nome and cidade_nome:
-        bairro_lower = bairro_nome.lower()
-        # Pula se for zona rural genérica (não vai encontrar)
-        if "zona rural" not in bairro_lower and "rural" not in bairro_lower:
-            queries.append(
-                {
-                    "nivel": 2,
-                    "nivel_nome": "BAIRRO_CIDADE",
-                    "query": f"{bairro_nome}, {cidade_nome}, Roraima, Brasil",
-                }
-            )
-
-    # NÍVEL 3: Apenas Cidade (fallback final - sede do município)
-    if cidade_nome:
-        queries.append(
-            {
-                "nivel": 3,
-                "nivel_nome": "CIDADE_SEDE",
-                "query": f"{cidade_nome}, Roraima, Brasil",
-            }
-        )
+        query = ", ".join(partes)
 
-    if not queries:
-        logger.warning(
-            f"Endereço ID {endereco.id}: Sem dados suficientes para geocodificar."
-        )
-        return resultado
-
-    # =========================================
-    # TENTAR CADA QUERY
-    # =========================================
-    geolocator = Nominatim(user_agent="spr_roraima_pericia_v2", timeout=10)
-
-    for item in queries:
-        nivel = item["nivel"]
-        nivel_nome = item["nivel_nome"]
-        query = item["query"]
-
-        logger.info(
-            f"Endereço ID {endereco.id}: Tentativa nível {nivel} ({nivel_nome})"
-        )
+        logger.info(f"Endereço ID {endereco.id}: Tentativa nível 1 (ENDERECO_COMPLETO)")
         logger.info(f"  Query: {query}")
 
         try:
-            location = geolocator.geocode(query, exactly_one=True, timeout=10)
-
-            if location:
-                lat = float(location.latitude)
-                lon = float(location.longitude)
-
-                logger.info(f"  ✅ ENCONTRADO: [{lat}, {lon}]")
-
-                resultado["sucesso"] = True
-                resultado["nivel"] = nivel
-                resultado["nivel_nome"] = nivel_nome
-                resultado["latitude"] = lat
-                resultado["longitude"] = lon
-                resultado["query_usada"] = query
-
-                # Salvar no banco (se não for dry_run)
-                if not dry_run:
-                    endereco.latitude = str(lat)
-                    endereco.longitude = str(lon)
-                    # Usar o modo_entrada existente ou manter o atual
-                    # NÃO alteramos modo_entrada pois pode não ter o choice novo
-                    endereco.save(update_fields=["latitude", "longitude", "updated_at"])
-                    logger.info(f"  💾 SALVO no banco de dados!")
-                else:
-                    logger.info(f"  🔍 DRY-RUN: Não salvo no banco.")
-
-                return resultado
-            else:
-                logger.info(f"  ❌ Não encontrado neste nível")
-
-            # Rate limit entre tentativas
-            time.sleep(1.2)
+            consulta = consultar_servico(query, nivel=1)
+            resultado["consultou_servico"] = not consulta["do_cache"]
+            if consulta["latitude"] is not None:
+                return encontrado(
+                    1,
+                    "ENDERECO_COMPLETO",
+                    query,
+                    consulta["latitude"],
+                    consulta["longitude"],
+                )
+            logger.info("  ❌ Não encontrado neste nível")
 
         except GeocoderTimedOut:
-            logger.warning(f"  ⏱️ Timeout no nível {nivel}")
-            time.sleep(2)
-            continue
+            resultado["consultou_servico"] = True
+            logger.warning("  ⏱️ Timeout no nível 1")
 
         except GeocoderServiceError as e:
-            logger.error(f"  🌐 Erro de serviço no nível {nivel}: {e}")
-            time.sleep(2)
-            continue
+            resultado["consultou_servico"] = True
+            logger.error(f"  🌐 Erro de serviço no nível 1: {e}")
 
         except Exception as e:
-            logger.error(f"  ❌ Erro inesperado no nível {nivel}: {e}")
-            continue
+            logger.error(f"  ❌ Erro inesperado no nível 1: {e}")
+
+    # =========================================
+    # NÍVEL 2: Centróide do bairro (gazetteer)
+    # =========================================
+    if cidade_id and bairro_nome:
+        bairro_lower = bairro_nome.lower()
+        # Pula se for zona rural genérica (não tem centróide útil)
+        if "zona rural" not in bairro_lower and "rural" not in bairro_lower:
+            centroide = centroide_bairro(
+                cidade_id, endereco.bairro_novo_id, bairro_nome
+            )
+            if centroide:
+                return encontrado(
+                    2,
+                    "BAIRRO_CIDADE",
+                    f"gazetteer: {bairro_nome}, {cidade_nome}",
+                    float(centroide.latitude),
+                    float(centroide.longitude),
+                )
+
+    # =========================================
+    # NÍVEL 3: Centróide da cidade (gazetteer)
+    # =========================================
+    if cidade_id:
+        centroide = centroide_cidade(cidade_id)
+        if centroide:
+            return encontrado(
+                3,
+                "CIDADE_SEDE",
+                f"gazetteer: {cidade_nome}",
+                float(centroide.latitude),
+                float(centroide.longitude),
+            )
+
+    if not (logradouro or cidade_id):
+        logger.warning(
+            f"Endereço ID {endereco.id}: Sem dados suficientes para geocodificar."
+        )
+        return resultado
 
     logger.warning(f"Endereço ID {endereco.id}: ❌ Não geocodificado em nenhum nível.")
     return resultado
 
 
-def reprocessar_enderecos_sem_coordenadas(limite=None, dry_run=False):
+def reprocessar_enderecos_sem_coordenadas(limite=None, dry_run=False, workers=4):
     """
-    Função auxiliar para reprocessar endereços sem coordenadas.
+    Enfileira os endereços externos sem coordenadas e processa a fila com
+    o motor em lote (ocorrencias.utils.geocodificacao_lote). Em dry_run
+    nada é enfileirado: só os itens que já estão na fila são simulados e
+    "a_enfileirar" informa quantos endereços entrariam.
 
     Pode ser chamada de qualquer lugar:
     - Management command
     - Django shell
-    - View/endpoint
 
     Args:
         limite: Número máximo de endereços a processar
         dry_run: Se True, não salva no banco
+        workers: Quantidade de threads consumindo a fila
 
     Returns:
         dict: Estatísticas do processamento
     """
-    from ocorrencias.endereco_models import EnderecoOcorrencia
-
-    # Buscar endereços sem coordenadas
-    queryset = EnderecoOcorrencia.objects.filter(
-        tipo="EXTERNA", latitude__isnull=True, coordenadas_manuais=False
-    ).select_related("ocorrencia", "ocorrencia__cidade", "bairro_novo")
-
-    if limite:
-        queryset = queryset[:limite]
-
-    total = queryset.count()
-
-    estatisticas = {
-        "total": total,
-        "sucesso": 0,
-        "falha": 0,
-        "por_nivel": {
-            1: 0,  # ENDERECO_COMPLETO
-            2: 0,  # BAIRRO_CIDADE
-            3: 0,  # CIDADE_SEDE
-        },
-        "detalhes": [],
-    }
-
-    if total == 0:
-        logger.info("✅ Todos os endereços já possuem coordenadas!")
-        return estatisticas
-
-    logger.info(f"📍 Iniciando geocodificação de {total} endereços...")
-
-    for i, endereco in enumerate(queryset, 1):
-        logger.info(f"\n[{i}/{total}] Processando ID {endereco.id}")
-
-        resultado = geocodificar_com_fallback(endereco, dry_run=dry_run)
-
-        detalhe = {
-            "id": endereco.id,
-            "ocorrencia": (
-                endereco.ocorrencia.numero_ocorrencia if endereco.ocorrencia else None
-            ),
-            "sucesso": resultado["sucesso"],
-            "nivel": resultado["nivel"],
-            "nivel_nome": resultado["nivel_nome"],
-        }
-        estatisticas["detalhes"].append(detalhe)
-
-        if resultado["sucesso"]:
-            estatisticas["sucesso"] += 1
-            if resultado["nivel"]:
-                estatisticas["por_nivel"][resultado["nivel"]] += 1
-        else:
-            estatisticas["falha"] += 1
-
-        # Rate limit entre endereços
-        if i < total:
-            time.sleep(1.5)
-
-    # Log do resumo
-    logger.info("\n" + "=" * 50)
-    logger.info("📊 RESUMO DA GEOCODIFICAÇÃO")
-    logger.info("=" * 50)
-    logger.info(f"Total processado: {estatisticas['total']}")
-    logger.info(f"✅ Sucesso: {estatisticas['sucesso']}")
-    logger.info(f"❌ Falha: {estatisticas['falha']}")
-    logger.info(f"  - Nível 1 (Endereço completo): {estatisticas['por_nivel'][1]}")
-    logger.info(f"  - Nível 2 (Bairro + Cidade): {estatisticas['por_nivel'][2]}")
-    logger.info(f"  - Nível 3 (Sede do município): {estatisticas['por_nivel'][3]}")
+    from ocorrencias.utils.geocodificacao_lote import (
+        enderecos_a_enfileirar,
+        enfileirar_pendentes,
+        processar_fila,
+    )
 
     if dry_run:
-        logger.info("⚠️ MODO DRY-RUN: Nada foi salvo no banco!")
-
+        a_enfileirar = enderecos_a_enfileirar().count()
+    else:
+        a_enfileirar = enfileirar_pendentes()
+    estatisticas = processar_fila(workers=workers, limite=limite, dry_run=dry_run)
+    estatisticas["a_enfileirar"] = a_enfileirar
     return estatisticas
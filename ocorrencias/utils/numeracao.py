@@ -0,0 +1,109 @@
+# ============================================
+# ocorrencias/utils/numeracao.py
+#
+# NUMERAÇÃO DAS OCORRÊNCIAS (AAMMSSSSS/SIGLA)
+# Uma sequência do PostgreSQL por ano (ocorrencias_numero_AA): nextval não
+# trava linha nenhuma, então cadastros simultâneos não esperam uns pelos
+# outros. O número de um INSERT desfeito não é reaproveitado (lacuna), como
+# em qualquer sequência; números nunca se repetem.
+# ============================================
+
+import datetime
+
+from django.db import ProgrammingError, connection, transaction
+from django.db.models import IntegerField, Max, Value
+from django.db.models.functions import Cast, StrIndex, Substr
+
+# Base da chave do advisory lock usado só na criação da sequência do ano
+TRAVA_CRIACAO = 7_310_000
+
+
+def nome_sequencia(ano):
+    return f"ocorrencias_numero_{ano:02d}"
+
+
+def formatar_numero(sequencial, sigla, agora):
+    return f"{agora.year % 100:02d}{agora.month:02d}{sequencial:05d}/{sigla}"
+
+
+def _maior_sequencial_usado(ano):
+    """Maior sequencial do ano já gravado (contador legado ou números)."""
+    from ocorrencias.models import Ocorrencia, SequencialOcorrencia
+
+    contador = (
+        SequencialOcorrencia.objects.filter(ano=ano)
+        .values_list("ultimo_sequencial", flat=True)
+        .first()
+    )
+    numeros = (
+        Ocorrencia.all_objects.filter(numero_ocorrencia__regex=rf"^{ano:02d}[0-9]{{7,}}/")
+        .annotate(
+            sequencial=Cast(
+                Substr(
+                    "numero_ocorrencia",
+                    5,
+                    StrIndex("numero_ocorrencia", Value("/")) - 5,
+                ),
+                IntegerField(),
+            )
+        )
+        .aggregate(maior=Max("sequencial"))
+    )
+    return max(contador or 0, numeros["maior"] or 0)
+
+
+def criar_sequencia(ano):
+    """
+    Cria a sequência do ano começando depois do maior número já usado.
+    O advisory lock serializa só esta criação (uma vez por ano).
+    """
+    nome = nome_sequencia(ano)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [TRAVA_CRIACAO + ano])
+        cursor.execute("SELECT to_regclass(%s)", [nome])
+        if cursor.fetchone()[0]:
+            return
+        inicio = _maior_sequencial_usado(ano) + 1
+        cursor.execute(f"CREATE SEQUENCE {nome} START WITH {int(inicio)} MINVALUE 1")
+
+
+def reservar_sequenciais(quantidade, ano):
+    """
+    `quantidade` sequenciais do ano numa única ida ao banco, em ordem
+    crescente (únicos, mas não necessariamente contíguos se houver outros
+    cadastros ao mesmo tempo). Cria a sequência do ano na primeira chamada.
+    """
+    nome = nome_sequencia(ano)
+    for tentativa in range(2):
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT nextval(%s) FROM generate_series(1, %s)",
+                    [nome, quantidade],
+                )
+                return sorted(linha[0] for linha in cursor.fetchall())
+        except ProgrammingError:
+            # Sequência do ano ainda não existe (virada de ano)
+            if tentativa:
+                raise
+            criar_sequencia(ano)
+
+
+def gerar_numero_ocorrencia(sigla, agora=None):
+    """Próximo número AAMMSSSSS/SIGLA (sequencial reinicia a cada ano)."""
+    agora = agora or datetime.datetime.now()
+    (sequencial,) = reservar_sequenciais(1, agora.year % 100)
+    return formatar_numero(sequencial, sigla, agora)
+
+
+def gerar_numeros_ocorrencia(siglas, agora=None):
+    """
+    Pré-aloca um bloco de números (importações em massa / bulk_create):
+    um número por sigla da lista, na mesma ordem.
+    """
+    agora = agora or datetime.datetime.now()
+    sequenciais = reservar_sequenciais(len(siglas), agora.year % 100)
+    return [
+        formatar_numero(sequencial, sigla, agora)
+        for sequencial, sigla in zip(sequenciais, siglas)
+    ]
@@ -0,0 +1,217 @@
+# ============================================
+# ocorrencias/utils/resumo.py
+#
+# RESUMO DIÁRIO DAS OCORRÊNCIAS (TABELA FATO)
+# Uma linha por dia de criação × serviço × classificação × cidade ×
+# perito × status. Usado pelo save do model, pelos endpoints de
+# estatística/relatório e pelo comando reconstruir_resumo_ocorrencias
+# ============================================
+
+import datetime
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Count, DurationField, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+# Campo na Ocorrencia -> campo no resumo
+DIMENSOES_RESUMO = {
+    "servico_pericial_id": "servico_pericial_id",
+    "classificacao_id": "classificacao_id",
+    "cidade_id": "cidade_id",
+    "perito_atribuido_id": "perito_id",
+    "status": "status",
+}
+
+# Pares (início, fim) das durações somadas; só entram deltas >= 0,
+# como no cálculo de tempo médio por fase dos relatórios
+FASES_RESUMO = {
+    "criacao_laudo": ("created_at", "data_laudo_entregue", Q()),
+    "laudo_finalizacao": ("data_laudo_entregue", "data_finalizacao", Q()),
+    "criacao_finalizacao": ("created_at", "data_finalizacao", Q(status="FINALIZADA")),
+}
+
+
+def chave_resumo(ocorrencia):
+    """(dia, serviço, classificação, cidade, perito, status) ou None se excluída."""
+    if ocorrencia is None or ocorrencia.deleted_at or not ocorrencia.created_at:
+        return None
+    dia = timezone.localdate(ocorrencia.created_at)
+    return (dia,) + tuple(getattr(ocorrencia, campo) for campo in DIMENSOES_RESUMO)
+
+
+def _intervalo_dia(dia):
+    """Início e fim (aware, fuso local) do dia, para filtrar created_at por range."""
+    inicio = timezone.make_aware(datetime.datetime.combine(dia, datetime.time.min))
+    fim = timezone.make_aware(
+        datetime.datetime.combine(dia + datetime.timedelta(days=1), datetime.time.min)
+    )
+    return inicio, fim
+
+
+def agregar_resumo(ocorrencias):
+    """
+    Agrupa as ocorrências por dia + dimensões e devolve {chave: métricas}.
+    Os exames vêm numa segunda query para o JOIN não inflar as contagens.
+    """
+    agrupado = (
+        ocorrencias.order_by()
+        .annotate(dia=TruncDate("created_at"))
+        .values("dia", *DIMENSOES_RESUMO)
+    )
+
+    metricas = {
+        "total": Count("id"),
+        "total_com_laudo": Count("id", filter=Q(data_laudo_entregue__isnull=False)),
+    }
+    for fase, (inicio, fim, filtro) in FASES_RESUMO.items():
+        filtro = filtro & Q(**{f"{fim}__gte": F(inicio)})
+        metricas[f"qtd_{fase}"] = Count("id", filter=filtro)
+        metricas[f"segundos_{fase}"] = Sum(
+            F(fim) - F(inicio), filter=filtro, output_field=DurationField()
+        )
+
+    resultado = {}
+    for linha in agrupado.annotate(**metricas):
+        chave = (linha.pop("dia"),) + tuple(linha.pop(c) for c in DIMENSOES_RESUMO)
+        for fase in FASES_RESUMO:
+            duracao = linha[f"segundos_{fase}"]
+            linha[f"segundos_{fase}"] = int(duracao.total_seconds()) if duracao else 0
+        linha["total_exames"] = 0
+        resultado[chave] = linha
+
+    for linha in agrupado.annotate(
+        total_exames=Sum("ocorrenciaexame__quantidade")
+    ).filter(total_exames__isnull=False):
+        chave = (linha["dia"],) + tuple(linha[c] for c in DIMENSOES_RESUMO)
+        if chave in resultado:
+            resultado[chave]["total_exames"] = linha["total_exames"]
+
+    return resultado
+
+
+def _campos_chave(chave):
+    campos = {"dia": chave[0]}
+    for destino, valor in zip(DIMENSOES_RESUMO.values(), chave[1:]):
+        campos[destino] = valor
+    return campos
+
+
+def reconstruir_resumo(
+    ocorrencias, resumo_model, dia_inicio=None, dia_fim=None, batch_size=1000
+):
+    """
+    Recalcula o resumo no intervalo [dia_inicio, dia_fim] (ou tudo), um mês
+    por transação: a memória não cresce com a tabela e os leitores nunca
+    veem um mês pela metade. Retorna o total de linhas gravadas.
+    """
+    ocorrencias = ocorrencias.filter(deleted_at__isnull=True)
+    linhas_resumo = resumo_model._base_manager.all()
+    if dia_inicio:
+        ocorrencias = ocorrencias.filter(created_at__gte=_intervalo_dia(dia_inicio)[0])
+        linhas_resumo = linhas_resumo.filter(dia__gte=dia_inicio)
+    if dia_fim:
+        ocorrencias = ocorrencias.filter(created_at__lt=_intervalo_dia(dia_fim)[1])
+        linhas_resumo = linhas_resumo.filter(dia__lte=dia_fim)
+
+    # Meses a percorrer: os que têm ocorrências e os que já têm resumo
+    dias = linhas_resumo.aggregate(primeiro=Min("dia"), ultimo=Max("dia"))
+    criacao = ocorrencias.aggregate(
+        primeira=Min("created_at"), ultima=Max("created_at")
+    )
+    candidatos = [dias["primeiro"], dias["ultimo"]] + [
+        timezone.localdate(valor)
+        for valor in (criacao["primeira"], criacao["ultima"])
+        if valor
+    ]
+    candidatos = [dia for dia in candidatos if dia]
+    if not candidatos:
+        return 0
+
+    total = 0
+    mes = min(candidatos).replace(day=1)
+    ultimo_mes = max(candidatos).replace(day=1)
+    while mes <= ultimo_mes:
+        proximo = (mes + datetime.timedelta(days=32)).replace(day=1)
+        do_mes = ocorrencias.filter(
+            created_at__gte=_intervalo_dia(mes)[0],
+            created_at__lt=_intervalo_dia(proximo)[0],
+        )
+        linhas = [
+            resumo_model(**_campos_chave(chave), **metricas)
+            for chave, metricas in agregar_resumo(do_mes).items()
+        ]
+        with transaction.atomic():
+            linhas_resumo.filter(dia__gte=mes, dia__lt=proximo).delete()
+            resumo_model._base_manager.bulk_create(linhas, batch_size=batch_size)
+        total += len(linhas)
+        mes = proximo
+
+    return total
+
+
+def recalcular_chaves_resumo(chaves):
+    """
+    Recalcula as linhas do resumo das chaves informadas a partir da Ocorrencia.
+    Cada chave é lida e gravada sob um advisory lock da transação: dois
+    recálculos concorrentes da mesma chave não intercalam, e o segundo já
+    agrega o que o primeiro enxergou (não sobra total antigo).
+    """
+    from ocorrencias.models import Ocorrencia, OcorrenciaResumoDiario
+
+    for chave in chaves:
+        inicio, fim = _intervalo_dia(chave[0])
+        filtros = {"created_at__gte": inicio, "created_at__lt": fim}
+        for campo, valor in zip(DIMENSOES_RESUMO, chave[1:]):
+            filtros[campo] = valor
+
+        campos = _campos_chave(chave)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [repr(chave)])
+            metricas = agregar_resumo(Ocorrencia.objects.filter(**filtros)).get(chave)
+            if metricas:
+                OcorrenciaResumoDiario.objects.update_or_create(
+                    defaults=metricas, **campos
+                )
+            else:
+                OcorrenciaResumoDiario.objects.filter(**campos).delete()
+
+
+def agendar_atualizacao_resumo(*chaves):
+    """
+    Agenda o recálculo das chaves para depois do commit da transação atual.
+    Chamado pelo save da Ocorrencia e pelo post_delete (exclusão física, ex.:
+    `all_objects...delete()`); bulk_create/update/SQL direto não passam por
+    aqui — rode `reconstruir_resumo_ocorrencias` depois deles.
+
+    As chaves se acumulam na conexão e o primeiro callback após o commit
+    recalcula todas: excluir 20 mil ocorrências não recalcula 20 mil vezes.
+    Se a transação for desfeita as chaves ficam para o próximo commit (só
+    recalcula a mais).
+    """
+    chaves = {chave for chave in chaves if chave}
+    if not chaves:
+        return
+    conexao = transaction.get_connection()
+    if not hasattr(conexao, "chaves_resumo_pendentes"):
+        conexao.chaves_resumo_pendentes = set()
+    conexao.chaves_resumo_pendentes |= chaves
+    transaction.on_commit(partial(_recalcular_pendentes, conexao))
+
+
+def _recalcular_pendentes(conexao):
+    pendentes, conexao.chaves_resumo_pendentes = conexao.chaves_resumo_pendentes, set()
+    if pendentes:
+        recalcular_chaves_resumo(pendentes)
+
+
+def resumo_visivel_para(user):
+    """Linhas do resumo que o usuário pode ver (mesma regra das listagens)."""
+    from ocorrencias.models import OcorrenciaResumoDiario
+
+    resumo = OcorrenciaResumoDiario.objects.all()
+    if user.is_superuser or user.perfil == "ADMINISTRATIVO":
+        return resumo
+    return resumo.filter(servico_pericial__in=user.servicos_periciais.all())
@@ -1,23 +1,34 @@
-import csv
 import logging
 from rest_framework import viewsets, status
 
 logger = logging.getLogger(__name__)
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Q, Count, F, Case, When, Sum, DateField
-from django.db.models.functions import Coalesce, TruncDate
+from django.db.models import (
+    Q,
+    Count,
+    Sum,
+    Exists,
+    IntegerField,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Coalesce
 from datetime import timedelta, datetime
 from exames.models import Exame
 from ocorrencias.endereco_models import EnderecoOcorrencia
-from ocorrencias.views_relatorios import _montar_exames_hierarquicos
+from ocorrencias.views_relatorios import (
+    _montar_exames_hierarquicos,
+    _producao_do_resumo,
+    _tempo_medio_fases_do_resumo,
+)
 from servicos_periciais.models import ServicoPericial
 from usuarios.models import User
 from classificacoes.models import ClassificacaoOcorrencia
+from movimentacoes.models import Movimentacao
 
-from .models import Ocorrencia, OcorrenciaExame
+from .models import Ocorrencia, OcorrenciaExame, OcorrenciaResumoDiario
 from .serializers import (
     EnderecoOcorrenciaSerializer,
     OcorrenciaCreateSerializer,
@@ -40,6 +51,16 @@ from .permissions import (
     PodeVerRelatoriosGerenciais,
 )
 from .filters import OcorrenciaFilter
+from .utils.resumo import resumo_visivel_para
+from spr.cache_respostas import resposta_em_cache
+from spr.pagination import CursorOpcionalPagination
+from spr.exportacao import (
+    Coluna,
+    formatar_data,
+    formatar_data_hora,
+    formatar_sigla_nome,
+    resposta_csv,
+)
 from .pdf_generator import (
     gerar_pdf_ocorrencia,
     gerar_pdf_ocorrencias_por_perito,
@@ -73,6 +94,9 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
     )
     permission_classes = [OcorrenciaPermission]
     filterset_class = OcorrenciaFilter
+    pagination_class = CursorOpcionalPagination
+    cursor_ordering = ("-created_at", "-id")
+    cursor_ordering_fields = ("created_at",)
     search_fields = [
         "numero_ocorrencia",
         "perito_atribuido__nome_completo",
@@ -119,6 +143,13 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
         user = self.request.user
         queryset = super().get_queryset()
 
+        if self.action in ["list", "finalizadas", "pendentes"]:
+            queryset = self._anotar_movimentacoes_pendentes(queryset).prefetch_related(
+                # Lidos pelo ClassificacaoOcorrenciaSerializer de cada linha
+                "classificacao__servicos_periciais",
+                "classificacao__subgrupos",
+            )
+
         if user.is_superuser or user.perfil == "ADMINISTRATIVO":
             if self.action not in ["lixeira", "restaurar"]:
                 queryset = queryset.filter(deleted_at__isnull=True)
@@ -128,10 +159,35 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
             servico_pericial__in=user.servicos_periciais.all(), deleted_at__isnull=True
         )
 
+    @staticmethod
+    def _anotar_movimentacoes_pendentes(queryset):
+        """
+        Anota a flag e a contagem de movimentações não visualizadas pelo admin
+        direto na query da listagem (evita uma consulta extra por linha).
+        """
+        pendentes = Movimentacao.objects.filter(
+            ocorrencia_id=OuterRef("pk"),
+            visualizado_admin=False,
+            deleted_at__isnull=True,
+        )
+        total_pendentes = (
+            pendentes.order_by()
+            .values("ocorrencia_id")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        return queryset.annotate(
+            tem_movimentacao_pendente=Exists(pendentes),
+            total_movimentacoes_pendentes=Coalesce(
+                Subquery(total_pendentes, output_field=IntegerField()), 0
+            ),
+        )
+
     @action(detail=False, methods=["get"], url_path="relatorios-gerenciais")
     def relatorios_gerenciais(self, request):
-        # MANTIDO ORIGINAL - LÓGICA DO RELATÓRIO PDF/JSON COMPLETO
+        # RELATÓRIO PDF/JSON COMPLETO
         queryset = self.get_queryset()
+        resumo = resumo_visivel_para(request.user)
 
         data_inicio_str = request.query_params.get("data_inicio")
         data_fim_str = request.query_params.get("data_fim")
@@ -142,23 +198,22 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
 
         try:
             if data_inicio_str:
-                queryset = queryset.filter(
-                    created_at__date__gte=datetime.strptime(
-                        data_inicio_str, "%Y-%m-%d"
-                    ).date()
-                )
+                data_inicio = datetime.strptime(data_inicio_str, "%Y-%m-%d").date()
+                queryset = queryset.filter(created_at__date__gte=data_inicio)
+                resumo = resumo.filter(dia__gte=data_inicio)
             if data_fim_str:
-                queryset = queryset.filter(
-                    created_at__date__lte=datetime.strptime(
-                        data_fim_str, "%Y-%m-%d"
-                    ).date()
-                )
+                data_fim = datetime.strptime(data_fim_str, "%Y-%m-%d").date()
+                queryset = queryset.filter(created_at__date__lte=data_fim)
+                resumo = resumo.filter(dia__lte=data_fim)
             if servico_id:
                 queryset = queryset.filter(servico_pericial_id=servico_id)
+                resumo = resumo.filter(servico_pericial_id=servico_id)
             if cidade_id:
                 queryset = queryset.filter(cidade_id=cidade_id)
+                resumo = resumo.filter(cidade_id=cidade_id)
             if perito_id:
                 queryset = queryset.filter(perito_atribuido_id=perito_id)
+                resumo = resumo.filter(perito_id=perito_id)
             if classificacao_id:
                 try:
                     classificacao = ClassificacaoOcorrencia.objects.get(
@@ -169,6 +224,7 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
                     )
                     ids_para_filtrar = [classificacao.id] + list(descendentes)
                     queryset = queryset.filter(classificacao_id__in=ids_para_filtrar)
+                    resumo = resumo.filter(classificacao_id__in=ids_para_filtrar)
                 except ClassificacaoOcorrencia.DoesNotExist:
                     pass
         except (ValueError, TypeError):
@@ -177,211 +233,21 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        por_grupo_principal = (
-            queryset.annotate(
-                grupo_nome=Case(
-                    When(
-                        classificacao__parent__isnull=False,
-                        then=F("classificacao__parent__nome"),
-                    ),
-                    default=F("classificacao__nome"),
-                ),
-                grupo_codigo=Case(
-                    When(
-                        classificacao__parent__isnull=False,
-                        then=F("classificacao__parent__codigo"),
-                    ),
-                    default=F("classificacao__codigo"),
-                ),
-            )
-            .values("grupo_nome", "grupo_codigo")
-            .annotate(total=Count("id"))
-            .order_by("grupo_codigo")
-        )
-
-        por_classificacao_especifica = (
-            queryset.filter(classificacao__parent__isnull=False)
-            .values("classificacao__codigo", "classificacao__nome")
-            .annotate(total=Count("id"))
-            .order_by("classificacao__codigo")
-        )
-
-        peritos_queryset = User.objects.filter(perfil="PERITO", status="ATIVO")
-        if perito_id:
-            peritos_queryset = peritos_queryset.filter(id=perito_id)
-        por_perito = (
-            peritos_queryset.annotate(
-                total_ocorrencias=Coalesce(
-                    Count(
-                        "ocorrencias_atribuidas",
-                        filter=Q(ocorrencias_atribuidas__in=queryset),
-                    ),
-                    0,
-                ),
-                finalizadas=Coalesce(
-                    Count(
-                        "ocorrencias_atribuidas",
-                        filter=Q(
-                            ocorrencias_atribuidas__in=queryset,
-                            ocorrencias_atribuidas__status="FINALIZADA",
-                        ),
-                    ),
-                    0,
-                ),
-                em_analise=Coalesce(
-                    Count(
-                        "ocorrencias_atribuidas",
-                        filter=Q(
-                            ocorrencias_atribuidas__in=queryset,
-                            ocorrencias_atribuidas__status="EM_ANALISE",
-                        ),
-                    ),
-                    0,
-                ),
-            )
-            .values("nome_completo", "total_ocorrencias", "finalizadas", "em_analise")
-            .order_by("-total_ocorrencias")
-        )
-
-        servicos_queryset = ServicoPericial.objects.filter(deleted_at__isnull=True)
-        por_servico = (
-            servicos_queryset.annotate(
-                total_exames=Coalesce(
-                    Sum(
-                        "ocorrencias__ocorrenciaexame__quantidade",
-                        filter=Q(ocorrencias__in=queryset),
-                    ),
-                    0,
-                ),
-                total=Coalesce(
-                    Count(
-                        "ocorrencias", filter=Q(ocorrencias__in=queryset), distinct=True
-                    ),
-                    0,
-                ),
-                finalizadas=Coalesce(
-                    Count(
-                        "ocorrencias",
-                        filter=Q(
-                            ocorrencias__in=queryset, ocorrencias__status="FINALIZADA"
-                        ),
-                        distinct=True,
-                    ),
-                    0,
-                ),
-                em_analise=Coalesce(
-                    Count(
-                        "ocorrencias",
-                        filter=Q(
-                            ocorrencias__in=queryset, ocorrencias__status="EM_ANALISE"
-                        ),
-                        distinct=True,
-                    ),
-                    0,
-                ),
-            )
-            .values(
-                "sigla", "nome", "total", "total_exames", "finalizadas", "em_analise"
-            )
-            .order_by("-total")
-        )
-
-        por_servico_formatado = [
-            {
-                "servico_pericial__sigla": item["sigla"],
-                "servico_pericial__nome": item["nome"],
-                "total": item["total"],
-                "total_exames": item["total_exames"],
-                "finalizadas": item["finalizadas"],
-                "em_analise": item["em_analise"],
-            }
-            for item in por_servico
-        ]
+        # Contagens e tempos médios vêm do resumo diário (tabela fato)
+        dados = _producao_do_resumo(resumo, perito_id)
 
         # =====================================================================
-        # QUERY DE EXAMES COM HIERARQUIA PAI/FILHO (USANDO A LÓGICA NOVA)
+        # QUERY DE EXAMES COM HIERARQUIA PAI/FILHO
+        # Passa a subquery de ids (não materializa a lista em Python)
         # =====================================================================
-        ids_ocorrencias = list(queryset.values_list("id", flat=True))
-
-        # Chama a função infalível importada no topo do arquivo
-        por_exame_formatado = _montar_exames_hierarquicos(ids_ocorrencias)
+        dados["por_exame"] = _montar_exames_hierarquicos(queryset.values("id"))
 
         # =====================================================================
         # TEMPO MÉDIO POR FASE
         # =====================================================================
-        def _media_dias(registros, campo_fim, campo_inicio):
-            deltas = []
-            for r in registros:
-                fim = r.get(campo_fim)
-                inicio = r.get(campo_inicio)
-                if fim and inicio:
-                    delta = (fim - inicio).total_seconds() / 86400
-                    if delta >= 0:
-                        deltas.append(delta)
-            if not deltas:
-                return None
-            return round(sum(deltas) / len(deltas), 1)
-
-        registros_laudo = list(
-            queryset.filter(data_laudo_entregue__isnull=False).values(
-                "created_at", "data_laudo_entregue", "data_finalizacao",
-                "perito_atribuido__nome_completo"
-            )
-        )
-        registros_finalizados = list(
-            queryset.filter(status="FINALIZADA", data_finalizacao__isnull=False).values(
-                "created_at", "data_laudo_entregue", "data_finalizacao"
-            )
-        )
-
-        media_criacao_laudo = _media_dias(
-            registros_laudo, "data_laudo_entregue", "created_at"
-        )
-        media_laudo_finalizacao = _media_dias(
-            [r for r in registros_laudo if r.get("data_finalizacao")],
-            "data_finalizacao", "data_laudo_entregue"
-        )
-        media_total = _media_dias(
-            registros_finalizados, "data_finalizacao", "created_at"
-        )
+        dados["tempo_medio_fases"] = _tempo_medio_fases_do_resumo(resumo)
 
-        from collections import defaultdict
-        perito_map = defaultdict(list)
-        for r in registros_laudo:
-            nome = r.get("perito_atribuido__nome_completo")
-            if nome and r.get("data_laudo_entregue") and r.get("created_at"):
-                dias = (r["data_laudo_entregue"] - r["created_at"]).total_seconds() / 86400
-                if dias >= 0:
-                    perito_map[nome].append(dias)
-
-        tempo_por_perito = sorted(
-            [
-                {
-                    "nome_completo": nome,
-                    "total_laudos": len(dias),
-                    "media_criacao_laudo_dias": round(sum(dias) / len(dias), 1),
-                }
-                for nome, dias in perito_map.items()
-            ],
-            key=lambda x: x["media_criacao_laudo_dias"],
-        )
-
-        return Response(
-            {
-                "por_grupo_principal": list(por_grupo_principal),
-                "por_classificacao_especifica": list(por_classificacao_especifica),
-                "producao_por_perito": list(por_perito),
-                "por_servico": por_servico_formatado,
-                "por_exame": por_exame_formatado,
-                "tempo_medio_fases": {
-                    "media_criacao_laudo_dias": media_criacao_laudo,
-                    "media_laudo_finalizacao_dias": media_laudo_finalizacao,
-                    "media_total_dias": media_total,
-                    "total_com_laudo": len(registros_laudo),
-                    "por_perito": tempo_por_perito,
-                },
-            }
-        )
+        return Response(dados)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -696,8 +562,6 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         try:
-            from usuarios.models import User
-
             perito = User.objects.get(id=perito_id, perfil="PERITO")
             if ocorrencia.perito_atribuido and not request.user.is_superuser:
                 return Response(
@@ -798,8 +662,6 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
             )
 
         if exames_ids:
-            from exames.models import Exame
-
             existing_ids = list(
                 Exame.objects.filter(id__in=exames_ids).values_list("id", flat=True)
             )
@@ -815,6 +677,7 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
             OcorrenciaExame.objects.get_or_create(
                 ocorrencia=ocorrencia, exame_id=eid, defaults={"quantidade": 1}
             )
+        ocorrencia.atualizar_resumo()
 
         serializer = OcorrenciaDetailSerializer(
             ocorrencia, context={"request": request}
@@ -855,6 +718,7 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
             OcorrenciaExame.objects.filter(
                 ocorrencia=ocorrencia, exame_id__in=exames_ids
             ).delete()
+            ocorrencia.atualizar_resumo()
 
         serializer = OcorrenciaDetailSerializer(
             ocorrencia, context={"request": request}
@@ -917,6 +781,7 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
 
         if novos_objetos:
             OcorrenciaExame.objects.bulk_create(novos_objetos)
+        ocorrencia.atualizar_resumo()
 
         serializer = OcorrenciaDetailSerializer(
             ocorrencia, context={"request": request}
@@ -931,8 +796,6 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def exames_disponiveis(self, request):
-        from exames.models import Exame
-
         search = request.GET.get("search", "")
         servico_pericial_id = request.GET.get("servico_pericial_id", "")
         page_size = int(request.GET.get("page_size", 20))
@@ -1067,82 +930,65 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="exportar-csv")
     def exportar_csv(self, request):
-        import io
-        try:
-            tz_local = timezone.get_current_timezone()
-            STATUS_LABELS = {
-                "AGUARDANDO_PERITO": "Aguardando Perito",
-                "EM_ANALISE": "Em Analise",
-                "LAUDO_ENTREGUE": "Laudo Entregue",
-                "FINALIZADA": "Finalizada",
-            }
-
-            queryset = (
-                self.filter_queryset(self.get_queryset())
-                .select_related(
-                    "servico_pericial",
-                    "unidade_demandante",
-                    "perito_atribuido",
-                    "autoridade",
-                    "classificacao",
-                    "cidade",
-                )
-                .order_by("-created_at")
-            )
-
-            def fmt_dt(dt):
-                return dt.astimezone(tz_local).strftime("%d/%m/%Y %H:%M") if dt else ""
+        STATUS_LABELS = {
+            "AGUARDANDO_PERITO": "Aguardando Perito",
+            "EM_ANALISE": "Em Analise",
+            "LAUDO_ENTREGUE": "Laudo Entregue",
+            "FINALIZADA": "Finalizada",
+        }
 
-            def fmt_d(d):
-                return d.strftime("%d/%m/%Y") if d else ""
+        queryset = self.filter_queryset(self.get_queryset()).order_by(
+            "-created_at"
+        )
 
-            buffer = io.StringIO()
-            writer = csv.writer(buffer, delimiter=";")
-            writer.writerow([
-                "Numero",
+        colunas = [
+            Coluna("Numero", "numero_ocorrencia"),
+            Coluna(
                 "Status",
+                "status",
+                formatar=lambda s: STATUS_LABELS.get(s, s),
+            ),
+            Coluna(
                 "Servico",
+                "servico_pericial__sigla",
+                "servico_pericial__nome",
+                formatar=formatar_sigla_nome,
+            ),
+            Coluna(
                 "Unidade Demandante",
+                "unidade_demandante__sigla",
+                "unidade_demandante__nome",
+                formatar=formatar_sigla_nome,
+            ),
+            Coluna(
                 "Perito",
-                "Autoridade",
+                "perito_atribuido__nome_completo",
+                formatar=lambda nome: nome or "Nao atribuido",
+            ),
+            Coluna("Autoridade", "autoridade__nome"),
+            Coluna(
                 "Classificacao",
-                "Cidade",
-                "Data do Fato",
-                "Registrado em",
+                "classificacao__codigo",
+                "classificacao__nome",
+                formatar=formatar_sigla_nome,
+            ),
+            Coluna("Cidade", "cidade__nome"),
+            Coluna("Data do Fato", "data_fato", formatar=formatar_data),
+            Coluna("Registrado em", "created_at", formatar=formatar_data_hora),
+            Coluna(
                 "Laudo Entregue em",
-                "Finalizado em",
-            ])
-
-            for oc in queryset:
-                writer.writerow([
-                    oc.numero_ocorrencia,
-                    STATUS_LABELS.get(oc.status, oc.status),
-                    f"{oc.servico_pericial.sigla} - {oc.servico_pericial.nome}" if oc.servico_pericial else "",
-                    f"{oc.unidade_demandante.sigla} - {oc.unidade_demandante.nome}" if oc.unidade_demandante else "",
-                    oc.perito_atribuido.nome_completo if oc.perito_atribuido else "Nao atribuido",
-                    oc.autoridade.nome if oc.autoridade else "",
-                    f"{oc.classificacao.codigo} - {oc.classificacao.nome}" if oc.classificacao else "",
-                    oc.cidade.nome if oc.cidade else "",
-                    fmt_d(oc.data_fato),
-                    fmt_dt(oc.created_at),
-                    fmt_dt(oc.data_laudo_entregue),
-                    fmt_dt(oc.data_finalizacao),
-                ])
-
-            # utf-8-sig adiciona BOM automaticamente — Excel abre com acentos corretos
-            content = buffer.getvalue().encode("utf-8-sig")
-            response = HttpResponse(content, content_type="text/csv; charset=utf-8")
-            response["Content-Disposition"] = 'attachment; filename="ocorrencias.csv"'
-            return response
+                "data_laudo_entregue",
+                formatar=formatar_data_hora,
+            ),
+            Coluna(
+                "Finalizado em", "data_finalizacao", formatar=formatar_data_hora
+            ),
+        ]
 
-        except Exception as e:
-            logger.exception("Erro ao gerar exportação CSV de ocorrências")
-            return Response(
-                {"error": f"Erro ao gerar exportacao: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        return resposta_csv(queryset, colunas, "ocorrencias.csv")
 
     @action(detail=False, methods=["get"])
+    @resposta_em_cache("ocorrencias-estatisticas")
     def estatisticas(self, request):
         user = self.request.user
         hoje = timezone.now().date()
@@ -1152,79 +998,110 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
         if servico_id in ["null", "", "undefined"]:
             servico_id = None
 
-        # Define qual queryset base usar
+        # Define qual queryset base usar (e as linhas equivalentes do resumo diário)
+        resumo = OcorrenciaResumoDiario.objects.all()
         if user.perfil == "PERITO":
             queryset_base = Ocorrencia.objects.filter(
                 perito_atribuido=user, deleted_at__isnull=True
             )
+            resumo_base = resumo.filter(perito=user)
             servicos_ids = list(user.servicos_periciais.values_list("id", flat=True))
             queryset_servico = Ocorrencia.objects.filter(
                 servico_pericial_id__in=servicos_ids, deleted_at__isnull=True
             )
+            resumo_servico = resumo.filter(servico_pericial_id__in=servicos_ids)
         elif user.perfil == "OPERACIONAL":
             servicos_ids = list(user.servicos_periciais.values_list("id", flat=True))
             queryset_base = Ocorrencia.objects.filter(
                 servico_pericial_id__in=servicos_ids, deleted_at__isnull=True
             )
+            resumo_base = resumo.filter(servico_pericial_id__in=servicos_ids)
             queryset_servico = queryset_base
+            resumo_servico = resumo_base
         else:  # ADMIN
             queryset_base = Ocorrencia.objects.filter(deleted_at__isnull=True)
+            resumo_base = resumo
             servicos_ids = list(
                 ServicoPericial.objects.filter(deleted_at__isnull=True).values_list(
                     "id", flat=True
                 )
             )
             queryset_servico = queryset_base
+            resumo_servico = resumo_base
 
         if servico_id:
             queryset_base = queryset_base.filter(servico_pericial_id=servico_id)
+            resumo_base = resumo_base.filter(servico_pericial_id=servico_id)
             queryset_servico = queryset_servico.filter(servico_pericial_id=servico_id)
+            resumo_servico = resumo_servico.filter(servico_pericial_id=servico_id)
             servicos_ids = [int(servico_id)]
 
-        # --- CÁLCULOS GERAIS ---
-        total = queryset_base.count()
-        aguardando = queryset_base.filter(status="AGUARDANDO_PERITO").count()
-        em_analise = queryset_base.filter(status="EM_ANALISE").count()
-        laudo_entregue = queryset_base.filter(status="LAUDO_ENTREGUE").count()
-        finalizadas = queryset_base.filter(status="FINALIZADA").count()
-        sem_perito = queryset_base.filter(perito_atribuido__isnull=True).count()
-
+        # --- CÁLCULOS GERAIS (resumo diário, uma única agregação) ---
         data_limite = hoje - timedelta(days=20)
-        atrasadas = queryset_base.filter(
-            status__in=["AGUARDANDO_PERITO", "EM_ANALISE"],
-            created_at__date__lt=data_limite,
-        ).count()
-
-        finalizadas_mes = queryset_base.filter(
-            status="FINALIZADA", data_finalizacao__gte=inicio_mes
-        ).count()
-
         dias_30 = hoje - timedelta(days=30)
-        criadas_30dias = queryset_base.filter(created_at__date__gte=dias_30).count()
-        finalizadas_30dias = queryset_base.filter(
-            status="FINALIZADA", data_finalizacao__gte=dias_30
-        ).count()
+
+        def soma_total(**filtros):
+            return Coalesce(Sum("total", filter=Q(**filtros)), 0)
+
+        # Alias "total" colidiria com o campo somado do resumo
+        contadores = resumo_base.aggregate(
+            total_geral=soma_total(),
+            aguardando=soma_total(status="AGUARDANDO_PERITO"),
+            em_analise=soma_total(status="EM_ANALISE"),
+            laudo_entregue=soma_total(status="LAUDO_ENTREGUE"),
+            finalizadas=soma_total(status="FINALIZADA"),
+            sem_perito=soma_total(perito__isnull=True),
+            atrasadas=soma_total(
+                status__in=["AGUARDANDO_PERITO", "EM_ANALISE"], dia__lt=data_limite
+            ),
+            criadas_30dias=soma_total(dia__gte=dias_30),
+        )
+        # Finalizações dependem de data_finalizacao (fora do resumo): lê só as
+        # finalizadas recentes, pelo índice de data_finalizacao
+        contadores.update(
+            queryset_base.filter(
+                status="FINALIZADA", data_finalizacao__gte=min(inicio_mes, dias_30)
+            ).aggregate(
+                finalizadas_mes=Count(
+                    "id", filter=Q(data_finalizacao__gte=inicio_mes)
+                ),
+                finalizadas_30dias=Count(
+                    "id", filter=Q(data_finalizacao__gte=dias_30)
+                ),
+            )
+        )
+        contadores["total"] = contadores.pop("total_geral")
+        total = contadores["total"]
+        finalizadas = contadores["finalizadas"]
 
         # --- CÁLCULO POR SERVIÇO ---
+        # Subqueries correlacionadas: total vem do resumo diário; exames são
+        # agrupados pelo serviço do exame, sem JOIN cruzado ocorrências x exames.
+        total_por_servico = (
+            resumo_servico.filter(servico_pericial_id=OuterRef("pk"))
+            .order_by()
+            .values("servico_pericial_id")
+            .annotate(t=Sum("total"))
+            .values("t")
+        )
+        exames_por_servico = (
+            OcorrenciaExame.objects.filter(
+                exame__servico_pericial_id=OuterRef("pk"),
+                ocorrencia__in=queryset_servico.values("id"),
+            )
+            .order_by()
+            .values("exame__servico_pericial_id")
+            .annotate(q=Sum("quantidade"))
+            .values("q")
+        )
         por_servico_qs = (
             ServicoPericial.objects.filter(id__in=servicos_ids, deleted_at__isnull=True)
             .annotate(
-                total=Count(
-                    "ocorrencias",
-                    filter=Q(
-                        ocorrencias__in=queryset_servico,
-                        ocorrencias__deleted_at__isnull=True,
-                    ),
-                    distinct=True,
+                total=Coalesce(
+                    Subquery(total_por_servico, output_field=IntegerField()), 0
                 ),
                 total_exames=Coalesce(
-                    Sum(
-                        "exames__ocorrenciaexame__quantidade",
-                        filter=Q(
-                            exames__ocorrenciaexame__ocorrencia__in=queryset_servico
-                        ),
-                    ),
-                    0,
+                    Subquery(exames_por_servico, output_field=IntegerField()), 0
                 ),
             )
             .values("sigla", "nome", "total", "total_exames")
@@ -1242,24 +1119,23 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
         ]
 
         # =====================================================================
-        # EXAMES COM HIERARQUIA PAI/FILHO (USANDO A LÓGICA NOVA)
+        # EXAMES COM HIERARQUIA PAI/FILHO
+        # Passa a subquery de ids (não materializa a lista em Python)
         # =====================================================================
-        ids_ocorrencias = list(queryset_base.values_list("id", flat=True))
-
-        # Chama a função infalível importada no topo do arquivo (com a variável correta!)
-        por_exame = _montar_exames_hierarquicos(ids_ocorrencias)
+        por_exame = _montar_exames_hierarquicos(queryset_base.values("id"))
         # =====================================================================
 
         # Dados extras para Perito
         taxa_finalizacao = 0
         participacao = 0
+        total_servico = 0
         ultimas = []
 
         if user.perfil == "PERITO":
             if total > 0:
                 taxa_finalizacao = (finalizadas / total) * 100
 
-            total_servico = queryset_servico.count()
+            total_servico = resumo_servico.aggregate(total_geral=soma_total())["total_geral"]
             if total_servico > 0:
                 participacao = (total / total_servico) * 100
 
@@ -1267,36 +1143,35 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
                 "id", "numero_ocorrencia", "status", "created_at"
             )
 
-        # Evolução mensal — todos os dados agrupados por mês (frontend fatia os últimos 6)
+        # Evolução — uma entrada por dia de criação, a mesma granularidade da
+        # versão anterior (TruncDate); o frontend fatia os últimos registros
         evolucao_mensal_qs = (
-            queryset_base
-            .annotate(mes=TruncDate("created_at", kind="month", output_field=DateField()))
-            .values("mes")
+            resumo_base.values("dia")
             .annotate(
-                total=Count("id"),
-                finalizadas=Count("id", filter=Q(status="FINALIZADA")),
+                total_dia=Sum("total"),
+                finalizadas=soma_total(status="FINALIZADA"),
             )
-            .order_by("mes")
+            .order_by("dia")
         )
         evolucao_mensal = [
-            {"mes": item["mes"].isoformat(), "total": item["total"], "finalizadas": item["finalizadas"]}
+            {"mes": item["dia"].isoformat(), "total": item["total_dia"], "finalizadas": item["finalizadas"]}
             for item in evolucao_mensal_qs
         ]
 
         response_data = {
             "geral": {
                 "total": total,
-                "aguardando": aguardando,
-                "em_analise": em_analise,
-                "laudo_entregue": laudo_entregue,
+                "aguardando": contadores["aguardando"],
+                "em_analise": contadores["em_analise"],
+                "laudo_entregue": contadores["laudo_entregue"],
                 "finalizadas": finalizadas,
-                "sem_perito": sem_perito,
-                "atrasadas": atrasadas,
-                "finalizadas_este_mes": finalizadas_mes,
+                "sem_perito": contadores["sem_perito"],
+                "atrasadas": contadores["atrasadas"],
+                "finalizadas_este_mes": contadores["finalizadas_mes"],
             },
             "ultimos_30_dias": {
-                "criadas": criadas_30dias,
-                "finalizadas": finalizadas_30dias,
+                "criadas": contadores["criadas_30dias"],
+                "finalizadas": contadores["finalizadas_30dias"],
             },
             "evolucao_mensal": evolucao_mensal,
             "por_servico": por_servico,
@@ -1309,7 +1184,7 @@ class OcorrenciaViewSet(viewsets.ModelViewSet):
                 taxa_finalizacao, 1
             )
             response_data["servico"] = {
-                "total_geral": queryset_servico.count(),
+                "total_geral": total_servico,
                 "minha_participacao": round(participacao, 1),
             }
             response_data["ultimas_ocorrencias"] = list(ultimas)
@@ -1497,7 +1372,7 @@ class EnderecoOcorrenciaViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"], url_path="geocodificar")
     def geocodificar_endereco(self, request, pk=None):
         """
-        Geocodifica um endereço específico manualmente.
+        Enfileira a geocodificação de um endereço específico (202 Accepted).
         POST /api/enderecos/{id}/geocodificar/
         """
         endereco = self.get_object()
@@ -1522,18 +1397,16 @@ class EnderecoOcorrenciaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        sucesso = endereco.geocodificar_async()
+        # Não geocodifica na requisição (até 30s de Nominatim): enfileira
+        # para o worker (geocodificar_enderecos --continuo). Pedido manual
+        # refaz a geocodificação mesmo que já haja coordenadas.
+        from ocorrencias.utils.geocodificacao_lote import enfileirar
 
-        if sucesso:
-            serializer = self.get_serializer(endereco)
-            return Response(
-                {
-                    "message": "Endereço geocodificado com sucesso.",
-                    "endereco": serializer.data,
-                }
-            )
-        else:
-            return Response(
-                {"error": "Não foi possível geocodificar o endereço. Tente novamente."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        enfileirar([endereco.id], forcar=True)
+        return Response(
+            {
+                "message": "Endereço enviado para a fila de geocodificação.",
+                "endereco_id": endereco.id,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
@@ -1,87 +1,89 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Count, F, Case, When, Sum
+from django.db.models import Q, F, Case, When, Sum
 from django.db.models.functions import Coalesce
 from datetime import datetime
 
 from .models import Ocorrencia, OcorrenciaExame
 from .permissions import PodeVerRelatoriosGerenciais
 from .pdf_generator import gerar_pdf_relatorios_gerenciais
+from .utils.resumo import resumo_visivel_para
 from servicos_periciais.models import ServicoPericial
 from cidades.models import Cidade
 from usuarios.models import User
 from classificacoes.models import ClassificacaoOcorrencia
-from exames.models import Exame
 
 
-def _montar_exames_hierarquicos(ids_ocorrencias):
+def _montar_exames_hierarquicos(ocorrencias):
     """
-    Função definitiva para agrupar exames em árvore (Pai/Filho).
-    À prova de duplicatas e infalível na soma.
+    Agrupa os exames em árvore (Pai/Filho) somando as quantidades.
+
+    `ocorrencias` é um queryset (ex.: `queryset.values("id")`): o filtro vira
+    subquery no SQL e a árvore sai de uma única query agregada por exame, que
+    já traz os dados do exame pai via JOIN.
     """
     itens_agrupados = (
-        OcorrenciaExame.objects.filter(ocorrencia_id__in=ids_ocorrencias)
-        .values("exame_id")
+        OcorrenciaExame.objects.filter(
+            ocorrencia_id__in=ocorrencias, exame__deleted_at__isnull=True
+        )
+        .order_by()
+        .values(
+            "exame_id",
+            "exame__codigo",
+            "exame__nome",
+            "exame__servico_pericial__sigla",
+            "exame__parent_id",
+            "exame__parent__codigo",
+            "exame__parent__nome",
+            "exame__parent__servico_pericial__sigla",
+            "exame__parent__deleted_at",
+        )
         .annotate(qtd=Sum("quantidade"))
     )
 
-    if not itens_agrupados:
-        return []
-
-    qtd_map = {item["exame_id"]: item["qtd"] for item in itens_agrupados}
-    exames_com_laudo_ids = list(qtd_map.keys())
-
-    # Busca os exames que tiveram laudos + os pais deles
-    exames_db = Exame.objects.select_related("parent", "servico_pericial").filter(
-        id__in=exames_com_laudo_ids
-    )
-
-    pais_ids_necessarios = set()
-    for ex in exames_db:
-        if ex.parent_id:
-            pais_ids_necessarios.add(ex.parent_id)
-
-    pais_faltantes = (
-        Exame.objects.select_related("servico_pericial")
-        .filter(id__in=pais_ids_necessarios)
-        .exclude(id__in=exames_com_laudo_ids)
-    )
-
-    todos_exames_map = {ex.id: ex for ex in list(exames_db) + list(pais_faltantes)}
-
     arvore = {}
 
-    # Primeiro laço: Garante que TODOS os PAIS existam na árvore
-    for ex_id, ex in todos_exames_map.items():
-        if ex.parent_id is None:  # É um pai ou raiz
-            if ex.id not in arvore:
-                arvore[ex.id] = {
-                    "codigo": ex.codigo,
-                    "nome": ex.nome,
-                    "servico_sigla": (
-                        ex.servico_pericial.sigla if ex.servico_pericial else "-"
-                    ),
-                    "quantidade_total": 0,
-                    "filhos": [],
+    def no_pai(exame_id, codigo, nome, sigla):
+        if exame_id not in arvore:
+            arvore[exame_id] = {
+                "codigo": codigo,
+                "nome": nome,
+                "servico_sigla": sigla or "-",
+                "quantidade_total": 0,
+                "filhos": [],
+            }
+        return arvore[exame_id]
+
+    for item in itens_agrupados:
+        qtd = item["qtd"] or 0
+
+        if item["exame__parent_id"]:  # É filho
+            # Pai excluído (soft delete) não aparece, nem os filhos dele
+            if item["exame__parent__deleted_at"] is not None:
+                continue
+            pai = no_pai(
+                item["exame__parent_id"],
+                item["exame__parent__codigo"],
+                item["exame__parent__nome"],
+                item["exame__parent__servico_pericial__sigla"],
+            )
+            pai["filhos"].append(
+                {
+                    "codigo": item["exame__codigo"],
+                    "nome": item["exame__nome"],
+                    "quantidade": qtd,
                 }
-
-    # Segundo laço: Distribui as quantidades e os filhos
-    for exame_id, qtd in qtd_map.items():
-        exame = todos_exames_map.get(exame_id)
-        if not exame:
-            continue
-
-        if exame.parent_id:  # É filho
-            pai = todos_exames_map.get(exame.parent_id)
-            if pai and pai.id in arvore:
-                arvore[pai.id]["filhos"].append(
-                    {"codigo": exame.codigo, "nome": exame.nome, "quantidade": qtd}
-                )
-                arvore[pai.id]["quantidade_total"] += qtd
+            )
+            pai["quantidade_total"] += qtd
         else:  # É pai que recebeu laudo direto
-            if exame.id in arvore:
-                arvore[exame.id]["quantidade_total"] += qtd
+            pai = no_pai(
+                item["exame_id"],
+                item["exame__codigo"],
+                item["exame__nome"],
+                item["exame__servico_pericial__sigla"],
+            )
+            pai["quantidade_total"] += qtd
 
     def sort_key(codigo):
         return [int(p) if p.isdigit() else p for p in (codigo or "").split(".")]
@@ -93,6 +95,154 @@ def _montar_exames_hierarquicos(ids_ocorrencias):
     return sorted(resultado, key=lambda x: sort_key(x["codigo"]))
 
 
+def _producao_do_resumo(resumo, perito_id=None):
+    """
+    Agrupamentos dos relatórios gerenciais lidos do resumo diário
+    (grupo principal, classificação específica, perito e serviço).
+    """
+    por_grupo_principal = (
+        resumo.annotate(
+            grupo_nome=Case(
+                When(
+                    classificacao__parent__isnull=False,
+                    then=F("classificacao__parent__nome"),
+                ),
+                default=F("classificacao__nome"),
+            ),
+            grupo_codigo=Case(
+                When(
+                    classificacao__parent__isnull=False,
+                    then=F("classificacao__parent__codigo"),
+                ),
+                default=F("classificacao__codigo"),
+            ),
+        )
+        .values("grupo_nome", "grupo_codigo")
+        .annotate(total=Sum("total"))
+        .order_by("grupo_codigo")
+    )
+
+    por_classificacao_especifica = (
+        resumo.filter(classificacao__parent__isnull=False)
+        .values("classificacao__codigo", "classificacao__nome")
+        .annotate(total=Sum("total"))
+        .order_by("classificacao__codigo")
+    )
+
+    contagens_status = {
+        "total": Sum("total"),
+        "finalizadas": Sum("total", filter=Q(status="FINALIZADA")),
+        "em_analise": Sum("total", filter=Q(status="EM_ANALISE")),
+    }
+
+    # Produção por Perito
+    por_perito_id = {
+        item["perito_id"]: item
+        for item in resumo.filter(perito__isnull=False)
+        .values("perito_id")
+        .annotate(**contagens_status)
+    }
+    peritos_queryset = User.objects.filter(perfil="PERITO", status="ATIVO")
+    if perito_id:
+        peritos_queryset = peritos_queryset.filter(id=perito_id)
+    por_perito = []
+    for perito in peritos_queryset.values("id", "nome_completo"):
+        item = por_perito_id.get(perito["id"], {})
+        por_perito.append(
+            {
+                "nome_completo": perito["nome_completo"],
+                "total_ocorrencias": item.get("total") or 0,
+                "finalizadas": item.get("finalizadas") or 0,
+                "em_analise": item.get("em_analise") or 0,
+            }
+        )
+    por_perito.sort(key=lambda x: x["total_ocorrencias"], reverse=True)
+
+    # Produção por Serviço
+    por_servico_id = {
+        item["servico_pericial_id"]: item
+        for item in resumo.values("servico_pericial_id").annotate(
+            total_exames=Sum("total_exames"), **contagens_status
+        )
+    }
+    por_servico = []
+    for servico in ServicoPericial.objects.filter(deleted_at__isnull=True).values(
+        "id", "sigla", "nome"
+    ):
+        item = por_servico_id.get(servico["id"], {})
+        por_servico.append(
+            {
+                "servico_pericial__sigla": servico["sigla"],
+                "servico_pericial__nome": servico["nome"],
+                "total": item.get("total") or 0,
+                "total_exames": item.get("total_exames") or 0,
+                "finalizadas": item.get("finalizadas") or 0,
+                "em_analise": item.get("em_analise") or 0,
+            }
+        )
+    por_servico.sort(key=lambda x: x["total"], reverse=True)
+
+    return {
+        "por_grupo_principal": list(por_grupo_principal),
+        "por_classificacao_especifica": list(por_classificacao_especifica),
+        "producao_por_perito": por_perito,
+        "por_servico": por_servico,
+    }
+
+
+def _tempo_medio_fases_do_resumo(resumo):
+    """Tempo médio (em dias) de cada fase, a partir das durações somadas no resumo."""
+
+    def _media_dias(segundos, quantidade):
+        if not quantidade:
+            return None
+        return round(segundos / quantidade / 86400, 1)
+
+    somas = resumo.aggregate(
+        total_com_laudo=Coalesce(Sum("total_com_laudo"), 0),
+        qtd_criacao_laudo=Coalesce(Sum("qtd_criacao_laudo"), 0),
+        segundos_criacao_laudo=Coalesce(Sum("segundos_criacao_laudo"), 0),
+        qtd_laudo_finalizacao=Coalesce(Sum("qtd_laudo_finalizacao"), 0),
+        segundos_laudo_finalizacao=Coalesce(Sum("segundos_laudo_finalizacao"), 0),
+        qtd_criacao_finalizacao=Coalesce(Sum("qtd_criacao_finalizacao"), 0),
+        segundos_criacao_finalizacao=Coalesce(Sum("segundos_criacao_finalizacao"), 0),
+    )
+
+    por_perito = (
+        resumo.filter(perito__isnull=False, qtd_criacao_laudo__gt=0)
+        .values("perito__nome_completo")
+        .annotate(
+            qtd=Sum("qtd_criacao_laudo"), segundos=Sum("segundos_criacao_laudo")
+        )
+    )
+    tempo_por_perito = sorted(
+        [
+            {
+                "nome_completo": item["perito__nome_completo"],
+                "total_laudos": item["qtd"],
+                "media_criacao_laudo_dias": _media_dias(item["segundos"], item["qtd"]),
+            }
+            for item in por_perito
+            if item["perito__nome_completo"]
+        ],
+        key=lambda x: x["media_criacao_laudo_dias"],
+    )
+
+    return {
+        "media_criacao_laudo_dias": _media_dias(
+            somas["segundos_criacao_laudo"], somas["qtd_criacao_laudo"]
+        ),
+        "media_laudo_finalizacao_dias": _media_dias(
+            somas["segundos_laudo_finalizacao"], somas["qtd_laudo_finalizacao"]
+        ),
+        "media_total_dias": _media_dias(
+            somas["segundos_criacao_finalizacao"], somas["qtd_criacao_finalizacao"]
+        ),
+        "total_com_laudo": somas["total_com_laudo"],
+        "por_perito": tempo_por_perito,
+    }
+
+
 class RelatoriosGerenciaisViewSet(viewsets.ViewSet):
     """ViewSet dedicado aos relatórios gerenciais"""
 
@@ -110,8 +260,15 @@ class RelatoriosGerenciaisViewSet(viewsets.ViewSet):
 
         return queryset
 
-    def _aplicar_filtros(self, queryset, request):
-        """Aplica filtros comuns ao queryset e retorna (queryset, filtros_info)"""
+    def get_resumo(self):
+        """Linhas do resumo diário visíveis para o usuário (mesma regra)"""
+        return resumo_visivel_para(self.request.user)
+
+    def _aplicar_filtros(self, queryset, resumo, request):
+        """
+        Aplica filtros comuns ao queryset e ao resumo diário e retorna
+        (queryset, resumo, filtros_info, perito_id)
+        """
         data_inicio_str = request.query_params.get("data_inicio")
         data_fim_str = request.query_params.get("data_fim")
         servico_id = request.query_params.get("servico_id")
@@ -124,15 +281,18 @@ class RelatoriosGerenciaisViewSet(viewsets.ViewSet):
         if data_inicio_str:
             dt = datetime.strptime(data_inicio_str, "%Y-%m-%d").date()
             queryset = queryset.filter(created_at__date__gte=dt)
+            resumo = resumo.filter(dia__gte=dt)
             filtros_info["data_inicio"] = dt.strftime("%d/%m/%Y")
 
         if data_fim_str:
             dt = datetime.strptime(data_fim_str, "%Y-%m-%d").date()
             queryset = queryset.filter(created_at__date__lte=dt)
+            resumo = resumo.filter(dia__lte=dt)
             filtros_info["data_fim"] = dt.strftime("%d/%m/%Y")
 
         if servico_id:
             queryset = queryset.filter(servico_pericial_id=servico_id)
+            resumo = resumo.filter(servico_pericial_id=servico_id)
             try:
                 filtros_info["servico_nome"] = ServicoPericial.objects.get(
                     pk=servico_id
@@ -142,6 +302,7 @@ class RelatoriosGerenciaisViewSet(viewsets.ViewSet):
 
         if cidade_id:
             queryset = queryset.filter(cidade_id=cidade_id)
+            resumo = resumo.filter(cidade_id=cidade_id)
             try:
                 filtros_info["cidade_nome"] = Cidade.objects.get(pk=cidade_id).nome
             except Cidade.DoesNotExist:
@@ -149,6 +310,7 @@ class RelatoriosGerenciaisViewSet(viewsets.ViewSet):
 
         if perito_id:
             queryset = queryset.filter(perito_atribuido_id=perito_id)
+            resumo = resumo.filter(perito_id=perito_id)
             try:
                 filtros_info["perito_nome"] = User.objects.get(
                     pk=perito_id
@@ -164,177 +326,55 @@ class RelatoriosGerenciaisViewSet(viewsets.ViewSet):
                 )
                 ids_para_filtrar = [classificacao.id] + list(descendentes)
                 queryset = queryset.filter(classificacao_id__in=ids_para_filtrar)
+                resumo = resumo.filter(classificacao_id__in=ids_para_filtrar)
                 filtros_info["classificacao_nome"] = classificacao.nome
             except ClassificacaoOcorrencia.DoesNotExist:
                 pass
 
-        return queryset, filtros_info, perito_id
-
-    def _gerar_dados(self, queryset, perito_id=None):
-        """Gera todos os dados dos relatórios a partir do queryset filtrado"""
-
-        # Grupo Principal
-        por_grupo_principal = (
-            queryset.annotate(
-                grupo_nome=Case(
-                    When(
-                        classificacao__parent__isnull=False,
-                        then=F("classificacao__parent__nome"),
-                    ),
-                    default=F("classificacao__nome"),
-                ),
-                grupo_codigo=Case(
-                    When(
-                        classificacao__parent__isnull=False,
-                        then=F("classificacao__parent__codigo"),
-                    ),
-                    default=F("classificacao__codigo"),
-                ),
-            )
-            .values("grupo_nome", "grupo_codigo")
-            .annotate(total=Count("id"))
-            .order_by("grupo_codigo")
-        )
-
-        # Classificação Específica
-        por_classificacao_especifica = (
-            queryset.filter(classificacao__parent__isnull=False)
-            .values("classificacao__codigo", "classificacao__nome")
-            .annotate(total=Count("id"))
-            .order_by("classificacao__codigo")
-        )
-
-        # Produção por Perito
-        peritos_queryset = User.objects.filter(perfil="PERITO", status="ATIVO")
-        if perito_id:
-            peritos_queryset = peritos_queryset.filter(id=perito_id)
-        por_perito = (
-            peritos_queryset.annotate(
-                total_ocorrencias=Coalesce(
-                    Count(
-                        "ocorrencias_atribuidas",
-                        filter=Q(ocorrencias_atribuidas__in=queryset),
-                    ),
-                    0,
-                ),
-                finalizadas=Coalesce(
-                    Count(
-                        "ocorrencias_atribuidas",
-                        filter=Q(
-                            ocorrencias_atribuidas__in=queryset,
-                            ocorrencias_atribuidas__status="FINALIZADA",
-                        ),
-                    ),
-                    0,
-                ),
-                em_analise=Coalesce(
-                    Count(
-                        "ocorrencias_atribuidas",
-                        filter=Q(
-                            ocorrencias_atribuidas__in=queryset,
-                            ocorrencias_atribuidas__status="EM_ANALISE",
-                        ),
-                    ),
-                    0,
-                ),
-            )
-            .values("nome_completo", "total_ocorrencias", "finalizadas", "em_analise")
-            .order_by("-total_ocorrencias")
-        )
-
-        # Produção por Serviço
-        servicos_queryset = ServicoPericial.objects.filter(deleted_at__isnull=True)
-        por_servico = (
-            servicos_queryset.annotate(
-                total_exames=Coalesce(
-                    Sum(
-                        "ocorrencias__ocorrenciaexame__quantidade",
-                        filter=Q(ocorrencias__in=queryset),
-                    ),
-                    0,
-                ),
-                total=Coalesce(
-                    Count(
-                        "ocorrencias", filter=Q(ocorrencias__in=queryset), distinct=True
-                    ),
-                    0,
-                ),
-                finalizadas=Coalesce(
-                    Count(
-                        "ocorrencias",
-                        filter=Q(
-                            ocorrencias__in=queryset, ocorrencias__status="FINALIZADA"
-                        ),
-                        distinct=True,
-                    ),
-                    0,
-                ),
-                em_analise=Coalesce(
-                    Count(
-                        "ocorrencias",
-                        filter=Q(
-                            ocorrencias__in=queryset, ocorrencias__status="EM_ANALISE"
-                        ),
-                        distinct=True,
-                    ),
-                    0,
-                ),
-            )
-            .values(
-                "sigla", "nome", "total", "total_exames", "finalizadas", "em_analise"
-            )
-            .order_by("-total")
-        )
+        return queryset, resumo, filtros_info, perito_id
 
-        por_servico_formatado = [
-            {
-                "servico_pericial__sigla": item["sigla"],
-                "servico_pericial__nome": item["nome"],
-                "total": item["total"],
-                "total_exames": item["total_exames"],
-                "finalizadas": item["finalizadas"],
-                "em_analise": item["em_analise"],
-            }
-            for item in por_servico
-        ]
+    def _gerar_dados(self, queryset, resumo, perito_id=None):
+        """
+        Gera os dados dos relatórios: contagens do resumo diário filtrado e
+        a árvore de exames a partir do queryset de ocorrências filtrado
+        """
+        dados = _producao_do_resumo(resumo, perito_id)
 
         # Exames com hierarquia pai/filho
-        ids_ocorrencias = list(queryset.values_list("id", flat=True))
-        por_exame_formatado = _montar_exames_hierarquicos(ids_ocorrencias)
-
-        return {
-            "por_grupo_principal": list(por_grupo_principal),
-            "por_classificacao_especifica": list(por_classificacao_especifica),
-            "producao_por_perito": list(por_perito),
-            "por_servico": por_servico_formatado,
-            "por_exame": por_exame_formatado,
-        }
+        dados["por_exame"] = _montar_exames_hierarquicos(queryset.values("id"))
+        return dados
 
     def list(self, request):
         """Retorna os dados em JSON - URL: GET /api/relatorios-gerenciais/"""
         queryset = self.get_queryset()
+        resumo = self.get_resumo()
 
         try:
-            queryset, filtros_info, perito_id = self._aplicar_filtros(queryset, request)
+            queryset, resumo, filtros_info, perito_id = self._aplicar_filtros(
+                queryset, resumo, request
+            )
         except (ValueError, TypeError):
             return Response(
                 {"error": "Formato de filtro inválido."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        dados = self._gerar_dados(queryset, perito_id)
+        dados = self._gerar_dados(queryset, resumo, perito_id)
         return Response(dados)
 
     @action(detail=False, methods=["get"], url_path="pdf")
     def gerar_pdf(self, request):
         """Gera o PDF - URL: GET /api/relatorios-gerenciais/pdf/"""
         queryset = self.get_queryset()
+        resumo = self.get_resumo()
 
         try:
-            queryset, filtros_info, perito_id = self._aplicar_filtros(queryset, request)
+            queryset, resumo, filtros_info, perito_id = self._aplicar_filtros(
+                queryset, resumo, request
+            )
         except (ValueError, TypeError):
             filtros_info = {}
             perito_id = None
 
-        dados = self._gerar_dados(queryset, perito_id)
+        dados = self._gerar_dados(queryset, resumo, perito_id)
         return gerar_pdf_relatorios_gerenciais(dados, filtros_info, request)
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ordens_servico", "0005_adicionar_desconto_admin_e_prazo_efetivo"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ordemservico",
+            index=models.Index(fields=["created_at", "id"], name="os_created_id_idx"),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+
+def semear_sequenciais(apps, schema_editor):
+    """Último número por ano a partir das OS existentes (inclusive excluídas)."""
+    OrdemServico = apps.get_model("ordens_servico", "OrdemServico")
+    SequencialOrdemServico = apps.get_model("ordens_servico", "SequencialOrdemServico")
+
+    ultimos = {}
+    for numero_os in OrdemServico._base_manager.values_list("numero_os", flat=True):
+        numero, _, ano = (numero_os or "").partition("/")
+        if numero.isdigit() and ano.isdigit():
+            ultimos[int(ano)] = max(ultimos.get(int(ano), 0), int(numero))
+
+    SequencialOrdemServico.objects.bulk_create(
+        [
+            SequencialOrdemServico(ano=ano, ultimo_numero=numero)
+            for ano, numero in ultimos.items()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ordens_servico", "0006_os_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SequencialOrdemServico",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "ano",
+                    models.PositiveSmallIntegerField(unique=True, verbose_name="Ano"),
+                ),
+                (
+                    "ultimo_numero",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Último Número"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Sequencial de Ordem de Serviço",
+                "verbose_name_plural": "Sequenciais de Ordens de Serviço",
+            },
+        ),
+        migrations.RunPython(semear_sequenciais, migrations.RunPython.noop),
+    ]
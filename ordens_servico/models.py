@@ -4,9 +4,9 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
-from django.db import transaction  # ✅ IMPORT ADICIONADO (para Risco 1)
+from django.db import connection, transaction
 from django.db.models import Q  # ✅ IMPORT ADICIONADO (para Risco 4)
-from ocorrencias.models import Ocorrencia
+from ocorrencias.models import Ocorrencia, VersaoDados
 from usuarios.models import AuditModel
 from unidades_demandantes.models import UnidadeDemandante
 from autoridades.models import Autoridade
@@ -487,37 +487,24 @@ class OrdemServico(AuditModel):
                 updated_by=user,
                 updated_at=timezone.now(),
             )
+            # .update() não dispara post_save: invalida o cache de análise aqui
+            transaction.on_commit(VersaoDados.incrementar)
 
     # ❌ MÉTODO OBSOLETO REMOVIDO (Risco 2: Ambiguidade)
     # def atualizar_status(self): ...
 
     def save(self, *args, **kwargs):
         """
-        ✅ CORRIGIDO (Risco 1): Protegido contra race condition na criação do numero_os.
+        Gera o numero_os (NNNN/AAAA) na criação a partir do contador do ano
+        (SequencialOrdemServico), sem varrer nem travar linhas de OS.
         """
-        # Gera o número da OS apenas na primeira criação
-        if not self.pk:
+        if not self.pk and not self.numero_os:
             with transaction.atomic():
-                ano = timezone.now().year
-
-                # Trava a tabela para leitura (select_for_update)
-                # para impedir que duas criações peguem o mesmo último número
-                ultimo_os = (
-                    OrdemServico.objects.select_for_update()
-                    .filter(numero_os__endswith=f"/{ano}")
-                    .order_by("id")
-                    .last()
-                )
-
-                novo_numero = (
-                    (int(ultimo_os.numero_os.split("/")[0]) + 1) if ultimo_os else 1
-                )
-                self.numero_os = f"{novo_numero:04d}/{ano}"
-
-                # Salva DENTRO da transação atômica
+                self.numero_os = gerar_numero_os()
+                # Salva DENTRO da transação: se o INSERT falhar, o contador
+                # volta junto e o número não fica pulado
                 super(OrdemServico, self).save(*args, **kwargs)
         else:
-            # Salva normalmente para atualizações
             super(OrdemServico, self).save(*args, **kwargs)
 
     def __str__(self):
@@ -529,3 +516,46 @@ class OrdemServico(AuditModel):
         verbose_name = "Ordem de Serviço"
         verbose_name_plural = "Ordens de Serviço"
         ordering = ["-created_at"]
+        indexes = [
+            # Chave da paginação por cursor (keyset)
+            models.Index(fields=["created_at", "id"], name="os_created_id_idx"),
+        ]
+
+
+class SequencialOrdemServico(models.Model):
+    """
+    Último número de OS emitido por ano. Incrementado com um único
+    INSERT ... ON CONFLICT DO UPDATE ... RETURNING, que trava só esta linha
+    até o fim da transação da OS (numeração sem lacunas).
+    """
+
+    ano = models.PositiveSmallIntegerField(unique=True, verbose_name="Ano")
+    ultimo_numero = models.PositiveIntegerField(
+        default=0, verbose_name="Último Número"
+    )
+
+    class Meta:
+        verbose_name = "Sequencial de Ordem de Serviço"
+        verbose_name_plural = "Sequenciais de Ordens de Serviço"
+
+    def __str__(self):
+        return f"Ano {self.ano} - Último número: {self.ultimo_numero}"
+
+    @classmethod
+    def proximo(cls, ano):
+        tabela = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {tabela} (ano, ultimo_numero) VALUES (%s, 1) "
+                f"ON CONFLICT (ano) DO UPDATE "
+                f"SET ultimo_numero = {tabela}.ultimo_numero + 1 "
+                "RETURNING ultimo_numero",
+                [ano],
+            )
+            return cursor.fetchone()[0]
+
+
+def gerar_numero_os(ano=None):
+    """Próximo número NNNN/AAAA (chamar dentro da transação que cria a OS)."""
+    ano = ano or timezone.now().year
+    return f"{SequencialOrdemServico.proximo(ano):04d}/{ano}"
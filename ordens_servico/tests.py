@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ocorrencias.models import Ocorrencia
+from ocorrencias.tests import criar_cadastros_basicos
+
+from .models import OrdemServico, gerar_numero_os
+
+
+class NumeracaoOrdemServicoTests(TransactionTestCase):
+    """
+    Numeração NNNN/AAAA pelo contador do ano com commits reais: threads
+    simultâneas recebem 1..N sem duplicatas nem lacunas.
+    """
+
+    THREADS = 8
+    POR_THREAD = 10
+
+    def setUp(self):
+        self.ocorrencia = Ocorrencia.objects.create(**criar_cadastros_basicos())
+        self.ano = timezone.now().year
+
+    def criar_os(self):
+        return OrdemServico.objects.create(ocorrencia=self.ocorrencia, prazo_dias=10)
+
+    def sequenciais(self):
+        return sorted(
+            int(numero.split("/")[0])
+            for numero in OrdemServico._base_manager.values_list("numero_os", flat=True)
+        )
+
+    def test_numeracao_nao_acessa_a_tabela_de_os(self):
+        tabela = OrdemServico._meta.db_table
+        with CaptureQueriesContext(connection) as contexto, transaction.atomic():
+            gerar_numero_os(self.ano)
+        self.assertEqual(
+            [q["sql"] for q in contexto.captured_queries if tabela in q["sql"]], []
+        )
+
+    def test_threads_simultaneas_recebem_1_a_n(self):
+        def trabalhador():
+            try:
+                for _ in range(self.POR_THREAD):
+                    self.criar_os()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as pool:
+            for futuro in [pool.submit(trabalhador) for _ in range(self.THREADS)]:
+                futuro.result()
+
+        self.assertEqual(
+            self.sequenciais(), list(range(1, self.THREADS * self.POR_THREAD + 1))
+        )
+
+    def test_insert_desfeito_devolve_o_numero(self):
+        self.criar_os()
+        with self.assertRaises(IntegrityError):
+            OrdemServico.objects.create(ocorrencia_id=0, prazo_dias=10)
+        self.criar_os()
+
+        self.assertEqual(self.sequenciais(), [1, 2])
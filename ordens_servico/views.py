@@ -34,6 +34,17 @@ from .serializers import (
 )
 from .permissions import OrdemServicoPermission
 from .filters import OrdemServicoFilter
+from spr.cache_respostas import resposta_em_cache
+from spr.pagination import CursorOpcionalPagination
+from spr.exportacao import (
+    Coluna,
+    formatar_data,
+    formatar_data_hora,
+    formatar_sigla_nome,
+    resposta_csv,
+    rotulos,
+)
+from ocorrencias.permissions import PodeVerRelatoriosGerenciais
 from .pdf_generator import (
     gerar_pdf_ordem_servico,
     gerar_pdf_oficial_ordem_servico,
@@ -59,6 +70,7 @@ class OrdemServicoViewSet(viewsets.ModelViewSet):
     - ?ocorrencia_id=1  → Filtra OS de uma ocorrência específica
     - ?vencida=true     → Filtra apenas vencidas
     - ?sem_ciencia=true → Filtra sem ciência
+    - ?cursor=          → Paginação por cursor (keyset) em vez de página
 
     Actions customizadas:
     - POST  /api/ordens-servico/{id}/tomar-ciencia/
@@ -69,6 +81,7 @@ class OrdemServicoViewSet(viewsets.ModelViewSet):
     - GET   /api/ordens-servico/{id}/pdf/
     - GET   /api/ordens-servico/{id}/pdf-oficial/
     - GET   /api/ordens-servico/listagem-pdf/?ocorrencia_id=1
+    - GET   /api/ordens-servico/exportar-csv/
     - GET   /api/ordens-servico/lixeira/
     - POST  /api/ordens-servico/{id}/restaurar/
     """
@@ -95,6 +108,9 @@ class OrdemServicoViewSet(viewsets.ModelViewSet):
 
     permission_classes = [OrdemServicoPermission]
     filterset_class = OrdemServicoFilter
+    pagination_class = CursorOpcionalPagination
+    cursor_ordering = ("-created_at", "-id")
+    cursor_ordering_fields = ("created_at",)
 
     # --- MÉTODO get_queryset ORIGINAL ---
     def get_queryset(self):
@@ -851,6 +867,62 @@ class OrdemServicoViewSet(viewsets.ModelViewSet):
 
         return gerar_pdf_listagem_ordens_servico(ocorrencia, request)
 
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="exportar-csv",
+        permission_classes=[PodeVerRelatoriosGerenciais],
+    )
+    def exportar_csv(self, request):
+        """Exporta as OS filtradas em CSV (streaming, memória constante)."""
+        status_labels = rotulos(OrdemServico.Status.choices)
+        queryset = self.filter_queryset(self.get_queryset()).order_by(
+            "-created_at"
+        )
+
+        colunas = [
+            Coluna("Numero OS", "numero_os"),
+            Coluna(
+                "Status",
+                "status",
+                formatar=lambda s: status_labels.get(s, s),
+            ),
+            Coluna("Reiteracao", "numero_reiteracao"),
+            Coluna("Ocorrencia", "ocorrencia__numero_ocorrencia"),
+            Coluna(
+                "Servico",
+                "ocorrencia__servico_pericial__sigla",
+                "ocorrencia__servico_pericial__nome",
+                formatar=formatar_sigla_nome,
+            ),
+            Coluna(
+                "Perito",
+                "ocorrencia__perito_atribuido__nome_completo",
+                formatar=lambda nome: nome or "Nao atribuido",
+            ),
+            Coluna(
+                "Unidade Demandante",
+                "unidade_demandante__sigla",
+                "unidade_demandante__nome",
+                formatar=formatar_sigla_nome,
+            ),
+            Coluna("Ordenada por", "ordenada_por__nome_completo"),
+            Coluna("Prazo (dias)", "prazo_dias"),
+            Coluna("Emitida em", "created_at", formatar=formatar_data_hora),
+            Coluna("Ciencia em", "data_ciencia", formatar=formatar_data_hora),
+            Coluna("Data Limite", "data_prazo", formatar=formatar_data),
+            Coluna(
+                "Data Limite Efetiva",
+                "data_prazo_efetivo",
+                formatar=formatar_data,
+            ),
+            Coluna(
+                "Concluida em", "data_conclusao", formatar=formatar_data_hora
+            ),
+        ]
+
+        return resposta_csv(queryset, colunas, "ordens_servico.csv")
+
     # =========================================================================
     # RELATÓRIOS (Mantendo versão otimizada e com correção do TruncDate)
     # =========================================================================
@@ -1105,6 +1177,7 @@ class OrdemServicoViewSet(viewsets.ModelViewSet):
     # ✅✅✅ NOVA ACTION PARA ESTATÍSTICAS DO DASHBOARD ✅✅✅
     # =========================================================================
     @action(detail=False, methods=["get"], url_path="estatisticas")
+    @resposta_em_cache("ordens-servico-estatisticas")
     def estatisticas_os(self, request):
         """
         Retorna estatísticas agregadas sobre Ordens de Serviço para o dashboard.
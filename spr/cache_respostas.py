@@ -0,0 +1,132 @@
+"""
+# SPR-CRIMINALÍSTICA - Sistema de Organização Pericial
+# Desenvolvido por: Perito Criminal Sttefani Ribeiro
+# Versão 1.0 - 2025
+"""
+
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+# Valores de filtro que o frontend manda quando o campo está vazio
+VALORES_VAZIOS = {"", "null", "undefined", "None"}
+
+PERFIS_ADMIN = {"ADMINISTRATIVO", "SUPER_ADMIN"}
+
+# Validade máxima de uma entrada (segundos); a versão dos dados invalida antes
+ANALISE_CACHE_TIMEOUT = getattr(settings, "ANALISE_CACHE_TIMEOUT", 600)
+
+
+def parametros_normalizados(request):
+    """Query params sem valores vazios, em ordem estável (chave e valores)."""
+    itens = []
+    for chave in sorted(request.query_params):
+        valores = sorted(
+            v.strip()
+            for v in request.query_params.getlist(chave)
+            if v.strip() not in VALORES_VAZIOS
+        )
+        if valores:
+            itens.append((chave, valores))
+    return itens
+
+
+def escopo_usuario(user):
+    """
+    Escopo de permissão para a chave do cache: perfis administrativos (que
+    enxergam tudo) compartilham entradas; os demais têm escopo próprio —
+    inclusive superusers com perfil PERITO/OPERACIONAL, cujas estatísticas
+    de ocorrências são recortadas pelo perfil.
+    """
+    perfil = getattr(user, "perfil", None)
+    if perfil in PERFIS_ADMIN:
+        return f"admin:{perfil}:{int(user.is_superuser)}"
+    return f"usuario:{user.pk}"
+
+
+def _incrementar_contador(chave):
+    try:
+        return cache.incr(chave)
+    except ValueError:
+        cache.add(chave, 0, timeout=None)
+        return cache.incr(chave)
+
+
+def _etag_corresponde(request, etag):
+    enviados = request.headers.get("If-None-Match", "")
+    return etag in {valor.strip() for valor in enviados.split(",")} or enviados == "*"
+
+
+def resposta_em_cache(nome, por_usuario=True, timeout=None):
+    """
+    Decorator para GETs de análise (métodos de APIView/ViewSet).
+
+    A chave combina endpoint, filtros normalizados, escopo do usuário, dia
+    corrente e a versão dos dados (VersaoDados), que muda a cada escrita em
+    ocorrências, endereços e OS — entradas antigas simplesmente deixam de
+    ser lidas. Responde 304 para If-None-Match com o ETag atual e informa
+    HIT/MISS e os contadores do endpoint nos headers X-Cache/X-Cache-Stats.
+    """
+
+    def decorator(metodo):
+        @functools.wraps(metodo)
+        def wrapper(self, request, *args, **kwargs):
+            from ocorrencias.models import VersaoDados
+
+            partes = {
+                "endpoint": nome,
+                "params": parametros_normalizados(request),
+                "kwargs": sorted((k, str(v)) for k, v in kwargs.items()),
+                "escopo": escopo_usuario(request.user) if por_usuario else "todos",
+                "dia": timezone.localdate().isoformat(),
+                "versao": VersaoDados.atual(),
+            }
+            resumo_chave = hashlib.sha1(
+                json.dumps(partes, sort_keys=True).encode()
+            ).hexdigest()
+            chave = f"spr:resposta:{nome}:{resumo_chave}"
+
+            entrada = cache.get(chave)
+            if entrada is not None:
+                resultado = "HIT"
+            else:
+                resultado = "MISS"
+                response = metodo(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                conteudo = JSONRenderer().render(response.data)
+                entrada = {
+                    "dados": json.loads(conteudo),
+                    "etag": f'"{hashlib.sha1(conteudo).hexdigest()}"',
+                }
+                cache.set(chave, entrada, timeout or ANALISE_CACHE_TIMEOUT)
+
+            chave_hits = f"spr:resposta:{nome}:hits"
+            chave_misses = f"spr:resposta:{nome}:misses"
+            if resultado == "HIT":
+                hits = _incrementar_contador(chave_hits)
+                misses = cache.get(chave_misses, 0)
+            else:
+                hits = cache.get(chave_hits, 0)
+                misses = _incrementar_contador(chave_misses)
+
+            if _etag_corresponde(request, entrada["etag"]):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(entrada["dados"])
+            response["ETag"] = entrada["etag"]
+            response["Cache-Control"] = "private, no-cache"
+            response["X-Cache"] = resultado
+            response["X-Cache-Stats"] = f"hits={hits}; misses={misses}"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,110 @@
+"""
+# SPR-CRIMINALÍSTICA - Sistema de Organização Pericial
+# Desenvolvido por: Perito Criminal Sttefani Ribeiro
+# Versão 1.0 - 2025
+"""
+
+import csv
+import logging
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# BOM para o Excel abrir o arquivo com os acentos corretos
+BOM_UTF8 = "\ufeff"
+
+
+class _Eco:
+    """Pseudo-arquivo: o csv.writer devolve a linha em vez de gravá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+class Coluna:
+    """
+    Uma coluna do CSV: título, campos lidos via values() e um formatador
+    opcional que recebe os valores desses campos na mesma ordem.
+    """
+
+    def __init__(self, titulo, *campos, formatar=None):
+        self.titulo = titulo
+        self.campos = campos
+        self.formatar = formatar
+
+    def valor(self, linha):
+        valores = [linha[campo] for campo in self.campos]
+        if self.formatar:
+            return self.formatar(*valores)
+        valor = valores[0] if valores else None
+        return "" if valor is None else valor
+
+
+def formatar_data_hora(valor):
+    if not valor:
+        return ""
+    return timezone.localtime(valor).strftime("%d/%m/%Y %H:%M")
+
+
+def formatar_data(valor):
+    return valor.strftime("%d/%m/%Y") if valor else ""
+
+
+def formatar_sigla_nome(sigla, nome):
+    if not sigla and not nome:
+        return ""
+    return f"{sigla} - {nome}"
+
+
+def rotulos(choices):
+    """Mapa valor -> rótulo calculado uma vez (evita get_FOO_display por linha)."""
+    return dict(choices)
+
+
+def gerar_linhas_csv(queryset, colunas, chunk_size=2000, delimiter=";"):
+    """
+    Gera o CSV em blocos de texto: BOM, cabeçalho e as linhas lidas com
+    values().iterator(), que usa cursor do lado do servidor no PostgreSQL.
+
+    O 200 e os cabeçalhos já saíram quando as linhas são lidas: um erro aqui
+    é registrado e propagado, e o servidor aborta a resposta (o cliente vê
+    a transferência incompleta, não um CSV truncado que parece inteiro).
+    O cursor é fechado em qualquer caso, inclusive se o cliente desistir.
+    """
+    writer = csv.writer(_Eco(), delimiter=delimiter)
+    campos = list(dict.fromkeys(campo for coluna in colunas for campo in coluna.campos))
+
+    yield BOM_UTF8 + writer.writerow([coluna.titulo for coluna in colunas])
+
+    linhas = (
+        queryset.select_related(None)
+        .prefetch_related(None)
+        .values(*campos)
+        .iterator(chunk_size=chunk_size)
+    )
+    try:
+        bloco = []
+        for linha in linhas:
+            bloco.append(writer.writerow([coluna.valor(linha) for coluna in colunas]))
+            if len(bloco) >= chunk_size:
+                yield "".join(bloco)
+                bloco = []
+        if bloco:
+            yield "".join(bloco)
+    except Exception:
+        logger.exception(f"Erro ao gerar CSV de {queryset.model._meta.label}; stream interrompido")
+        raise
+    finally:
+        linhas.close()
+
+
+def resposta_csv(queryset, colunas, nome_arquivo, chunk_size=2000):
+    """StreamingHttpResponse com o CSV do queryset; memória constante."""
+    response = StreamingHttpResponse(
+        gerar_linhas_csv(queryset, colunas, chunk_size=chunk_size),
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+    return response
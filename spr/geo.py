@@ -0,0 +1,197 @@
+"""
+# SPR-CRIMINALÍSTICA - Sistema de Organização Pericial
+# Desenvolvido por: Perito Criminal Sttefani Ribeiro
+# Versão 1.0 - 2025
+
+Utilitários geográficos das views de análise: bbox do mapa, grade de
+células (agrupamento feito no SQL), grade de densidade (NumPy) e GeoJSON
+em streaming.
+"""
+
+import base64
+import json
+
+import numpy as np
+
+from django.db.models import F, FloatField, Value
+from django.http import StreamingHttpResponse
+from django.db.models.functions import Cast, Floor
+
+ZOOM_MAXIMO = 22
+
+# Células por tile de 256px: 4 => uma célula a cada ~64px na tela
+CELULAS_POR_TILE = 4
+
+
+def parse_bbox(valor):
+    """
+    Converte 'oeste,sul,leste,norte' (formato do Leaflet toBBoxString)
+    em tupla de floats. Retorna None se o valor for inválido.
+    """
+    try:
+        oeste, sul, leste, norte = (float(parte) for parte in valor.split(","))
+    except (AttributeError, ValueError):
+        return None
+    if not (-180 <= oeste < leste <= 180 and -90 <= sul < norte <= 90):
+        return None
+    return oeste, sul, leste, norte
+
+
+def parse_zoom(valor):
+    """Zoom do mapa (0 a ZOOM_MAXIMO) ou None se inválido."""
+    try:
+        zoom = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return zoom if 0 <= zoom <= ZOOM_MAXIMO else None
+
+
+def tamanho_celula(zoom):
+    """Lado da célula da grade, em graus, para o zoom informado."""
+    return 360.0 / (2**zoom) / CELULAS_POR_TILE
+
+
+def filtrar_bbox(queryset, bbox, prefixo=""):
+    """Filtra latitude/longitude (com prefixo de relação, ex.: 'endereco__')."""
+    oeste, sul, leste, norte = bbox
+    return queryset.filter(
+        **{
+            f"{prefixo}latitude__gte": sul,
+            f"{prefixo}latitude__lte": norte,
+            f"{prefixo}longitude__gte": oeste,
+            f"{prefixo}longitude__lte": leste,
+        }
+    )
+
+
+def anotar_celula(queryset, tamanho, prefixo=""):
+    """
+    Anota geo_lat/geo_lng (float) e a célula da grade (celula_x, celula_y)
+    de cada linha, para agrupar com values("celula_x", "celula_y").
+    """
+    return queryset.annotate(
+        geo_lat=Cast(f"{prefixo}latitude", FloatField()),
+        geo_lng=Cast(f"{prefixo}longitude", FloatField()),
+    ).annotate(
+        celula_x=Floor(F("geo_lng") / Value(tamanho)),
+        celula_y=Floor(F("geo_lat") / Value(tamanho)),
+    )
+
+
+class Propriedade:
+    """
+    Uma propriedade das features GeoJSON: nome, campo lido via values() e
+    formatador opcional (mesma ideia da Coluna da exportação CSV).
+    """
+
+    def __init__(self, nome, campo, formatar=None):
+        self.nome = nome
+        self.campo = campo
+        self.formatar = formatar
+
+    def valor(self, linha):
+        valor = linha[self.campo]
+        if self.formatar:
+            return self.formatar(valor)
+        return "" if valor is None else valor
+
+
+def gerar_geojson(queryset, propriedades, prefixo="", chunk_size=2000, limite=None):
+    """
+    Gera uma FeatureCollection em blocos de texto a partir de
+    values().iterator(): nenhuma instância de model é criada e a memória
+    não cresce com a quantidade de features.
+
+    Com `limite`, lê uma linha a mais para saber se cortou: o rodapé traz
+    "truncado" e "limite" (membros extras permitidos pelo GeoJSON), já que
+    os headers saíram antes do streaming começar.
+    """
+    campo_lat = f"{prefixo}latitude"
+    campo_lng = f"{prefixo}longitude"
+    campos = list(
+        dict.fromkeys([campo_lat, campo_lng] + [p.campo for p in propriedades])
+    )
+
+    yield '{"type": "FeatureCollection", "features": ['
+
+    if limite is not None:
+        queryset = queryset[: limite + 1]
+    linhas = (
+        queryset.select_related(None)
+        .prefetch_related(None)
+        .values(*campos)
+        .iterator(chunk_size=chunk_size)
+    )
+    bloco = []
+    separador = ""
+    truncado = False
+    for indice, linha in enumerate(linhas):
+        if indice == limite:
+            truncado = True
+            break
+        feature = {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [float(linha[campo_lng]), float(linha[campo_lat])],
+            },
+            "properties": {p.nome: p.valor(linha) for p in propriedades},
+        }
+        bloco.append(separador + json.dumps(feature, ensure_ascii=False))
+        separador = ","
+        if len(bloco) >= chunk_size:
+            yield "".join(bloco)
+            bloco = []
+    if bloco:
+        yield "".join(bloco)
+
+    if limite is None:
+        yield "]}"
+    else:
+        yield f'], "truncado": {json.dumps(truncado)}, "limite": {limite}}}'
+
+
+def resposta_geojson(
+    queryset, propriedades, prefixo="endereco__", chunk_size=2000, limite=None
+):
+    """StreamingHttpResponse com o GeoJSON do queryset; memória constante."""
+    return StreamingHttpResponse(
+        gerar_geojson(
+            queryset, propriedades, prefixo=prefixo, chunk_size=chunk_size, limite=limite
+        ),
+        content_type="application/geo+json; charset=utf-8",
+    )
+
+
+def grade_densidade(latitudes, longitudes, bbox, largura, altura, sigma=0):
+    """
+    Histograma 2D das coordenadas no bbox (linha 0 = norte, coluna 0 = oeste),
+    opcionalmente suavizado por um kernel gaussiano de `sigma` células.
+    """
+    oeste, sul, leste, norte = bbox
+    grade, _, _ = np.histogram2d(
+        latitudes,
+        longitudes,
+        bins=(altura, largura),
+        range=((sul, norte), (oeste, leste)),
+    )
+    grade = np.flipud(grade)
+
+    if sigma > 0:
+        # Kernel nunca maior que a grade (np.convolve "same" mudaria o tamanho)
+        raio = min(int(3 * sigma), (min(grade.shape) - 1) // 2)
+        eixo = np.arange(-raio, raio + 1)
+        kernel = np.exp(-(eixo**2) / (2 * sigma**2))
+        kernel /= kernel.sum()
+        # Gaussiana separável: convolui as linhas e depois as colunas
+        for eixo_grade in (0, 1):
+            grade = np.apply_along_axis(
+                lambda v: np.convolve(v, kernel, mode="same"), eixo_grade, grade
+            )
+
+    return grade.astype(np.float32)
+
+
+def codificar_grade(grade):
+    """Grade float32 little-endian, linha a linha, em base64."""
+    return base64.b64encode(grade.astype("<f4").tobytes()).decode("ascii")
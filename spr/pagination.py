@@ -0,0 +1,139 @@
+"""
+# SPR-CRIMINALÍSTICA - Sistema de Organização Pericial
+# Desenvolvido por: Perito Criminal Sttefani Ribeiro
+# Versão 1.0 - 2025
+"""
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) sem COUNT(*) e sem OFFSET.
+
+    A ordenação vem da view (`cursor_ordering`), sempre terminando em `id`
+    para desempate, e deve casar com um índice composto na tabela.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+    ordering_query_param = "ordering"
+
+    def get_ordering(self, request, queryset, view):
+        campo = campo_ordenacao_solicitado(request, self.ordering_query_param)
+        if campo and campo.lstrip("-") in getattr(view, "cursor_ordering_fields", ()):
+            desempate = "-id" if campo.startswith("-") else "id"
+            return (campo, desempate)
+        return tuple(getattr(view, "cursor_ordering", self.ordering))
+
+
+class CursorOpcionalPagination(BasePagination):
+    """
+    Mantém a paginação por página (padrão do projeto) e ativa o modo cursor
+    quando o cliente envia `?cursor=` (vazio na primeira página).
+
+    Se `?ordering=` pedir um campo fora de `cursor_ordering_fields` da view,
+    a requisição cai de volta para a paginação por página, preservando a
+    ordenação do FilterSet.
+    """
+
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    paginacao_por_pagina = PageNumberPagination
+
+    def __init__(self):
+        self.paginador = None
+
+    def usar_cursor(self, request, view):
+        if self.cursor_query_param not in request.query_params:
+            return False
+        campo = campo_ordenacao_solicitado(request, self.ordering_query_param)
+        if not campo:
+            return True
+        return campo.lstrip("-") in getattr(view, "cursor_ordering_fields", ())
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.usar_cursor(request, view):
+            self.paginador = KeysetCursorPagination()
+        else:
+            self.paginador = self.paginacao_por_pagina()
+        return self.paginador.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.paginador.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginacao_por_pagina().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return self.paginacao_por_pagina().get_schema_operation_parameters(
+            view
+        ) + KeysetCursorPagination().get_schema_operation_parameters(view)
+
+
+class PaginadorContagemEstimada(Paginator):
+    """
+    Sem filtros, usa a estimativa do planner (pg_class.reltuples, somando as
+    partições) no lugar de um COUNT(*) sobre a tabela inteira. Tabelas
+    pequenas, nunca analisadas ou consultas filtradas usam a contagem exata.
+    """
+
+    minimo_estimativa = 100_000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, "query", None)
+        if query is not None and not query.where:
+            estimativa = estimar_linhas(self.object_list)
+            if estimativa >= self.minimo_estimativa:
+                return estimativa
+        return super().count
+
+
+class ContagemEstimadaPagination(PageNumberPagination):
+    django_paginator_class = PaginadorContagemEstimada
+
+
+class CursorContagemEstimadaPagination(CursorOpcionalPagination):
+    """CursorOpcionalPagination com total estimado nas tabelas muito grandes."""
+
+    paginacao_por_pagina = ContagemEstimadaPagination
+
+
+def estimar_linhas(queryset):
+    """
+    Linhas estimadas da tabela do queryset. Se ela for particionada, soma só
+    as partições folha: desde o PostgreSQL 14 o ANALYZE também preenche o
+    reltuples da tabela pai (e das subparticionadas) com o total.
+    """
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint
+            FROM pg_class c
+            WHERE (c.oid = to_regclass(%s) AND c.relkind <> 'p')
+               OR c.oid IN (
+                   SELECT relid FROM pg_partition_tree(to_regclass(%s))
+                   WHERE isleaf
+               )
+            """,
+            [queryset.model._meta.db_table] * 2,
+        )
+        return cursor.fetchone()[0]
+
+
+def campo_ordenacao_solicitado(request, parametro="ordering"):
+    """
+    Retorna o valor de `?ordering=` (ex.: '-created_at') ou None.
+    Ordenações com vários campos nunca casam com a lista indexável.
+    """
+    valor = request.query_params.get(parametro, "").strip()
+    return valor or None
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'django_filters',
@@ -129,6 +130,43 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Padrão em memória local; para compartilhar entre workers use, por exemplo,
+# CACHE_URL=dbcache://spr_cache (após `manage.py createcachetable`).
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+
+# Validade máxima (s) das respostas de análise em cache; a versão dos dados
+# (VersaoDados) já invalida tudo a cada escrita em ocorrências/endereços/OS
+ANALISE_CACHE_TIMEOUT = env.int('ANALISE_CACHE_TIMEOUT', default=600)
+
+# Dias até uma consulta sem resultado no cache de geocodificação ser refeita
+GEOCODE_CACHE_NEGATIVO_DIAS = env.int('GEOCODE_CACHE_NEGATIVO_DIAS', default=30)
+
+# Backend de geocodificação (BackendSimulado para testes/benchmarks, sem rede)
+GEOCODER_BACKEND = env(
+    'GEOCODER_BACKEND', default='ocorrencias.utils.geocoding.NominatimBackend'
+)
+
+# Socket do servidor_embeddings (modelo + ChromaDB compartilhados pelos
+# workers); vazio desliga e cada processo carrega o modelo no primeiro uso.
+# Fica numa pasta privada (0700) do projeto, não no /tmp compartilhado.
+IA_EMBEDDINGS_SOCKET = env(
+    'IA_EMBEDDINGS_SOCKET', default=str(BASE_DIR / 'run' / 'spr_embeddings.sock')
+)
+
+# Backend dos embeddings: 'torch' (sentence-transformers) ou 'onnx' (int8 no
+# onnxruntime; gerar antes com `manage.py exportar_modelo_onnx`)
+IA_EMBEDDINGS_BACKEND = env('IA_EMBEDDINGS_BACKEND', default='torch')
+IA_ONNX_DIR = env('IA_ONNX_DIR', default=str(BASE_DIR / 'modelos_onnx' / 'all-MiniLM-L6-v2'))
+IA_ONNX_THREADS = env.int('IA_ONNX_THREADS', default=0)  # 0 = todos os núcleos
+# Cosseno mínimo entre os vetores ONNX e os do torch (coleção existente)
+IA_ONNX_SIMILARIDADE_MINIMA = env.float('IA_ONNX_SIMILARIDADE_MINIMA', default=0.98)
+
+# Auditoria: meses mantidos no banco e pasta dos meses arquivados (.csv.gz)
+AUDITLOG_RETENCAO_MESES = env.int('AUDITLOG_RETENCAO_MESES', default=12)
+AUDITLOG_DIR_ARQUIVO = env('AUDITLOG_DIR_ARQUIVO', default=str(BASE_DIR / 'arquivo_auditoria'))
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
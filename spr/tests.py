@@ -0,0 +1,391 @@
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from autoridades.models import Autoridade
+from cargos.models import Cargo
+from cidades.models import Cidade
+from classificacoes.models import ClassificacaoOcorrencia
+from ocorrencias.endereco_models import EnderecoOcorrencia
+from ocorrencias.models import Ocorrencia
+from servicos_periciais.models import ServicoPericial
+from unidades_demandantes.models import UnidadeDemandante
+from usuarios.models import User
+
+from .cache_respostas import escopo_usuario
+from .exportacao import Coluna, gerar_linhas_csv
+from .geo import Propriedade, gerar_geojson
+
+
+class ExportacaoCsvTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            User.objects.create_user(
+                email=f"usuario{i}@teste.local",
+                password="senha-teste",
+                nome_completo=f"Usuário {i}",
+                cpf=f"{i:011d}",
+            )
+
+    def test_gera_cabecalho_e_linhas_em_blocos(self):
+        blocos = list(
+            gerar_linhas_csv(
+                User.objects.order_by("email"),
+                [Coluna("Nome", "nome_completo"), Coluna("Email", "email")],
+                chunk_size=2,
+            )
+        )
+        self.assertEqual(blocos[0], "\ufeffNome;Email\r\n")
+        self.assertEqual(len(blocos), 3)  # cabeçalho + 2 linhas + 1 linha
+        self.assertIn("Usuário 2;usuario2@teste.local", blocos[-1])
+
+    def test_erro_no_meio_do_stream_e_registrado_e_propagado(self):
+        def falhar(email):
+            raise ValueError("formatação inválida")
+
+        gerador = gerar_linhas_csv(
+            User.objects.all(), [Coluna("Email", "email", formatar=falhar)]
+        )
+        next(gerador)  # cabeçalho: já teria sido enviado ao cliente
+        with self.assertLogs("spr.exportacao", level="ERROR"):
+            with self.assertRaises(ValueError):
+                next(gerador)
+
+
+class DashboardCardsTests(APITestCase):
+    """Cards do dashboard: pai = soma das filhas, em poucas queries."""
+
+    URL = "/api/analise-criminal/dashboard/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(
+            email="admin@teste.local",
+            password="senha-teste",
+            nome_completo="Administrador",
+            cpf="00000000000",
+        )
+        cadastros = {
+            "servico_pericial": ServicoPericial.objects.create(sigla="SPT", nome="Teste"),
+            "unidade_demandante": UnidadeDemandante.objects.create(sigla="1DP", nome="1º DP"),
+            "autoridade": Autoridade.objects.create(
+                nome="Autoridade", cargo=Cargo.objects.create(nome="Delegado")
+            ),
+        }
+        cidades = [Cidade.objects.create(nome=nome) for nome in ("Cuiabá", "Várzea Grande")]
+
+        def classificacao(codigo, nome, parent=None):
+            return ClassificacaoOcorrencia.objects.create(
+                codigo=codigo, nome=nome, parent=parent
+            )
+
+        cls.pessoa = classificacao("1.0", "Crimes contra a pessoa")
+        cls.homicidio = classificacao("1.0.1", "Homicídio", cls.pessoa)
+        cls.lesao = classificacao("1.0.2", "Lesão corporal", cls.pessoa)
+        classificacao("1.0.3", "Feminicídio", cls.pessoa)  # filha sem ocorrências
+        cls.patrimonio = classificacao("2.0", "Crimes contra o patrimônio")
+        cls.furto = classificacao("2.0.1", "Furto", cls.patrimonio)
+        classificacao("3.0", "Trânsito")  # pai sem filhas: não vira card
+
+        # Resumo diário é atualizado no on_commit do save
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i, filha in enumerate(
+                [cls.homicidio] * 3 + [cls.lesao] + [cls.furto] * 4
+            ):
+                Ocorrencia.objects.create(
+                    classificacao=filha,
+                    cidade=cidades[i % 2],
+                    data_fato=date(2025, 1, 1 + i),
+                    **cadastros,
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.usuario)
+
+    def dashboard(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cards_ordenados_com_percentuais(self):
+        # Versão do cache + 11 agregações (cards: 1 GROUP BY + 1 árvore)
+        with self.assertNumQueries(12):
+            dados = self.dashboard()
+
+        self.assertEqual(dados["resumo"]["total_ocorrencias"], 8)
+        self.assertEqual(dados["resumo"]["total_cidades"], 2)
+        self.assertEqual(
+            [(c["codigo"], c["quantidade"], c["percentual"]) for c in dados["cards"]],
+            [("1.0", 4, 50.0), ("2.0", 4, 50.0)],
+        )
+        pessoa = dados["cards"][0]
+        self.assertEqual(
+            [(f["codigo"], f["quantidade"], f["percentual"]) for f in pessoa["filhas"]],
+            [("1.0.1", 3, 75.0), ("1.0.2", 1, 25.0)],
+        )
+        self.assertEqual(
+            [(f["codigo"], f["quantidade"], f["percentual"]) for f in dados["cards"][1]["filhas"]],
+            [("2.0.1", 4, 100.0)],
+        )
+
+    def test_filtro_pelo_pai_inclui_as_filhas(self):
+        dados = self.dashboard(classificacao_id=self.pessoa.id)
+
+        self.assertEqual(dados["resumo"]["total_ocorrencias"], 4)
+        self.assertEqual(
+            [(c["codigo"], c["quantidade"], c["percentual"]) for c in dados["cards"]],
+            [("1.0", 4, 100.0)],
+        )
+
+    def test_resumo_e_queryset_dao_os_mesmos_cards(self):
+        # Filtro de data do fato obriga a contar no queryset de ocorrências
+        pelo_resumo = self.dashboard()["cards"]
+        cache.clear()
+        pelo_queryset = self.dashboard(data_fim="2999-12-31")["cards"]
+        self.assertEqual(pelo_resumo, pelo_queryset)
+
+    def test_numero_de_queries_nao_depende_das_classificacoes(self):
+        with CaptureQueriesContext(connection) as antes:
+            self.dashboard()
+        for i in range(5):
+            pai = ClassificacaoOcorrencia.objects.create(codigo=f"9.{i}", nome=f"Pai {i}")
+            ClassificacaoOcorrencia.objects.create(
+                codigo=f"9.{i}.1", nome=f"Filha {i}", parent=pai
+            )
+        cache.clear()
+        with self.assertNumQueries(len(antes)):
+            self.dashboard()
+
+
+def criar_ocorrencias_mapa(coordenadas, classificacoes=None):
+    """Ocorrências externas com as coordenadas (lat, lng) informadas."""
+    cadastros = {
+        "servico_pericial": ServicoPericial.objects.create(sigla="SPT", nome="Teste"),
+        "unidade_demandante": UnidadeDemandante.objects.create(sigla="1DP", nome="1º DP"),
+        "autoridade": Autoridade.objects.create(
+            nome="Autoridade", cargo=Cargo.objects.create(nome="Delegado")
+        ),
+        "cidade": Cidade.objects.create(nome="Boa Vista"),
+    }
+    classificacoes = classificacoes or [
+        ClassificacaoOcorrencia.objects.create(codigo="1.0", nome="Crimes contra a pessoa")
+    ]
+    for i, (latitude, longitude) in enumerate(coordenadas):
+        EnderecoOcorrencia.objects.create(
+            ocorrencia=Ocorrencia.objects.create(
+                classificacao=classificacoes[i % len(classificacoes)], **cadastros
+            ),
+            modo_entrada="COORDENADAS_DIRETAS",
+            latitude=Decimal(str(latitude)),
+            longitude=Decimal(str(longitude)),
+        )
+
+
+class MapaAgrupadoTests(APITestCase):
+    """Modo ?zoom=&bbox=: clusters nas células cheias, pontos nas demais."""
+
+    URL = "/api/analise-criminal/mapa/"
+    # Zoom 10: células de ~0,088°; as 12 primeiras caem na mesma célula
+    AGRUPADAS = [(-2.80 + i / 10000, -60.69 + i / 10000) for i in range(12)]
+    SOLTAS = [(-2.5, -60.3), (-2.3, -60.1), (-2.1, -59.9)]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(
+            email="admin@teste.local",
+            password="senha-teste",
+            nome_completo="Administrador",
+            cpf="00000000000",
+        )
+        criar_ocorrencias_mapa(cls.AGRUPADAS + cls.SOLTAS)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.usuario)
+
+    def mapa(self, **params):
+        response = self.client.get(
+            self.URL, {"zoom": 10, "bbox": "-61,-3,-59,-2", **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cluster_com_total_e_centroide(self):
+        dados = self.mapa()
+
+        self.assertEqual(dados["total"], 15)
+        (cluster,) = dados["clusters"]
+        self.assertEqual(cluster["quantidade"], 12)
+        self.assertAlmostEqual(cluster["latitude"], -2.79945, places=4)
+        self.assertEqual(cluster["classificacao_predominante"]["codigo"], "1.0")
+        self.assertEqual(len(dados["pontos"]), 3)
+        self.assertEqual(dados["total_pontos"], 3)
+        self.assertIs(dados["truncado"], False)
+
+    def test_limite_de_pontos_por_celula(self):
+        dados = self.mapa(limite_pontos=13)
+        self.assertEqual(dados["clusters"], [])
+        self.assertEqual(len(dados["pontos"]), 15)
+
+        dados = self.mapa(limite_pontos=1)
+        self.assertEqual(len(dados["clusters"]), 4)
+        self.assertEqual(dados["pontos"], [])
+
+    def test_pontos_acima_do_teto_sao_sinalizados(self):
+        with mock.patch("spr.views.LIMITE_PONTOS_AGRUPADOS", 2):
+            dados = self.mapa()
+        self.assertEqual(len(dados["pontos"]), 2)
+        self.assertEqual(dados["total_pontos"], 3)
+        self.assertIs(dados["truncado"], True)
+
+
+class HeatmapTests(APITestCase):
+    """Grade float32 em base64: decodifica e soma o número de ocorrências."""
+
+    URL = "/api/analise-criminal/heatmap/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(
+            email="admin@teste.local",
+            password="senha-teste",
+            nome_completo="Administrador",
+            cpf="00000000000",
+        )
+        cls.classificacoes = [
+            ClassificacaoOcorrencia.objects.create(codigo="1.0", nome="Crimes contra a pessoa"),
+            ClassificacaoOcorrencia.objects.create(codigo="2.0", nome="Crimes contra o patrimônio"),
+        ]
+        # Longe das bordas do bbox, para a suavização não perder massa
+        criar_ocorrencias_mapa(
+            [(-2.5 + i / 100, -60.5 + i / 50) for i in range(9)], cls.classificacoes
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.usuario)
+
+    def heatmap(self, **params):
+        response = self.client.get(
+            self.URL,
+            {"bbox": "-61,-3,-60,-2", "largura": 32, "altura": 16, **params},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def decodificar(self, dados, grade):
+        return np.frombuffer(base64.b64decode(grade), "<f4").reshape(
+            dados["altura"], dados["largura"]
+        )
+
+    def test_grade_decodifica_e_soma_o_total(self):
+        dados = self.heatmap()
+        grade = self.decodificar(dados, dados["grade"])
+
+        self.assertEqual(dados["formato"], "float32-le-base64")
+        self.assertEqual(grade.shape, (16, 32))
+        self.assertEqual(dados["total"], 9)
+        self.assertEqual(grade.sum(), 9)
+        self.assertEqual(grade.max(), dados["maximo"])
+
+    def test_suavizacao_preserva_a_soma(self):
+        dados = self.heatmap(suavizar=1.5)
+        grade = self.decodificar(dados, dados["grade"])
+
+        self.assertAlmostEqual(float(grade.sum()), 9, places=3)
+        self.assertLess(dados["maximo"], 1)
+
+    def test_grades_por_grupo_somam_a_geral(self):
+        dados = self.heatmap(por_grupo="true")
+
+        totais = {g["classificacao"]["codigo"]: g["total"] for g in dados["grupos"]}
+        self.assertEqual(totais, {"1.0": 5, "2.0": 4})
+        soma = sum(self.decodificar(dados, g["grade"]) for g in dados["grupos"])
+        np.testing.assert_array_equal(soma, self.decodificar(dados, dados["grade"]))
+
+
+class GeojsonLimiteTests(TestCase):
+    """O GeoJSON com limite informa se a coleção foi cortada."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cadastros = {
+            "servico_pericial": ServicoPericial.objects.create(sigla="SPT", nome="Teste"),
+            "unidade_demandante": UnidadeDemandante.objects.create(sigla="1DP", nome="1º DP"),
+            "autoridade": Autoridade.objects.create(
+                nome="Autoridade", cargo=Cargo.objects.create(nome="Delegado")
+            ),
+            "cidade": Cidade.objects.create(nome="Cuiabá"),
+            "classificacao": ClassificacaoOcorrencia.objects.create(
+                codigo="1.0", nome="Crimes contra a pessoa"
+            ),
+        }
+        for i in range(3):
+            EnderecoOcorrencia.objects.create(
+                ocorrencia=Ocorrencia.objects.create(**cadastros),
+                modo_entrada="COORDENADAS_DIRETAS",
+                latitude=Decimal("-15.6") - i,
+                longitude=Decimal("-56.1"),
+            )
+
+    def colecao(self, limite):
+        queryset = Ocorrencia.objects.filter(endereco__latitude__isnull=False)
+        return json.loads(
+            "".join(
+                gerar_geojson(
+                    queryset,
+                    [Propriedade("id", "id")],
+                    prefixo="endereco__",
+                    limite=limite,
+                )
+            )
+        )
+
+    def test_abaixo_do_limite_nao_trunca(self):
+        colecao = self.colecao(limite=3)
+        self.assertEqual(len(colecao["features"]), 3)
+        self.assertIs(colecao["truncado"], False)
+        self.assertEqual(colecao["limite"], 3)
+
+    def test_acima_do_limite_trunca_e_avisa(self):
+        colecao = self.colecao(limite=2)
+        self.assertEqual(len(colecao["features"]), 2)
+        self.assertIs(colecao["truncado"], True)
+
+
+class EscopoCacheTests(TestCase):
+    """Só perfis administrativos compartilham entradas do cache de análise."""
+
+    def usuario(self, cpf, perfil, superuser=False):
+        criar = User.objects.create_superuser if superuser else User.objects.create_user
+        return criar(
+            email=f"{cpf}@teste.local",
+            password="senha-teste",
+            nome_completo=f"Usuário {cpf}",
+            cpf=cpf,
+            perfil=perfil,
+        )
+
+    def test_administrativos_compartilham(self):
+        self.assertEqual(
+            escopo_usuario(self.usuario("11111111111", "ADMINISTRATIVO")),
+            escopo_usuario(self.usuario("22222222222", "ADMINISTRATIVO")),
+        )
+
+    def test_superusers_peritos_nao_compartilham(self):
+        primeiro = self.usuario("11111111111", "PERITO", superuser=True)
+        segundo = self.usuario("22222222222", "PERITO", superuser=True)
+        self.assertNotEqual(escopo_usuario(primeiro), escopo_usuario(segundo))
+        self.assertEqual(escopo_usuario(primeiro), f"usuario:{primeiro.pk}")
@@ -13,7 +13,9 @@ from ordens_servico.views import OrdemServicoViewSet
 from spr.views import (
     DashboardCriminalView,
     EstatisticasCriminaisView,
+    HeatmapCriminalView,
     OcorrenciasGeoView,
+    OcorrenciasViewportView,
 )
 from usuarios.views import (
     UserRegistrationViewSet,
@@ -94,6 +96,16 @@ urlpatterns = [
     path(
         "api/analise-criminal/mapa/", OcorrenciasGeoView.as_view(), name="analise-mapa"
     ),
+    path(
+        "api/analise-criminal/mapa/viewport/",
+        OcorrenciasViewportView.as_view(),
+        name="analise-mapa-viewport",
+    ),
+    path(
+        "api/analise-criminal/heatmap/",
+        HeatmapCriminalView.as_view(),
+        name="analise-heatmap",
+    ),
     path(
         "api/analise-criminal/dashboard/",
         DashboardCriminalView.as_view(),
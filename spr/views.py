@@ -6,18 +6,98 @@
 # Contém:
 # 1. EstatisticasCriminaisView (original)
 # 2. OcorrenciasGeoView (original)
+# 2.1 OcorrenciasViewportView (GeoJSON por bbox)
+# 2.2 HeatmapCriminalView (grade de densidade)
 # 3. DashboardCriminalView (CORRIGIDA - dinâmica)
 # ==========================================
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Q, Value, CharField, Case, When
-from django.db.models.functions import TruncMonth, Coalesce, ExtractWeekDay, ExtractHour
+from rest_framework import status
+import numpy as np
+from django.db.models import (
+    Count,
+    F,
+    Q,
+    Sum,
+    Max,
+    Min,
+    Value,
+    CharField,
+    FloatField,
+    Case,
+    When,
+    Window,
+)
+from django.db.models.functions import (
+    TruncMonth,
+    Cast,
+    Coalesce,
+    ExtractWeekDay,
+    ExtractHour,
+)
 
 from ocorrencias.endereco_models import EnderecoOcorrencia
-from ocorrencias.models import Ocorrencia
+from ocorrencias.models import Ocorrencia, OcorrenciaResumoDiario
 from classificacoes.models import ClassificacaoOcorrencia
+from spr.cache_respostas import resposta_em_cache
+from spr.exportacao import formatar_data
+from spr.geo import (
+    Propriedade,
+    anotar_celula,
+    codificar_grade,
+    filtrar_bbox,
+    grade_densidade,
+    parse_bbox,
+    parse_zoom,
+    resposta_geojson,
+    tamanho_celula,
+)
+
+# Abaixo disso a célula do mapa devolve as ocorrências em vez do cluster
+LIMITE_PONTOS_CELULA = 10
+
+# Teto de pontos soltos no modo agrupado (acima disso, "truncado": true)
+LIMITE_PONTOS_AGRUPADOS = 5000
+
+# Lado máximo (em células) da grade do mapa de calor
+TAMANHO_MAXIMO_HEATMAP = 512
+
+# Teto de features por viewport (zoom muito afastado sem cluster)
+LIMITE_FEATURES_VIEWPORT = 20000
+
+PROPRIEDADES_VIEWPORT = [
+    Propriedade("id", "id"),
+    Propriedade("numero_ocorrencia", "numero_ocorrencia"),
+    Propriedade("classificacao_codigo", "classificacao__codigo"),
+    Propriedade("classificacao_nome", "classificacao__nome"),
+    Propriedade("bairro", "bairro_mapa"),
+    Propriedade("logradouro", "endereco__logradouro"),
+    Propriedade("data_fato", "data_fato", formatar=formatar_data),
+    Propriedade("cidade", "cidade__nome"),
+]
+
+
+def _fonte_contagens(
+    queryset, data_inicio, data_fim, bairro, ids_classificacao, cidade_id
+):
+    """
+    Escolhe de onde saem as contagens por classificação/cidade.
+
+    Sem filtro de data do fato ou bairro (campos fora do resumo), usa o
+    resumo diário somando `total`; caso contrário, conta no próprio queryset.
+    Retorna (fonte, expressão de contagem).
+    """
+    if data_inicio or data_fim or bairro:
+        return queryset, Count("id")
+
+    resumo = OcorrenciaResumoDiario.objects.all()
+    if ids_classificacao:
+        resumo = resumo.filter(classificacao_id__in=ids_classificacao)
+    if cidade_id:
+        resumo = resumo.filter(cidade_id=cidade_id)
+    return resumo, Sum("total")
 
 
 # ==========================================
@@ -30,6 +110,7 @@ class EstatisticasCriminaisView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @resposta_em_cache("analise-estatisticas", por_usuario=False)
     def get(self, request):
         # 1. FILTROS
         data_inicio = request.GET.get("data_inicio") or None
@@ -55,6 +136,7 @@ class EstatisticasCriminaisView(APIView):
             queryset = queryset.filter(data_fato__lte=data_fim)
 
         # LÓGICA DE HIERARQUIA (PAI + FILHAS)
+        ids_totais = None
         if classificacao_id:
             ids_filhas = ClassificacaoOcorrencia.objects.filter(
                 parent_id=classificacao_id
@@ -70,18 +152,21 @@ class EstatisticasCriminaisView(APIView):
                 | Q(endereco__bairro_novo__nome__icontains=bairro)
             )
 
-        total_ocorrencias = queryset.count()
+        fonte, contagem = _fonte_contagens(
+            queryset, data_inicio, data_fim, bairro, ids_totais, cidade_id
+        )
+        total_ocorrencias = fonte.aggregate(q=Coalesce(contagem, 0))["q"]
 
         # Agregações
         por_classificacao = (
-            queryset.values("classificacao__codigo", "classificacao__nome")
-            .annotate(quantidade=Count("id"))
+            fonte.values("classificacao__codigo", "classificacao__nome")
+            .annotate(quantidade=contagem)
             .order_by("-quantidade")[:10]
         )
 
         por_cidade = (
-            queryset.values("cidade__nome")
-            .annotate(quantidade=Count("id"))
+            fonte.values("cidade__nome")
+            .annotate(quantidade=contagem)
             .order_by("-quantidade")[:10]
         )
 
@@ -139,6 +224,57 @@ class EstatisticasCriminaisView(APIView):
         )
 
 
+def _ocorrencias_mapa(request):
+    """
+    Ocorrências externas com coordenadas, com os filtros do mapa (período do
+    fato, classificação + filhas, cidade e bairro). Usado pelo mapa e pelo
+    viewport GeoJSON.
+    """
+    data_inicio = request.GET.get("data_inicio")
+    data_fim = request.GET.get("data_fim")
+    classificacao_id = request.GET.get("classificacao_id")
+    cidade_id = request.GET.get("cidade_id")
+    bairro = request.GET.get("bairro")
+
+    def safe_int(val):
+        try:
+            return int(val) if val not in ["null", "", None] else None
+        except:
+            return None
+
+    classificacao_id = safe_int(classificacao_id)
+    cidade_id = safe_int(cidade_id)
+
+    queryset = Ocorrencia.objects.filter(
+        endereco__latitude__isnull=False,
+        endereco__longitude__isnull=False,
+        endereco__tipo="EXTERNA",
+    )
+
+    if data_inicio:
+        queryset = queryset.filter(data_fato__gte=data_inicio)
+    if data_fim:
+        queryset = queryset.filter(data_fato__lte=data_fim)
+
+    # LÓGICA DE HIERARQUIA NO MAPA
+    if classificacao_id:
+        ids_filhas = ClassificacaoOcorrencia.objects.filter(
+            parent_id=classificacao_id
+        ).values_list("id", flat=True)
+        ids_totais = [classificacao_id] + list(ids_filhas)
+        queryset = queryset.filter(classificacao_id__in=ids_totais)
+
+    if cidade_id:
+        queryset = queryset.filter(cidade_id=cidade_id)
+    if bairro:
+        queryset = queryset.filter(
+            Q(endereco__bairro_legado__icontains=bairro)
+            | Q(endereco__bairro_novo__nome__icontains=bairro)
+        )
+
+    return queryset
+
+
 # ==========================================
 # 2. OCORRÊNCIAS GEO (ORIGINAL)
 # ==========================================
@@ -147,77 +283,308 @@ class OcorrenciasGeoView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @resposta_em_cache("analise-mapa", por_usuario=False)
     def get(self, request):
-        data_inicio = request.GET.get("data_inicio")
-        data_fim = request.GET.get("data_fim")
-        classificacao_id = request.GET.get("classificacao_id")
-        cidade_id = request.GET.get("cidade_id")
-        bairro = request.GET.get("bairro")
-
         def safe_int(val):
             try:
                 return int(val) if val not in ["null", "", None] else None
             except:
                 return None
 
-        classificacao_id = safe_int(classificacao_id)
-        cidade_id = safe_int(cidade_id)
-
-        queryset = Ocorrencia.objects.filter(
-            endereco__latitude__isnull=False,
-            endereco__longitude__isnull=False,
-            endereco__tipo="EXTERNA",
-        ).select_related("classificacao", "cidade", "endereco", "endereco__bairro_novo")
+        queryset = _ocorrencias_mapa(request).select_related(
+            "classificacao", "cidade", "endereco", "endereco__bairro_novo"
+        )
 
-        if data_inicio:
-            queryset = queryset.filter(data_fato__gte=data_inicio)
-        if data_fim:
-            queryset = queryset.filter(data_fato__lte=data_fim)
+        # Modo agrupado: ?zoom=&bbox= devolve clusters da grade + pontos soltos
+        if "zoom" in request.GET or "bbox" in request.GET:
+            zoom = parse_zoom(request.GET.get("zoom"))
+            bbox = parse_bbox(request.GET.get("bbox"))
+            if zoom is None or bbox is None:
+                return Response(
+                    {
+                        "error": "Parâmetros inválidos. Use zoom=0..22 e "
+                        "bbox=oeste,sul,leste,norte"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            limite = safe_int(request.GET.get("limite_pontos")) or LIMITE_PONTOS_CELULA
+            return Response(self.agrupar(queryset, zoom, bbox, limite))
+
+        return Response([self.ponto(o) for o in queryset[:5000]])
+
+    @staticmethod
+    def ponto(o):
+        return {
+            "id": o.id,
+            "numero_ocorrencia": o.numero_ocorrencia,
+            "classificacao": {
+                "codigo": o.classificacao.codigo if o.classificacao else "",
+                "nome": (o.classificacao.nome if o.classificacao else "Sem classificação"),
+            },
+            "endereco": {
+                "latitude": o.endereco.latitude,
+                "longitude": o.endereco.longitude,
+                "bairro": o.endereco.nome_bairro,
+                "logradouro": o.endereco.logradouro or "",
+            },
+            "data_fato": (o.data_fato.strftime("%d/%m/%Y") if o.data_fato else ""),
+            "cidade": {"nome": o.cidade.nome if o.cidade else ""},
+        }
 
-        # LÓGICA DE HIERARQUIA NO MAPA
-        if classificacao_id:
-            ids_filhas = ClassificacaoOcorrencia.objects.filter(
-                parent_id=classificacao_id
-            ).values_list("id", flat=True)
-            ids_totais = [classificacao_id] + list(ids_filhas)
-            queryset = queryset.filter(classificacao_id__in=ids_totais)
+    def agrupar(self, queryset, zoom, bbox, limite):
+        """
+        Agrupa as ocorrências do bbox numa grade cujo tamanho depende do zoom.
+        Células com `limite` ou mais ocorrências viram cluster (quantidade,
+        centróide e classificação predominante); as demais voltam como pontos,
+        até LIMITE_PONTOS_AGRUPADOS ("truncado" avisa o corte).
+        """
+        tamanho = tamanho_celula(zoom)
+        queryset = anotar_celula(
+            filtrar_bbox(queryset, bbox, prefixo="endereco__"),
+            tamanho,
+            prefixo="endereco__",
+        )
 
-        if cidade_id:
-            queryset = queryset.filter(cidade_id=cidade_id)
-        if bairro:
-            queryset = queryset.filter(
-                Q(endereco__bairro_legado__icontains=bairro)
-                | Q(endereco__bairro_novo__nome__icontains=bairro)
+        # Uma linha por célula × classificação, somando as coordenadas
+        celulas = {}
+        for linha in (
+            queryset.order_by()
+            .values(
+                "celula_x",
+                "celula_y",
+                "classificacao__codigo",
+                "classificacao__nome",
             )
-
-        queryset = queryset[:5000]
-        data = []
-        for o in queryset:
-            data.append(
+            .annotate(
+                quantidade=Count("id"),
+                soma_lat=Sum("geo_lat"),
+                soma_lng=Sum("geo_lng"),
+            )
+        ):
+            celula = celulas.setdefault(
+                (linha["celula_x"], linha["celula_y"]),
+                {"quantidade": 0, "soma_lat": 0.0, "soma_lng": 0.0, "dominante": None},
+            )
+            celula["quantidade"] += linha["quantidade"]
+            celula["soma_lat"] += linha["soma_lat"]
+            celula["soma_lng"] += linha["soma_lng"]
+            if (
+                celula["dominante"] is None
+                or linha["quantidade"] > celula["dominante"]["quantidade"]
+            ):
+                celula["dominante"] = linha
+
+        clusters = []
+        for (x, y), celula in celulas.items():
+            if celula["quantidade"] < limite:
+                continue
+            dominante = celula["dominante"]
+            clusters.append(
                 {
-                    "id": o.id,
-                    "numero_ocorrencia": o.numero_ocorrencia,
-                    "classificacao": {
-                        "codigo": o.classificacao.codigo if o.classificacao else "",
-                        "nome": (
-                            o.classificacao.nome
-                            if o.classificacao
-                            else "Sem classificação"
-                        ),
+                    "quantidade": celula["quantidade"],
+                    "latitude": celula["soma_lat"] / celula["quantidade"],
+                    "longitude": celula["soma_lng"] / celula["quantidade"],
+                    "celula": {
+                        "oeste": x * tamanho,
+                        "sul": y * tamanho,
+                        "leste": (x + 1) * tamanho,
+                        "norte": (y + 1) * tamanho,
                     },
-                    "endereco": {
-                        "latitude": o.endereco.latitude,
-                        "longitude": o.endereco.longitude,
-                        "bairro": o.endereco.nome_bairro,
-                        "logradouro": o.endereco.logradouro or "",
+                    "classificacao_predominante": {
+                        "codigo": dominante["classificacao__codigo"] or "",
+                        "nome": dominante["classificacao__nome"] or "Sem classificação",
+                        "quantidade": dominante["quantidade"],
                     },
-                    "data_fato": (
-                        o.data_fato.strftime("%d/%m/%Y") if o.data_fato else ""
-                    ),
-                    "cidade": {"nome": o.cidade.nome if o.cidade else ""},
                 }
             )
-        return Response(data)
+        clusters.sort(key=lambda c: c["quantidade"], reverse=True)
+
+        # Pontos só das células pequenas (filtro sobre a window function)
+        pontos = queryset.annotate(
+            ocorrencias_celula=Window(
+                Count("id"), partition_by=[F("celula_x"), F("celula_y")]
+            )
+        ).filter(ocorrencias_celula__lt=limite)[:LIMITE_PONTOS_AGRUPADOS]
+        total_pontos = sum(
+            c["quantidade"] for c in celulas.values() if c["quantidade"] < limite
+        )
+
+        return {
+            "modo": "clusters",
+            "zoom": zoom,
+            "tamanho_celula": tamanho,
+            "limite_pontos": limite,
+            "total": sum(c["quantidade"] for c in celulas.values()),
+            "clusters": clusters,
+            "pontos": [self.ponto(o) for o in pontos],
+            "total_pontos": total_pontos,
+            "truncado": total_pontos > LIMITE_PONTOS_AGRUPADOS,
+        }
+
+
+# ==========================================
+# 2.1 VIEWPORT DO MAPA (GEOJSON EM STREAMING)
+# ==========================================
+class OcorrenciasViewportView(APIView):
+    """
+    Ocorrências dentro do bbox visível, como GeoJSON (FeatureCollection)
+    gerado direto das linhas de values(). Aceita os mesmos filtros do mapa.
+    O recorte usa o índice parcial endereco_ocorrencia_geo_idx, então o custo
+    acompanha a área visível e não o tamanho da tabela. Acima de
+    LIMITE_FEATURES_VIEWPORT a coleção vem cortada com "truncado": true.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        bbox = parse_bbox(request.GET.get("bbox"))
+        if bbox is None:
+            return Response(
+                {"error": "Parâmetro bbox obrigatório: oeste,sul,leste,norte"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = (
+            filtrar_bbox(_ocorrencias_mapa(request), bbox, prefixo="endereco__")
+            .annotate(
+                bairro_mapa=Coalesce(
+                    "endereco__bairro_novo__nome",
+                    "endereco__bairro_legado",
+                    Value(""),
+                    output_field=CharField(),
+                )
+            )
+            .order_by()
+        )
+        return resposta_geojson(
+            queryset, PROPRIEDADES_VIEWPORT, limite=LIMITE_FEATURES_VIEWPORT
+        )
+
+
+# ==========================================
+# 2.2 MAPA DE CALOR (GRADE DE DENSIDADE)
+# ==========================================
+class HeatmapCriminalView(APIView):
+    """
+    Grade de densidade das ocorrências do mapa (mesmos filtros), calculada no
+    servidor com NumPy e devolvida como float32 em base64 — o navegador só
+    pinta a grade, sem receber um ponto por ocorrência.
+
+    Parâmetros extras: bbox (padrão: extensão dos dados), largura/altura da
+    grade em células, suavizar (sigma gaussiano em células) e por_grupo=true
+    para uma grade por classificação principal.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @resposta_em_cache("analise-heatmap", por_usuario=False)
+    def get(self, request):
+        def safe_int(val):
+            try:
+                return int(val) if val not in ["null", "", None] else None
+            except:
+                return None
+
+        largura = safe_int(request.GET.get("largura")) or 128
+        altura = safe_int(request.GET.get("altura")) or 128
+        largura = min(max(largura, 1), TAMANHO_MAXIMO_HEATMAP)
+        altura = min(max(altura, 1), TAMANHO_MAXIMO_HEATMAP)
+        try:
+            sigma = max(float(request.GET.get("suavizar") or 0), 0)
+        except ValueError:
+            sigma = 0
+        sigma = min(sigma, 10)
+        por_grupo = request.GET.get("por_grupo") == "true"
+
+        queryset = _ocorrencias_mapa(request)
+        if request.GET.get("bbox"):
+            bbox = parse_bbox(request.GET.get("bbox"))
+            if bbox is None:
+                return Response(
+                    {"error": "bbox inválido. Use oeste,sul,leste,norte"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            queryset = filtrar_bbox(queryset, bbox, prefixo="endereco__")
+        else:
+            extensao = queryset.aggregate(
+                oeste=Min("endereco__longitude"),
+                sul=Min("endereco__latitude"),
+                leste=Max("endereco__longitude"),
+                norte=Max("endereco__latitude"),
+            )
+            if extensao["oeste"] is None:
+                bbox = None
+            else:
+                oeste, sul, leste, norte = (
+                    float(extensao[c]) for c in ("oeste", "sul", "leste", "norte")
+                )
+                # Margem mínima para um único ponto não gerar bbox vazio
+                bbox = (oeste - 0.001, sul - 0.001, leste + 0.001, norte + 0.001)
+
+        linhas = list(
+            queryset.order_by()
+            .annotate(
+                geo_lat=Cast("endereco__latitude", FloatField()),
+                geo_lng=Cast("endereco__longitude", FloatField()),
+                grupo_id=Coalesce("classificacao__parent_id", "classificacao_id"),
+            )
+            .values_list("geo_lat", "geo_lng", "grupo_id")
+        )
+        coordenadas = np.array(
+            [(lat, lng) for lat, lng, _ in linhas], dtype=np.float64
+        ).reshape(-1, 2)
+
+        def montar(indices):
+            if bbox is None:
+                grade = np.zeros((altura, largura), dtype=np.float32)
+            else:
+                grade = grade_densidade(
+                    coordenadas[indices, 0],
+                    coordenadas[indices, 1],
+                    bbox,
+                    largura,
+                    altura,
+                    sigma,
+                )
+            return {
+                "total": int(len(coordenadas[indices])),
+                "maximo": float(grade.max()) if grade.size else 0.0,
+                "grade": codificar_grade(grade),
+            }
+
+        dados = {
+            "formato": "float32-le-base64",
+            "largura": largura,
+            "altura": altura,
+            "suavizar": sigma,
+            "bbox": (
+                dict(zip(("oeste", "sul", "leste", "norte"), bbox)) if bbox else None
+            ),
+            **montar(slice(None)),
+        }
+
+        if por_grupo:
+            grupos = np.array([grupo for _, _, grupo in linhas])
+            nomes = {
+                c.id: c
+                for c in ClassificacaoOcorrencia.objects.filter(
+                    id__in=set(grupos.tolist())
+                )
+            }
+            dados["grupos"] = []
+            for grupo_id in sorted(nomes, key=lambda i: nomes[i].codigo):
+                dados["grupos"].append(
+                    {
+                        "classificacao": {
+                            "id": grupo_id,
+                            "codigo": nomes[grupo_id].codigo,
+                            "nome": nomes[grupo_id].nome,
+                        },
+                        **montar(grupos == grupo_id),
+                    }
+                )
+
+        return Response(dados)
 
 
 # ==========================================
@@ -236,6 +603,7 @@ class DashboardCriminalView(APIView):
 
     permission_classes = [IsAuthenticated]
 
+    @resposta_em_cache("analise-dashboard", por_usuario=False)
     def get(self, request):
         # ==========================================
         # 1. EXTRAÇÃO DE FILTROS
@@ -266,6 +634,7 @@ class DashboardCriminalView(APIView):
             queryset = queryset.filter(data_fato__lte=data_fim)
 
         # Filtro hierárquico de classificação
+        ids_totais = None
         if classificacao_id:
             ids_filhas = ClassificacaoOcorrencia.objects.filter(
                 parent_id=classificacao_id
@@ -285,30 +654,41 @@ class DashboardCriminalView(APIView):
         # ==========================================
         # 3. CARDS DINÂMICOS (PAI = SOMA DAS FILHAS)
         # ==========================================
-        total_geral = queryset.count()
-        total_cidades = queryset.values("cidade").distinct().count()
-
-        # Buscar todos os PAIs (parent=null) ordenados por código
-        pais = ClassificacaoOcorrencia.objects.filter(parent__isnull=True).order_by(
-            "codigo"
+        fonte, contagem = _fonte_contagens(
+            queryset, data_inicio, data_fim, bairro, ids_totais, cidade_id
+        )
+        total_geral = fonte.aggregate(q=Coalesce(contagem, 0))["q"]
+        total_cidades = fonte.values("cidade").distinct().count()
+
+        # Contagem por classificação numa única query agrupada
+        quantidades = dict(
+            fonte.order_by()
+            .values_list("classificacao_id")
+            .annotate(quantidade=contagem)
         )
 
+        # Hierarquia carregada uma vez e montada em memória
+        pais = []
+        filhas_por_pai = {}
+        for classificacao in ClassificacaoOcorrencia.objects.order_by("codigo").values(
+            "id", "codigo", "nome", "parent_id"
+        ):
+            if classificacao["parent_id"] is None:
+                pais.append(classificacao)
+            else:
+                filhas_por_pai.setdefault(classificacao["parent_id"], []).append(
+                    classificacao
+                )
+
         cards = []
 
         for pai in pais:
-            # Buscar todas as filhas deste pai
-            filhas = ClassificacaoOcorrencia.objects.filter(parent=pai)
-            ids_filhas = list(filhas.values_list("id", flat=True))
+            filhas = filhas_por_pai.get(pai["id"], [])
 
             # Calcular quantidade do PAI (soma das filhas)
             # Regra: PAI nunca é classificado diretamente, só as filhas
-            if ids_filhas:
-                quantidade_pai = queryset.filter(
-                    classificacao_id__in=ids_filhas
-                ).count()
-            else:
-                # Caso raro: PAI sem filhas cadastradas
-                quantidade_pai = 0
+            # (PAI sem filhas cadastradas fica com 0)
+            quantidade_pai = sum(quantidades.get(filha["id"], 0) for filha in filhas)
 
             # Pular PAIs sem ocorrências no período/filtro
             if quantidade_pai == 0:
@@ -321,21 +701,17 @@ class DashboardCriminalView(APIView):
 
             # Montar detalhamento das filhas (drill-down)
             filhas_detalhe = []
-            for filha in filhas.order_by("codigo"):
-                quantidade_filha = queryset.filter(classificacao_id=filha.id).count()
+            for filha in filhas:
+                quantidade_filha = quantidades.get(filha["id"], 0)
 
                 if quantidade_filha > 0:
-                    percentual_filha = (
-                        round((quantidade_filha / quantidade_pai) * 100, 1)
-                        if quantidade_pai > 0
-                        else 0
-                    )
+                    percentual_filha = round((quantidade_filha / quantidade_pai) * 100, 1)
 
                     filhas_detalhe.append(
                         {
-                            "id": filha.id,
-                            "codigo": filha.codigo,
-                            "nome": filha.nome,
+                            "id": filha["id"],
+                            "codigo": filha["codigo"],
+                            "nome": filha["nome"],
                             "quantidade": quantidade_filha,
                             "percentual": percentual_filha,
                         }
@@ -347,9 +723,9 @@ class DashboardCriminalView(APIView):
             # Adicionar card do PAI
             cards.append(
                 {
-                    "id": pai.id,
-                    "codigo": pai.codigo,
-                    "nome": pai.nome,
+                    "id": pai["id"],
+                    "codigo": pai["codigo"],
+                    "nome": pai["nome"],
                     "quantidade": quantidade_pai,
                     "percentual": percentual,
                     "filhas": filhas_detalhe,
@@ -365,15 +741,15 @@ class DashboardCriminalView(APIView):
 
         # Por classificação (top 10)
         por_classificacao = (
-            queryset.values("classificacao__codigo", "classificacao__nome")
-            .annotate(quantidade=Count("id"))
+            fonte.values("classificacao__codigo", "classificacao__nome")
+            .annotate(quantidade=contagem)
             .order_by("-quantidade")[:10]
         )
 
         # Por cidade (top 10)
         por_cidade = (
-            queryset.values("cidade__nome")
-            .annotate(quantidade=Count("id"))
+            fonte.values("cidade__nome")
+            .annotate(quantidade=contagem)
             .order_by("-quantidade")[:10]
         )
 
@@ -1,5 +1,7 @@
 # usuarios/models.py
 
+import copy
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 
@@ -49,6 +51,92 @@ class AuditModel(models.Model):
     class Meta:
         abstract = True  # Garante que este modelo não crie uma tabela no banco, servindo apenas para herança.
 
+    # --- Rastreamento de campos alterados ---
+    # Ao carregar do banco, guarda os valores lidos; comparar com eles não
+    # custa query. Em updates sem update_fields, o save grava só as colunas
+    # alteradas (mais updated_at).
+    # Mudança de comportamento: como o save vira UPDATE com update_fields,
+    # salvar uma instância carregada cuja linha foi apagada levanta
+    # DatabaseError ("did not affect any rows") em vez de reinserir a linha.
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._guardar_estado_carregado()
+        return instance
+
+    def _guardar_estado_carregado(self, attnames=None):
+        if attnames is None or not self.tem_estado_carregado:
+            self._estado_carregado = {}
+            attnames = [f.attname for f in self._meta.concrete_fields]
+        for attname in attnames:
+            if attname in self.__dict__:
+                valor = self.__dict__[attname]
+                # Cópia só dos mutáveis (JSON): alterações in-place contam
+                if isinstance(valor, (dict, list, set)):
+                    valor = copy.deepcopy(valor)
+                self._estado_carregado[attname] = valor
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self._guardar_estado_carregado()
+        else:
+            campos = {f.name: f.attname for f in self._meta.concrete_fields}
+            self._guardar_estado_carregado([campos.get(nome, nome) for nome in fields])
+
+    @property
+    def tem_estado_carregado(self):
+        return getattr(self, "_estado_carregado", None) is not None
+
+    def campos_alterados(self):
+        """
+        Nomes dos campos (attname, ex.: 'perito_atribuido_id') com valor
+        diferente do carregado. None para instâncias que não vieram do banco.
+        """
+        if not self.tem_estado_carregado:
+            return None
+        alterados = set()
+        for field in self._meta.concrete_fields:
+            attname = field.attname
+            if attname not in self.__dict__:
+                continue  # campo adiado (defer/only) e não tocado
+            if attname not in self._estado_carregado:
+                alterados.add(attname)  # adiado, mas atribuído depois
+            elif self.__dict__[attname] != self._estado_carregado[attname]:
+                alterados.add(attname)
+        return alterados
+
+    def versao_carregada(self):
+        """Cópia da instância com os valores lidos do banco (sem query)."""
+        anterior = copy.copy(self)
+        anterior.__dict__.update(self._estado_carregado)
+        return anterior
+
+    def save(self, *args, **kwargs):
+        if (
+            kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+            and not self._state.adding
+            and self.tem_estado_carregado
+        ):
+            por_attname = {f.attname: f.name for f in self._meta.concrete_fields}
+            kwargs["update_fields"] = sorted(
+                {por_attname[attname] for attname in self.campos_alterados()}
+                | {"updated_at"}
+            )
+        super().save(*args, **kwargs)
+
+        # Só os campos gravados deixam de ser "alterados"
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self._guardar_estado_carregado()
+        else:
+            campos = {f.name: f.attname for f in self._meta.concrete_fields}
+            self._guardar_estado_carregado(
+                [campos.get(nome, nome) for nome in update_fields]
+            )
+
     def soft_delete(self, user):
         from django.utils import timezone
 
@@ -0,0 +1,140 @@
+from django.db import DatabaseError, connection, models
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from cidades.models import Cidade
+from ocorrencias.models import Ocorrencia
+from ocorrencias.tests import criar_cadastros_basicos
+
+from .models import AuditModel, User
+
+
+class RegistroAuditado(AuditModel):
+    """Modelo só de teste: nenhum modelo real do AuditModel tem campo JSON."""
+
+    nome = models.CharField(max_length=50)
+    dados = models.JSONField(default=dict)
+
+    class Meta:
+        app_label = "usuarios"
+
+
+class AuditModelTests(TestCase):
+    """Rastreamento de campos alterados e save parcial do AuditModel."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Sem migração: a tabela existe só dentro da transação da classe
+        with connection.schema_editor() as editor:
+            editor.create_model(RegistroAuditado)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(
+            email="perito@teste.local",
+            password="senha-teste",
+            nome_completo="Perito",
+            cpf="11111111111",
+        )
+        cls.cidade = Cidade.objects.create(nome="Boa Vista")
+
+    def update_sql(self, instancia, queries):
+        (sql,) = [
+            q["sql"]
+            for q in queries
+            if q["sql"].startswith(f'UPDATE "{instancia._meta.db_table}"')
+        ]
+        return sql
+
+    def test_save_grava_so_colunas_alteradas(self):
+        cidade = Cidade.objects.get(pk=self.cidade.pk)
+        self.assertEqual(cidade.campos_alterados(), set())
+
+        cidade.nome = "Caracaraí"
+        self.assertEqual(cidade.campos_alterados(), {"nome"})
+        with CaptureQueriesContext(connection) as contexto:
+            cidade.save()
+
+        sql = self.update_sql(cidade, contexto.captured_queries)
+        self.assertIn('"nome"', sql)
+        self.assertIn('"updated_at"', sql)
+        self.assertNotIn('"created_at"', sql)
+        self.assertNotIn('"deleted_at"', sql)
+        self.assertEqual(cidade.campos_alterados(), set())
+
+    def test_instancia_nova_nao_rastreia(self):
+        self.assertIsNone(Cidade(nome="Mucajaí").campos_alterados())
+
+    def test_json_alterado_in_place(self):
+        registro = RegistroAuditado.objects.create(nome="a", dados={"itens": [1]})
+        registro = RegistroAuditado.objects.get(pk=registro.pk)
+
+        registro.dados["itens"].append(2)
+        self.assertEqual(registro.campos_alterados(), {"dados"})
+        registro.save()
+
+        registro.refresh_from_db()
+        self.assertEqual(registro.dados, {"itens": [1, 2]})
+        self.assertEqual(registro.campos_alterados(), set())
+
+    def test_campo_adiado_atribuido_depois(self):
+        for queryset in (
+            Cidade.objects.defer("nome"),
+            Cidade.objects.only("id", "updated_at"),
+        ):
+            with self.subTest(queryset=str(queryset.query)):
+                cidade = queryset.get(pk=self.cidade.pk)
+                self.assertEqual(cidade.campos_alterados(), set())
+
+                cidade.nome = "Pacaraima"
+                self.assertEqual(cidade.campos_alterados(), {"nome"})
+                cidade.save()
+                self.assertEqual(
+                    Cidade.objects.get(pk=self.cidade.pk).nome, "PACARAIMA"
+                )
+
+    def test_refresh_parcial_atualiza_so_os_campos_lidos(self):
+        cidade = Cidade.objects.get(pk=self.cidade.pk)
+        cidade.nome = "Alterada Localmente"
+        cidade.deleted_by = self.usuario
+        Cidade.objects.filter(pk=cidade.pk).update(nome="ALTO ALEGRE")
+
+        cidade.refresh_from_db(fields=["nome"])
+
+        self.assertEqual(cidade.nome, "ALTO ALEGRE")
+        self.assertEqual(cidade.campos_alterados(), {"deleted_by_id"})
+
+    def test_soft_delete_e_restore(self):
+        cidade = Cidade.objects.get(pk=self.cidade.pk)
+
+        cidade.soft_delete(self.usuario)
+        self.assertFalse(Cidade.objects.filter(pk=cidade.pk).exists())
+        apagada = Cidade.all_objects.get(pk=cidade.pk)
+        self.assertEqual(apagada.deleted_by, self.usuario)
+        self.assertEqual(apagada.campos_alterados(), set())
+
+        apagada.restore()
+        restaurada = Cidade.objects.get(pk=cidade.pk)
+        self.assertIsNone(restaurada.deleted_at)
+        self.assertIsNone(restaurada.deleted_by_id)
+
+    def test_historico_alterado_registra_a_edicao(self):
+        ocorrencia = Ocorrencia.objects.create(**criar_cadastros_basicos())
+        ocorrencia = Ocorrencia.objects.get(pk=ocorrencia.pk)
+        self.assertIsNone(ocorrencia.historico_ultima_edicao)
+
+        ocorrencia.historico = "Vítima encaminhada ao IML."
+        ocorrencia.save()
+
+        self.assertIsNotNone(
+            Ocorrencia.objects.get(pk=ocorrencia.pk).historico_ultima_edicao
+        )
+
+    def test_linha_apagada_nao_e_reinserida(self):
+        cidade = Cidade.objects.get(pk=self.cidade.pk)
+        Cidade.all_objects.filter(pk=cidade.pk).delete()
+
+        cidade.nome = "Iracema"
+        with self.assertRaisesMessage(DatabaseError, "did not affect any rows"):
+            cidade.save()
@@ -12,6 +12,8 @@ from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework_simplejwt.views import TokenObtainPairView
 
+from spr.exportacao import Coluna, formatar_data_hora, resposta_csv, rotulos
+
 from .models import User
 from .permissions import IsSuperAdminUser
 from .serializers import (
@@ -145,6 +147,26 @@ class UserManagementViewSet(
             status=status.HTTP_200_OK,
         )
 
+    @action(detail=False, methods=["get"], url_path="exportar-csv")
+    def exportar_csv(self, request):
+        """Exporta os usuários filtrados em CSV (streaming, memória constante)."""
+        perfil_labels = rotulos(User.Perfil.choices)
+        status_labels = rotulos(User.Status.choices)
+        colunas = [
+            Coluna("Nome", "nome_completo"),
+            Coluna("Email", "email"),
+            Coluna("CPF", "cpf"),
+            Coluna("Telefone", "telefone_celular"),
+            Coluna(
+                "Perfil", "perfil", formatar=lambda p: perfil_labels.get(p, p or "")
+            ),
+            Coluna("Status", "status", formatar=lambda s: status_labels.get(s, s)),
+            Coluna("Cadastrado em", "created_at", formatar=formatar_data_hora),
+            Coluna("Ultimo acesso", "last_login", formatar=formatar_data_hora),
+        ]
+        queryset = self.filter_queryset(self.get_queryset())
+        return resposta_csv(queryset, colunas, "usuarios.csv")
+
     @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated])
     def peritos_dropdown(self, request):
         """Lista simplificada de peritos para dropdowns"""